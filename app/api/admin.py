@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse
 import logging
 from typing import Optional
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
-from app.db.models import Base, AiracCycle, Airport, Fix, Airway, FlightPlan, Procedure
+from app.db.session import get_db, get_read_db
+from app.db.models import AiracCycle
 from app.db.session import engine
-from app.core.indexer import run_full_index
+from app.db.schema import ensure_schema
+from app.db.async_session import get_async_read_db
+from app.db.snapshot import refresh_navdata_snapshot
+from app.db.stats import get_navdata_stats, get_navdata_stats_async
+from app.utils.dbnav import latest_airac_async, navdata_version_db
+from app.utils.navgraph import publish_navgraph
+from app.core.indexer import run_full_index, lazy_procedures_enabled, backfill_procedures
+from app.services.map_cache import map_cache
+from app.services.history import rebuild_daily_stats
+from app.utils.airport_index import refresh_airport_index
+from app.utils.route_resolver import refresh_route_resolver
 
 
 router = APIRouter(prefix="/admin", tags=["admin"])
@@ -26,39 +37,48 @@ def _p(msg: str, *args):
     print(f"[INFO] {text}", flush=True)
 
 
-def _render_status(request: Request, db: Session, notice: Optional[dict] = None) -> HTMLResponse:
+def _refresh_navdata_caches(db: Session) -> None:
+    """Drop/rebuild this worker's in-memory navdata structures after the tables changed.
+
+    Other workers notice the bumped navdata version on their next read (see
+    check_navdata_snapshot and the version checks in the airport index and route resolver).
+    """
+    refresh_navdata_snapshot()
+    map_cache.clear()
+    refresh_airport_index(db)
+    refresh_route_resolver(db)
+    try:
+        publish_navgraph(db, version=navdata_version_db(db))
+    except Exception as e:
+        # The current graph carries the previous version, so planners fall back to the database
+        log.warning("Shared navgraph not published: %s", e)
+
+
+def _airac_summary(airac: Optional[AiracCycle]) -> dict:
+    return {"cycle": airac.cycle if airac else None, "name": airac.name if airac else None}
+
+
+def _status_payload(db: Session) -> dict:
+    """Latest AIRAC plus materialized counts (one-row read from navdata_stats)."""
     airac = db.query(AiracCycle).order_by(AiracCycle.id.desc()).first()
-    counts = {
-        "airports": db.query(Airport).count(),
-        "fixes": db.query(Fix).count(),
-        "airways": db.query(Airway).count(),
-        "procedures": db.query(Procedure).count(),
-        "flights": db.query(FlightPlan).count(),
-    }
+    return {"airac": _airac_summary(airac), "counts": get_navdata_stats(db)}
+
+
+def _render_status(request: Request, db: Session, notice: Optional[dict] = None) -> HTMLResponse:
     return templates(request).TemplateResponse("partials/admin_status.html", {
         "request": request,
-        "airac": {"cycle": airac.cycle if airac else None, "name": airac.name if airac else None},
-        "counts": counts,
+        **_status_payload(db),
         "notice": notice,
     })
 
 
 @router.get("/", response_class=HTMLResponse)
-def admin_page(request: Request, db: Session = Depends(get_db)):
+def admin_page(request: Request, db: Session = Depends(get_read_db)):
     log.info("Admin page opened")
     _p("Admin page opened")
-    airac = db.query(AiracCycle).order_by(AiracCycle.id.desc()).first()
-    counts = {
-        "airports": db.query(Airport).count(),
-        "fixes": db.query(Fix).count(),
-        "airways": db.query(Airway).count(),
-        "procedures": db.query(Procedure).count(),
-        "flights": db.query(FlightPlan).count(),
-    }
     return templates(request).TemplateResponse("admin.html", {
         "request": request,
-        "airac": {"cycle": airac.cycle if airac else None, "name": airac.name if airac else None},
-        "counts": counts,
+        **_status_payload(db),
     })
 
 
@@ -67,38 +87,44 @@ def init_db():
     """Create all tables if they don't exist."""
     log.info("Admin action: init tables")
     _p("Admin action: init tables")
-    Base.metadata.create_all(bind=engine)
+    ensure_schema(engine)
     return {"status": "ok"}
 
 
 @router.post("/index")
-def trigger_index(force: bool = False, db: Session = Depends(get_db)):
+def trigger_index(background_tasks: BackgroundTasks, force: bool = False, db: Session = Depends(get_db)):
     log.info("Admin action: index (force=%s)", force)
     _p("Admin action: index (force=%s)", force)
     counts = run_full_index(db, force=force)
     db.commit()
+    _refresh_navdata_caches(db)
+    if lazy_procedures_enabled():
+        background_tasks.add_task(backfill_procedures)
     _p("Admin action: index done -> %s", counts)
     return {"status": "ok", "counts": counts}
 
 
+@router.post("/history/rebuild")
+def rebuild_history(db: Session = Depends(get_db)):
+    """Recompute flight_plan_daily from flight_plans (e.g. after an upgrade or manual edits)."""
+    log.info("Admin action: rebuild history aggregates")
+    _p("Admin action: rebuild history aggregates")
+    rows = rebuild_daily_stats(db)
+    db.commit()
+    return {"status": "ok", "rows": rows}
+
+
 @router.get("/status")
-def status(db: Session = Depends(get_db)):
+async def status(db: AsyncSession = Depends(get_async_read_db)):
     log.info("Admin action: status")
     _p("Admin action: status")
-    airac = db.query(AiracCycle).order_by(AiracCycle.id.desc()).first()
-    counts = {
-        "airports": db.query(Airport).count(),
-        "fixes": db.query(Fix).count(),
-        "airways": db.query(Airway).count(),
-        "procedures": db.query(Procedure).count(),
-        "flights": db.query(FlightPlan).count(),
-    }
-    return {"airac": {"cycle": airac.cycle if airac else None, "name": airac.name if airac else None}, "counts": counts}
+    airac = await latest_airac_async(db)
+    return {"airac": _airac_summary(airac), "counts": await get_navdata_stats_async(db)}
 
 
 # HTML partial endpoints for HTMX
 @router.get("/status_view", response_class=HTMLResponse)
-def status_view(request: Request, db: Session = Depends(get_db)):
+def status_view(request: Request, db: Session = Depends(get_read_db)):
     log.info("Admin action: status_view")
     _p("Admin action: status_view")
     return _render_status(request, db, notice={"kind": "info", "text": "Status refreshed."})
@@ -108,17 +134,20 @@ def status_view(request: Request, db: Session = Depends(get_db)):
 def init_view(request: Request, db: Session = Depends(get_db)):
     log.info("Admin action: init_view")
     _p("Admin action: init_view")
-    Base.metadata.create_all(bind=engine)
+    ensure_schema(engine)
     # After init, show status
     return _render_status(request, db, notice={"kind": "success", "text": "Tables initialized successfully."})
 
 
 @router.post("/index_view", response_class=HTMLResponse)
-def index_view(request: Request, force: bool = False, db: Session = Depends(get_db)):
+def index_view(request: Request, background_tasks: BackgroundTasks, force: bool = False, db: Session = Depends(get_db)):
     log.info("Admin action: index_view (force=%s)", force)
     _p("Admin action: index_view (force=%s)", force)
     counts = run_full_index(db, force=force)
     db.commit()
+    _refresh_navdata_caches(db)
+    if lazy_procedures_enabled():
+        background_tasks.add_task(backfill_procedures)
     msg = f"Index complete (force={force}). Airports={counts.get('airports',0)} Fixes={counts.get('fixes',0)} Airways={counts.get('airways',0)} Procedures={counts.get('procedures',{})}."
     _p("Admin action: index_view done -> %s", counts)
     return _render_status(request, db, notice={"kind": "success", "text": msg})
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+import logging
+from sqlalchemy.orm import Session
+
+from app.db.session import get_read_db
+from app.services.history import history_stats, list_plans
+
+router = APIRouter(prefix="/history", tags=["history"])
+log = logging.getLogger(__name__)
+
+
+@router.get("/plans")
+def plans(origin: Optional[str] = None, dest: Optional[str] = None, aircraft: Optional[str] = None,
+          cycle: Optional[str] = None, cursor: Optional[str] = None, limit: int = 50,
+          db: Session = Depends(get_read_db)):
+    """Flight plans, newest first. Pass `next_cursor` back as `cursor` for the next page."""
+    try:
+        return list_plans(db, origin=origin, dest=dest, aircraft=aircraft, cycle=cycle, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/stats")
+def stats(days: int = 30, top: int = 10, db: Session = Depends(get_read_db)):
+    """Top city pairs, plans per day and average route length over the last `days` days."""
+    return history_stats(db, days=days, top=top)
@@ -1,22 +1,41 @@
-from fastapi import APIRouter, Request, Form
+from fastapi import APIRouter, HTTPException, Request, Form
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from datetime import datetime
+import json
 import logging
+import os
 from app.utils.airac import is_cycle_current
-from app.utils.dbnav import get_route_fix_coords_db as nav_get_route_fix_coords_db, get_airport_coords_db as nav_get_airport_coords_db, list_icaos_db as list_icaos_db
+from app.utils.route_resolver import get_route_resolver
+from app.utils.airport_index import get_airport_index, get_airport_index_async
+from app.utils.route_geometry import encode_route_geometry, decode_route_geometry, normalize_route_tokens, route_length_nm
 from app.services.fpl_builder import build_vatsim_icao_fpl
 from app.services.ops import fetch_loadsheet as svc_fetch_loadsheet, fetch_route as svc_fetch_route, fetch_metar as svc_fetch_metar
-from app.services.planner import plan_standards_route, PlannerOptions
-from app.services.maps import build_route_map_html
+from app.services.planner import plan_route_from_files, plan_standards_route_detailed, PlannerOptions
+from app.services.maps import build_route_map_html, build_route_geojson
+from app.services.map_cache import map_cache, map_cache_key
+from app.services.http_cache import TTLCache, cache_control, etag_matches, make_etag, not_modified, set_cache_headers
 from app.services.procedures import infer_sid_star
 from app.services.procedures import structure_data as proc_structure_data
 from app.services.procedures import search_in_dict_text as proc_search_text
-from app.utils.dbnav import get_procedure_texts_db as proc_get_texts_db
-from app.db.session import get_db
+from app.services.procedures import procedure_geojson as proc_geojson
+from app.utils.dbnav import (
+    get_procedure_legs_async,
+    get_procedure_texts_async,
+    navdata_version_async,
+    navdata_version_db,
+    procedure_source_async,
+)
+from app.core.indexer import ensure_procedures_indexed, lazy_procedures_enabled
+from app.db.session import get_db, get_read_db
+from app.db.async_session import get_async_read_db
+from app.db.spatial import airports_in_bbox
+from app.services.plan_writer import insert_flight_plans, new_plan_ref, plan_writer, write_behind_enabled
 from app.db.models import FlightPlan, AiracCycle
 from fastapi import Depends
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 log = logging.getLogger(__name__)
@@ -29,10 +48,11 @@ def templates(request: Request):
 def _airac_from_db(db: Session) -> dict:
     rec = db.query(AiracCycle).order_by(AiracCycle.id.desc()).first()
     if not rec:
-        return {"cycle": None, "name": None, "revision": None, "source": "missing", "is_current": False}
+        return {"cycle": None, "version": None, "name": None, "revision": None, "source": "missing", "is_current": False}
     cyc = (rec.cycle or '').strip()
     return {
         "cycle": cyc or None,
+        "version": f"{cyc}.{int(rec.generation or 0)}",
         "name": rec.name,
         "revision": rec.revision,
         "source": "db",
@@ -47,7 +67,7 @@ DEFAULT_FL_END = "350"
 
 
 @router.get("/", response_class=HTMLResponse)
-def index(request: Request, db: Session = Depends(get_db)):
+def index(request: Request, db: Session = Depends(get_read_db)):
     log.info("Page opened: / (planner)")
     airac = _airac_from_db(db)
     return templates(request).TemplateResponse(
@@ -70,9 +90,10 @@ def plan_route(request: Request,
                fl_start: str = Form(DEFAULT_FL_START),
                fl_end: str = Form(DEFAULT_FL_END),
                use_internal_planner: Optional[str] = Form(None),
-               db: Session = Depends(get_db)):
+               db: Session = Depends(get_db),
+               rdb: Session = Depends(get_read_db)):
     log.info("Action: plan route origin=%s dest=%s plane=%s fl=[%s,%s]", origin, dest, plane, fl_start, fl_end)
-    airac = _airac_from_db(db)
+    airac = _airac_from_db(rdb)
     origin_u = (origin or '').strip().upper()
     dest_u = (dest or '').strip().upper()
     try:
@@ -85,11 +106,12 @@ def plan_route(request: Request,
     blk = (parsed.get('times', {}) or {}).get('block_time')
     endurance = (parsed.get('times', {}) or {}).get('time_to_empty')
     tc_val = (parsed.get('flight', {}) or {}).get('tc')
+    geom_points = None
     try:
         cyc = (airac.get('cycle') or '').strip()
         cycle_val = int(cyc) if cyc.isdigit() else 2501
         if use_internal_planner:
-            # Use DB-backed internal planner
+            # Internal planner, on the indexed database or straight on the navdata files
             try:
                 fl_lo = int(fl_start)
                 fl_hi = int(fl_end)
@@ -97,8 +119,13 @@ def plan_route(request: Request,
                 fl_lo, fl_hi = 250, 350
             if fl_lo > fl_hi:
                 fl_lo, fl_hi = fl_hi, fl_lo
-            opts = PlannerOptions(origin=origin_u, dest=dest_u, fl_start=fl_lo, fl_end=fl_hi)
-            route_list, route_text = plan_standards_route(db, opts)
+            opts = PlannerOptions(origin=origin_u, dest=dest_u, fl_start=fl_lo, fl_end=fl_hi, corridor_nm=_planner_corridor_nm())
+            if _planner_source() == "files":
+                planned = plan_route_from_files(opts)
+            else:
+                planned = plan_standards_route_detailed(rdb, opts)
+            route_list, route_text = planned.route_list, planned.route_text
+            geom_points = planned.points
         else:
             route_list, route_text = svc_fetch_route(origin_u, dest_u, fl_start, fl_end, cycle_val)
     except Exception as e:
@@ -170,9 +197,25 @@ def plan_route(request: Request,
         per="C",
         rmk="",
     )
-    # Persist flight plan (best-effort)
+    # Resolve geometry once here so map/distance requests for this plan need no navdata lookups
+    geometry = None
+    distance_nm = None
+    try:
+        apt_coords = get_airport_index(rdb)
+        if geom_points is None and route_list:
+            geom_points, _ = _resolve_route_points(rdb, route_text, apt_coords, origin_u)
+        if geom_points:
+            geometry = encode_route_geometry(geom_points, route_text, apt_coords.get(origin_u), apt_coords.get(dest_u))
+            distance_nm = route_length_nm(geom_points)
+    except Exception as e:
+        log.warning("Could not resolve route geometry: %s", e)
+    # Persist flight plan (best-effort). Normally queued to the write-behind
+    # writer so the request never waits on a commit; plans are addressed by ref.
+    plan_ref = new_plan_ref()
     try:
-        fp = FlightPlan(
+        row = dict(
+            ref=plan_ref,
+            created_at=datetime.utcnow(),
             origin=origin_u,
             dest=dest_u,
             aircraft=plane,
@@ -183,12 +226,16 @@ def plan_route(request: Request,
             route_list=route_str,
             sid_text=sid_text,
             star_text=star_text,
+            geometry=geometry,
+            distance_nm=distance_nm,
         )
-        db.add(fp)
-        db.commit()
+        if not (write_behind_enabled() and plan_writer.submit(row)):
+            insert_flight_plans(db, [row])
+            db.commit()
     except Exception:
         # ignore DB errors
-        pass
+        db.rollback()
+        plan_ref = None
 
     return templates(request).TemplateResponse("result.html", {
         "request": request,
@@ -214,112 +261,287 @@ def plan_route(request: Request,
         "altitude_rule": rule_label,
         "route_direction": direction_label,
         "route_map": "",
+        "plan_ref": plan_ref,
         "aircraft_options": AIRCRAFT_OPTIONS,
         "default_fl_start": DEFAULT_FL_START,
         "default_fl_end": DEFAULT_FL_END,
     })
 
 
+def _planner_corridor_nm() -> Optional[float]:
+    # Limit the planner's airway graph to a box around the great-circle path (off by default)
+    try:
+        nm = float(os.getenv("PLANNER_CORRIDOR_NM", "0"))
+    except ValueError:
+        return None
+    return nm if nm > 0 else None
+
+
+def _planner_source() -> str:
+    # 'db' plans on the indexed tables; 'files' reads DATA_PATH directly (no index run needed)
+    return os.getenv("PLANNER_SOURCE", "db").strip().lower()
+
+
+def _map_renderer(renderer: str) -> str:
+    # 'client' renders GeoJSON with Leaflet in the browser; 'folium' is the server-side fallback
+    r = (renderer or os.getenv("MAP_RENDERER", "client")).strip().lower()
+    return r if r in ("client", "folium") else "client"
+
+
+def _resolve_route_points(db: Session, items: str, apt_coords, origin_u: str):
+    """Resolve a route string (expanding airways) into points and unresolved tokens."""
+    resolved = get_route_resolver(db).resolve(items, origin=apt_coords.get(origin_u))
+    return resolved.points, resolved.unresolved
+
+
+def _stored_geometry(db: Session, plan_ref: str, items: str) -> Optional[dict]:
+    """Geometry saved with a flight plan, if the route tokens were not edited since."""
+    ref = (plan_ref or '').strip()
+    if not ref:
+        return None
+    queued = plan_writer.pending(ref)
+    if queued is not None:
+        text = queued.get("geometry")
+    else:
+        row = db.query(FlightPlan.geometry).filter(FlightPlan.ref == ref).first()
+        text = row[0] if row else None
+    geom = decode_route_geometry(text)
+    if geom is None or geom["route_tokens"] != normalize_route_tokens(items):
+        return None
+    return geom
+
+
+def _stored_airports(geom: dict, origin_u: str, dest_u: str) -> dict:
+    apt = {}
+    if geom.get("origin"):
+        apt[origin_u] = geom["origin"]
+    if geom.get("dest"):
+        apt[dest_u] = geom["dest"]
+    return apt
+
+
+def _route_geojson(db: Session, items: str, origin_u: str, dest_u: str, plan_ref: str = "") -> dict:
+    geom = _stored_geometry(db, plan_ref, items)
+    if geom is not None:
+        geojson = build_route_geojson(geom["points"], _stored_airports(geom, origin_u, dest_u), origin_u, dest_u, False)
+        geojson["unresolved"] = []
+        return geojson
+    return _route_geojson_cached(db, items, origin_u, dest_u)
+
+
+def _route_geojson_cached(db: Session, items: str, origin_u: str, dest_u: str) -> dict:
+    key = map_cache_key("geojson", items, origin_u, dest_u, None, navdata_version_db(db))
+    hit = map_cache.get(key)
+    if hit is not None:
+        return json.loads(hit[0])
+    apt_coords = get_airport_index(db)
+    coords, unresolved = _resolve_route_points(db, items, apt_coords, origin_u)
+    route_indicates_none = 'no route generated' in items.lower()
+    geojson = build_route_geojson(coords, apt_coords, origin_u, dest_u, route_indicates_none)
+    geojson["unresolved"] = unresolved
+    map_cache.put(key, json.dumps(geojson, separators=(",", ":")), geojson["total_distance_nm"])
+    return geojson
+
+
 @router.post("/route_map", response_class=HTMLResponse)
-def route_map(request: Request, items: str = Form(""), origin: str = Form(""), dest: str = Form(""), theme: str = Form("auto"), db: Session = Depends(get_db)):
+def route_map(request: Request, items: str = Form(""), origin: str = Form(""), dest: str = Form(""), theme: str = Form("auto"), renderer: str = Form(""), plan_ref: str = Form(""), db: Session = Depends(get_read_db)):
     log.info("Action: build route map origin=%s dest=%s items_len=%d theme=%s", origin, dest, len(items or ''), theme)
     items = (items or "").strip()
     origin_u = (origin or '').strip().upper()
     dest_u = (dest or '').strip().upper()
-    coords = nav_get_route_fix_coords_db(db, items)
-    apt_coords = nav_get_airport_coords_db(db)
-    route_indicates_none = 'no route generated' in items.lower()
-    html, total_distance_nm = build_route_map_html(coords, apt_coords, origin_u, dest_u, route_indicates_none, theme)
+    if _map_renderer(renderer) == "client":
+        geojson = _route_geojson(db, items, origin_u, dest_u, plan_ref)
+        return templates(request).TemplateResponse("partials/route_map.html", {
+            "request": request,
+            "geojson": geojson,
+            "total_distance_nm": f"{geojson['total_distance_nm']:.1f}",
+            "unresolved": geojson.get("unresolved") or [],
+        })
+    geom = _stored_geometry(db, plan_ref, items)
+    if geom is not None:
+        html, total_distance_nm = build_route_map_html(geom["points"], _stored_airports(geom, origin_u, dest_u), origin_u, dest_u, False, theme)
+        return templates(request).TemplateResponse("partials/route_map.html", {"request": request, "html": html, "total_distance_nm": f"{total_distance_nm:.1f}"})
+    key = map_cache_key("folium", items, origin_u, dest_u, theme, navdata_version_db(db))
+    hit = map_cache.get(key)
+    if hit is not None:
+        html, total_distance_nm = hit
+    else:
+        apt_coords = get_airport_index(db)
+        coords, _ = _resolve_route_points(db, items, apt_coords, origin_u)
+        route_indicates_none = 'no route generated' in items.lower()
+        html, total_distance_nm = build_route_map_html(coords, apt_coords, origin_u, dest_u, route_indicates_none, theme)
+        map_cache.put(key, html, total_distance_nm)
     return templates(request).TemplateResponse("partials/route_map.html", {"request": request, "html": html, "total_distance_nm": f"{total_distance_nm:.1f}"})
 
 
+@router.post("/route_geojson")
+def route_geojson(items: str = Form(""), origin: str = Form(""), dest: str = Form(""), plan_ref: str = Form(""), db: Session = Depends(get_read_db)):
+    """Route geometry as GeoJSON (fixes, route line with leg distances, airport connectors)."""
+    return _route_geojson(db, (items or "").strip(), (origin or '').strip().upper(), (dest or '').strip().upper(), plan_ref)
+
+
+# Cache lifetimes for GET responses validated by navdata-version ETags
+SUGGEST_MAX_AGE = 86400  # suggestion URLs carry the navdata version, see index.html
+NAVDATA_MAX_AGE = 300
+METAR_TTL = int(os.getenv("METAR_TTL_S", "120"))
+
+_metar_cache: TTLCache[str] = TTLCache(METAR_TTL)
+
+
+@router.get("/airports_bbox")
+def airports_bbox(request: Request, bbox: str, limit: int = 500, db: Session = Depends(get_read_db)):
+    """Airports inside bbox=west,south,east,north (Leaflet toBBoxString order) as GeoJSON points."""
+    try:
+        west, south, east, north = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be west,south,east,north")
+    limit = max(1, min(int(limit or 500), 2000))
+    etag = make_etag("airports_bbox", navdata_version_db(db), west, south, east, north, limit)
+    cache = cache_control(NAVDATA_MAX_AGE)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache)
+    rows = airports_in_bbox(db, (south, west, north, east), limit=limit)
+    return set_cache_headers(JSONResponse({
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [round(lon, 5), round(lat, 5)]},
+             "properties": {"kind": "airport", "name": icao}}
+            for icao, lat, lon in rows
+        ],
+    }), etag, cache)
+
+
 @router.post("/route_map_close", response_class=HTMLResponse)
 def route_map_close():
     return ""
 
 
 @router.get("/icao_suggest", response_class=HTMLResponse)
-def icao_suggest(request: Request, q: str = "", origin: str = "", dest: str = "", limit: int = 20, mode: str = "options", input_id: str = "", target_id: str = "", db: Session = Depends(get_db)):
-    # No helper needed here
+async def icao_suggest(request: Request, q: str = "", origin: str = "", dest: str = "", limit: int = 20, mode: str = "options", input_id: str = "", target_id: str = "", v: str = "", db: AsyncSession = Depends(get_async_read_db)):
     query = (q or origin or dest or "").strip()
-    # If query is empty, return empty menus/options depending on mode
-    if not query:
-        if mode == "menu":
-            return templates(request).TemplateResponse("partials/icao_menu.html", {
-                "request": request,
-                "codes": [],
-                "q": query,
-                "input_id": input_id,
-                "target_id": target_id,
-            })
-        else:
-            return templates(request).TemplateResponse("partials/icao_options.html", {
-                "request": request,
-                "codes": [],
-            })
-
-    # Non-empty query: list codes and render appropriate partial
-    codes = list_icaos_db(db, query, limit)
+    version = await navdata_version_async(db)
+    # Long-lived only when the URL carries the current navdata version (cycle and index generation)
+    versioned = bool(v and version and v == version)
+    cache = cache_control(SUGGEST_MAX_AGE, immutable=True) if versioned else cache_control(60)
+    etag = make_etag("suggest", version, query.upper(), limit, mode, input_id, target_id)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache)
+    idx = await get_airport_index_async(db)
+    suggestions = idx.suggest(query, limit) if query else []
     if mode == "menu":
-        return templates(request).TemplateResponse("partials/icao_menu.html", {
+        resp = templates(request).TemplateResponse("partials/icao_menu.html", {
             "request": request,
-            "codes": codes,
+            "suggestions": suggestions,
             "q": query,
             "input_id": input_id,
             "target_id": target_id,
         })
     else:
-        return templates(request).TemplateResponse("partials/icao_options.html", {
+        resp = templates(request).TemplateResponse("partials/icao_options.html", {
             "request": request,
-            "codes": codes,
+            "suggestions": suggestions,
         })
+    return set_cache_headers(resp, etag, cache)
 
 
 @router.get("/metar", response_class=HTMLResponse)
 def get_metar(request: Request, icao: str):
     log.info("Action: get METAR %s", icao)
-    try:
-        icao_u = (icao or '').strip().upper()
-        metar = svc_fetch_metar(icao_u) or "No METAR found."
-    except Exception as e:
-        metar = f"Error: {e}"
-    return templates(request).TemplateResponse("partials/metar_block.html", {
+    icao_u = (icao or '').strip().upper()
+    metar = _metar_cache.get(icao_u)
+    cacheable = True
+    if metar is None:
+        try:
+            metar = svc_fetch_metar(icao_u) or "No METAR found."
+            _metar_cache.put(icao_u, metar)
+        except Exception as e:
+            metar = f"Error: {e}"
+            cacheable = False
+    if not cacheable:
+        return templates(request).TemplateResponse("partials/metar_block.html", {
+            "request": request,
+            "icao": icao_u,
+            "metar": metar,
+        })
+    etag = make_etag("metar", icao_u, metar)
+    cache = cache_control(METAR_TTL)
+    if etag_matches(request, etag):
+        return not_modified(etag, cache)
+    return set_cache_headers(templates(request).TemplateResponse("partials/metar_block.html", {
         "request": request,
         "icao": icao_u,
         "metar": metar,
-    })
+    }), etag, cache)
 
 
-@router.post("/search_sid", response_class=HTMLResponse)
-def search_sid(request: Request, origin: str = Form(...), fix: str = Form(""), db: Session = Depends(get_db)):
-    origin_u = (origin or '').strip().upper()
+async def _ensure_procedures(icao: str) -> None:
+    """Lazy CIFP indexing writes, so it runs on a sync session in the thread pool."""
+    if not lazy_procedures_enabled():
+        return
+    await run_in_threadpool(ensure_procedures_indexed, icao)
+
+
+async def _procedure_block(request: Request, db: AsyncSession, icao: str, fix: str, kind: str, *, conditional: bool) -> HTMLResponse:
+    icao_u = (icao or '').strip().upper()
+    q = (fix or '').strip().upper()
+    template, airport_key, text_key = (
+        ("partials/sid_block.html", "origin", "sid_text") if kind == 'SID'
+        else ("partials/star_block.html", "dest", "star_text")
+    )
+    etag = cache = None
     try:
-        sid_dict = proc_get_texts_db(db, origin_u, kind='SID')
-        q = (fix or '').strip().upper()
-        sid_text = proc_search_text(sid_dict, q)
+        # Before the conditional check, so a changed CIFP file is re-indexed in lazy mode
+        await _ensure_procedures(icao_u)
+        if conditional:
+            # The airport's CIFP hash changes the ETag when only that airport was (lazily) re-indexed
+            etag = make_etag("procedures", kind, await navdata_version_async(db), await procedure_source_async(db, icao_u), icao_u, q)
+            cache = cache_control(NAVDATA_MAX_AGE)
+            if etag_matches(request, etag):
+                return not_modified(etag, cache)
+        proc_dict = await get_procedure_texts_async(db, icao_u, kind=kind)
+        proc_text = proc_search_text(proc_dict, q)
     except Exception as e:
-        sid_text = f"Error: {e}"
-    return templates(request).TemplateResponse("partials/sid_block.html", {
+        proc_text = f"Error: {e}"
+        etag = None
+    resp = templates(request).TemplateResponse(template, {
         "request": request,
-        "origin": origin_u,
-        "sid_text": sid_text,
+        airport_key: icao_u,
+        text_key: proc_text,
     })
+    return set_cache_headers(resp, etag, cache) if etag else resp
+
+
+@router.post("/search_sid", response_class=HTMLResponse)
+async def search_sid(request: Request, origin: str = Form(...), fix: str = Form(""), db: AsyncSession = Depends(get_async_read_db)):
+    return await _procedure_block(request, db, origin, fix, 'SID', conditional=False)
+
+
+@router.get("/search_sid", response_class=HTMLResponse)
+async def search_sid_get(request: Request, origin: str, fix: str = "", db: AsyncSession = Depends(get_async_read_db)):
+    """Cacheable variant used by the result page (ETag keyed on the navdata version)."""
+    return await _procedure_block(request, db, origin, fix, 'SID', conditional=True)
 
 
 @router.post("/search_star", response_class=HTMLResponse)
-def search_star(request: Request, dest: str = Form(...), fix: str = Form(""), db: Session = Depends(get_db)):
-    dest_u = (dest or '').strip().upper()
-    try:
-        star_dict = proc_get_texts_db(db, dest_u, kind='STAR')
-        q = (fix or '').strip().upper()
-        star_text = proc_search_text(star_dict, q)
-    except Exception as e:
-        star_text = f"Error: {e}"
-    return templates(request).TemplateResponse("partials/star_block.html", {
-        "request": request,
-        "dest": dest_u,
-        "star_text": star_text,
-    })
+async def search_star(request: Request, dest: str = Form(...), fix: str = Form(""), db: AsyncSession = Depends(get_async_read_db)):
+    return await _procedure_block(request, db, dest, fix, 'STAR', conditional=False)
+
+
+@router.get("/search_star", response_class=HTMLResponse)
+async def search_star_get(request: Request, dest: str, fix: str = "", db: AsyncSession = Depends(get_async_read_db)):
+    return await _procedure_block(request, db, dest, fix, 'STAR', conditional=True)
+
+
+@router.get("/procedure_geojson")
+async def procedure_geojson(icao: str, kind: str = "SID", name: str = "", transition: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db)):
+    """SID/STAR geometry from the stored legs: one LineString (with length_nm) per transition."""
+    kind_u = (kind or '').strip().upper()
+    if kind_u not in ("SID", "STAR"):
+        raise HTTPException(status_code=400, detail="kind must be SID or STAR")
+    icao_u = (icao or '').strip().upper()
+    await _ensure_procedures(icao_u)
+    legs = await get_procedure_legs_async(db, icao_u, kind=kind_u, name=(name or '').strip() or None, transition=transition)
+    return proc_geojson(legs)
 
 
 @router.get("/health")
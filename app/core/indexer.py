@@ -1,15 +1,39 @@
 from __future__ import annotations
 
+import io
 import os
 import logging
-from typing import Optional
+import threading
+from datetime import datetime
+from typing import Iterable, Optional
 
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import insert, text, update
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
 
-from app.db.models import AiracCycle, Airport, Fix, Airway, Procedure
+from app.db.spatial import rebuild_spatial_index
+from app.db.stats import refresh_navdata_stats
+from app.db.models import AiracCycle, Airport, Fix, Airway, Procedure, ProcedureLeg, SourceFile
 from app.utils.airac import read_cycle_json
-from app.utils.navdata import load_airport_coords, load_fix_index
+from app.utils.cifp import (
+    LEG_COLUMNS,
+    FixCandidates,
+    ParsedCifp,
+    iter_parsed_cifp,
+    parse_procedure_file,
+    parsed_cifp,
+    resolve_leg_fix,
+)
+from app.utils.compiled_navdata import compiled_navdata_enabled, ensure_compiled_navdata
+from app.utils.navdata import (
+    airport_meta_path,
+    apt_dat_path,
+    airway_records,
+    fix_records,
+    load_airport_coords,
+    load_airport_names,
+)
+from app.utils.navfiles import CifpMember, CifpSource, cifp_source, content_sha1, data_file, data_sha1
 
 log = logging.getLogger(__name__)
 
@@ -43,17 +67,29 @@ def upsert_airac(db: Session) -> Optional[AiracCycle]:
     return cur
 
 
+def _bump_generation(db: Session, airac: Optional[AiracCycle]) -> None:
+    """Mark the navdata as changed within its cycle, so ETags and other workers' caches
+    keyed on dbnav.navdata_version stop matching once this transaction commits."""
+    rec = airac or db.query(AiracCycle).order_by(AiracCycle.id.desc()).first()
+    if rec is not None:
+        rec.generation = (rec.generation or 0) + 1
+
+
 def index_airports(db: Session) -> int:
     coords = load_airport_coords() or {}
-    _info("Airports: %d entries loaded from files", len(coords))
+    names = load_airport_names()
+    _info("Airports: %d entries loaded from files (%d names)", len(coords), len(names))
     added = 0
     for icao, (lat, lon) in coords.items():
+        name = (names.get(icao) or '')[:128] or None
         rec = db.query(Airport).filter(Airport.icao == icao).one_or_none()
         if rec:
             rec.lat = lat
             rec.lon = lon
+            if name:
+                rec.name = name
         else:
-            db.add(Airport(icao=icao, lat=lat, lon=lon))
+            db.add(Airport(icao=icao, lat=lat, lon=lon, name=name))
             added += 1
     _info("Airports: %d added (others updated)", added)
     return added
@@ -61,57 +97,41 @@ def index_airports(db: Session) -> int:
 
 def index_fixes(db: Session) -> int:
     # Full parse of earth_fix.dat to ensure multiple (ident, country) variants are captured
-    path = os.path.join(_data_path(), "earth_fix.dat")
+    path = data_file("earth_fix.dat")
+    if not path:
+        _info("Fixes: file not found: %s", os.path.join(_data_path(), "earth_fix.dat"))
+        return 0
     added = 0
     seen: set[tuple[str, Optional[str], float, float]] = set()
-    try:
-        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith(';'):
-                    continue
-                parts = line.split()
-                if len(parts) < 3:
-                    continue
-                try:
-                    lat = float(parts[0]); lon = float(parts[1])
-                    ident = parts[2].upper()
-                except Exception:
-                    continue
-                usage = (parts[3].strip().upper() if len(parts) > 3 else None)
-                country = (parts[4].strip().upper() if len(parts) > 4 else None)
-                dbid = (parts[5].strip() if len(parts) > 5 else None)
-                name = (parts[6].strip() if len(parts) > 6 else None)
-                key = (ident, country, lat, lon)
-                if key in seen:
-                    continue
-                # avoid duplicates in DB
-                exists = (
-                    db.query(Fix)
-                    .filter(
-                        Fix.ident == ident,
-                        Fix.country == country,
-                        Fix.lat == lat,
-                        Fix.lon == lon,
-                    )
-                    .one_or_none()
-                )
-                if exists:
-                    # Optionally refresh metadata
-                    exists.usage = usage
-                    exists.dbid = dbid
-                    exists.name = name
-                    continue
-                try:
-                    db.add(Fix(ident=ident, usage=usage, country=country, lat=lat, lon=lon, dbid=dbid, name=name))
-                    db.flush()
-                    added += 1
-                    seen.add(key)
-                except IntegrityError:
-                    db.rollback()
-                    continue
-    except FileNotFoundError:
-        _info("Fixes: file not found: %s", path)
+    for ident, usage, country, lat, lon, dbid, name in fix_records():
+        key = (ident, country, lat, lon)
+        if key in seen:
+            continue
+        # avoid duplicates in DB
+        exists = (
+            db.query(Fix)
+            .filter(
+                Fix.ident == ident,
+                Fix.country == country,
+                Fix.lat == lat,
+                Fix.lon == lon,
+            )
+            .one_or_none()
+        )
+        if exists:
+            # Optionally refresh metadata
+            exists.usage = usage
+            exists.dbid = dbid
+            exists.name = name
+            continue
+        try:
+            db.add(Fix(ident=ident, usage=usage, country=country, lat=lat, lon=lon, dbid=dbid, name=name))
+            db.flush()
+            added += 1
+            seen.add(key)
+        except IntegrityError:
+            db.rollback()
+            continue
     _info("Fixes: %d added", added)
     return added
 
@@ -122,6 +142,9 @@ def run_full_index(db: Session, *, force: bool = False) -> dict:
     data = read_cycle_json()
     json_cycle = str(data.get("cycle", "")).strip() if data else None
     existing = db.query(AiracCycle).filter(AiracCycle.cycle == (json_cycle or "")).one_or_none() if json_cycle else None
+    if existing and not force and incremental_index_enabled():
+        # Same cycle (e.g. a revision): only re-process files whose content changed
+        return run_incremental_index(db)
     if existing and not force:
         _info("Index skipped: AIRAC unchanged (cycle=%s).", json_cycle)
         return {
@@ -135,22 +158,55 @@ def run_full_index(db: Session, *, force: bool = False) -> dict:
         }
 
     if force:
-        _info("Force reindex: clearing airports/fixes/airways/procedures")
+        _info("Force reindex: clearing airports/fixes/airways/procedures/legs")
         db.query(Airway).delete()
+        db.query(ProcedureLeg).delete()
         db.query(Procedure).delete()
         db.query(Fix).delete()
         db.query(Airport).delete()
+        db.query(SourceFile).filter(SourceFile.kind.in_(("cifp", "navdata"))).delete(synchronize_session=False)
 
-    upsert_airac(db)
-    airports_added = index_airports(db)
-    fixes_added = index_fixes(db)
-    # Ensure Fixes are visible to subsequent queries
-    try:
-        db.flush()
-    except Exception:
-        pass
-    airways_added = index_airways(db)
-    procs_counts = index_procedures(db)
+    airac = upsert_airac(db)
+    if compiled_navdata_enabled():
+        # Parse the text files once; the loaders below read the compiled arrays
+        try:
+            nav = ensure_compiled_navdata()
+            if nav is not None:
+                _info("Compiled navdata: %s", nav.path)
+        except Exception as e:
+            _info("Compiled navdata not written (%s); parsing text files", e)
+    lazy = lazy_procedures_enabled()
+    if pg_copy_enabled(db):
+        _info("Postgres: bulk loading via COPY")
+        loaded = pg_copy_index(db, procedures=not lazy)
+        airports_added = loaded["airports"]
+        fixes_added = loaded["fixes"]
+        airways_added = loaded["airways"]
+    else:
+        airports_added = index_airports(db)
+        fixes_added = index_fixes(db)
+        # Ensure Fixes are visible to subsequent queries
+        try:
+            db.flush()
+        except Exception:
+            pass
+        airways_added = index_airways(db)
+    spatial = rebuild_spatial_index(db)
+    if spatial:
+        _info("Spatial index: %s", spatial)
+    if lazy:
+        # Airports are indexed on first request and by the background backfill
+        _info("Procedures: lazy mode, deferring CIFP indexing")
+        _prepare_lazy_cifp()
+        procs_counts = {"sids": 0, "stars": 0, "deferred": True}
+    elif pg_copy_enabled(db):
+        procs_counts = loaded["procedures"]
+    else:
+        procs_counts = index_procedures(db)
+    refresh_navdata_stats(db, ("airports", "fixes", "airways", "procedures"))
+    _bump_generation(db, airac)
+    # Baseline for the next incremental run (CIFP hashes are recorded as files are indexed)
+    _record_navdata_sources(db)
 
     out = {
         "airac": 1 if json_cycle else 0,
@@ -169,38 +225,12 @@ def _data_path() -> str:
 
 
 def index_airways(db: Session) -> int:
-    path = os.path.join(_data_path(), "earth_awy.dat")
-    if not os.path.isfile(path):
-        _info("Airways: file not found: %s", path)
+    path = data_file("earth_awy.dat")
+    if not path:
+        _info("Airways: file not found: %s", os.path.join(_data_path(), "earth_awy.dat"))
         return 0
     _info("Airways: reading %s", path)
 
-    def parse_line(raw: str):
-        raw = raw.strip()
-        if not raw or raw.startswith(";"):
-            return None
-        parts = raw.split()
-        if len(parts) < 11:
-            return None
-        try:
-            if len(parts) >= 13:
-                fix1 = parts[0].upper(); fix1_cc = parts[1].upper()
-                fix2 = parts[4].upper(); fix2_cc = parts[5].upper()
-                direction = parts[8].upper()
-                route_class = int(parts[9]); lower_fl = int(parts[10]); upper_fl = int(parts[11])
-                airway_name = parts[12].upper()
-            else:
-                fix1 = parts[0].upper(); fix1_cc = parts[1].upper()
-                fix2 = parts[3].upper(); fix2_cc = parts[4].upper()
-                direction = parts[6].upper()
-                route_class = int(parts[7]); lower_fl = int(parts[8]); upper_fl = int(parts[9])
-                airway_name = parts[10].upper()
-        except Exception:
-            return None
-        if direction not in ("N", "P", "M"):
-            return None
-        return (fix1, fix1_cc, fix2, fix2_cc, direction, route_class, lower_fl, upper_fl, airway_name)
-
     def find_fix(ident: str, country: Optional[str]):
         rows = db.query(Fix).filter(Fix.ident == ident).all()
         if not rows:
@@ -221,122 +251,895 @@ def index_airways(db: Session) -> int:
     total = 0
     resolved = 0
     miss_samples: list[tuple[str, str]] = []
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for raw in f:
-            parsed = parse_line(raw)
-            if not parsed:
-                continue
-            total += 1
-            fix1, fix1_cc, fix2, fix2_cc, direction, route_class, lower_fl, upper_fl, airway_name = parsed
-            f1 = find_fix(fix1, fix1_cc)
-            f2 = find_fix(fix2, fix2_cc)
-            if not f1 or not f2:
-                if len(miss_samples) < 5:
-                    miss_samples.append((f"{fix1}@{fix1_cc}", f"{fix2}@{fix2_cc}"))
-                continue
-            resolved += 1
-            # avoid duplicates across runs
-            exists = (
-                db.query(Airway)
-                .filter(
-                    Airway.name == airway_name,
-                    Airway.fix1_id == f1.id,
-                    Airway.fix2_id == f2.id,
-                    Airway.direction == direction,
-                    Airway.route_class == route_class,
-                    Airway.lower_fl == lower_fl,
-                    Airway.upper_fl == upper_fl,
-                )
-                .one_or_none()
+    for parsed in airway_records():
+        total += 1
+        fix1, fix1_cc, fix2, fix2_cc, direction, route_class, lower_fl, upper_fl, airway_name = parsed
+        f1 = find_fix(fix1, fix1_cc)
+        f2 = find_fix(fix2, fix2_cc)
+        if not f1 or not f2:
+            if len(miss_samples) < 5:
+                miss_samples.append((f"{fix1}@{fix1_cc}", f"{fix2}@{fix2_cc}"))
+            continue
+        resolved += 1
+        # avoid duplicates across runs
+        exists = (
+            db.query(Airway)
+            .filter(
+                Airway.name == airway_name,
+                Airway.fix1_id == f1.id,
+                Airway.fix2_id == f2.id,
+                Airway.direction == direction,
+                Airway.route_class == route_class,
+                Airway.lower_fl == lower_fl,
+                Airway.upper_fl == upper_fl,
             )
-            if exists:
-                continue
-            try:
-                db.add(
-                    Airway(
-                        name=airway_name,
-                        fix1_id=f1.id,
-                        fix2_id=f2.id,
-                        direction=direction,
-                        route_class=route_class,
-                        lower_fl=lower_fl,
-                        upper_fl=upper_fl,
-                    )
+            .one_or_none()
+        )
+        if exists:
+            continue
+        try:
+            db.add(
+                Airway(
+                    name=airway_name,
+                    fix1_id=f1.id,
+                    fix2_id=f2.id,
+                    direction=direction,
+                    route_class=route_class,
+                    lower_fl=lower_fl,
+                    upper_fl=upper_fl,
                 )
-                db.flush()
-                added += 1
-            except IntegrityError:
-                db.rollback()
-                continue
+            )
+            db.flush()
+            added += 1
+        except IntegrityError:
+            db.rollback()
+            continue
     _info("Airways: parsed=%d resolved=%d added segments=%d", total, resolved, added)
     if added == 0 and miss_samples:
         _info("Airways: sample unresolved pairs: %s", miss_samples)
     return added
 
 
-def index_procedures(db: Session, *, limit_icaos: Optional[int] = None) -> dict:
-    base = os.path.join(_data_path(), "CIFP")
-    root = base if os.path.isdir(base) else _data_path()
-    try:
-        files = [f for f in os.listdir(root) if f.lower().endswith('.dat')]
-    except Exception:
-        files = []
-    files.sort()
+def _fix_candidates(db: Session, idents: Optional[Iterable[str]] = None) -> FixCandidates:
+    """Map IDENT -> [(country, usage, lat, lon), ...] for all (or the given) fixes."""
+    query = db.query(Fix.ident, Fix.country, Fix.usage, Fix.lat, Fix.lon)
+    if idents is not None:
+        wanted = list({i for i in idents if i})
+        if not wanted:
+            return {}
+        query = query.filter(Fix.ident.in_(wanted))
+    out: FixCandidates = {}
+    for ident, country, usage, lat, lon in query.all():
+        out.setdefault(ident.upper(), []).append(((country or '').upper(), (usage or '').upper(), float(lat), float(lon)))
+    return out
+
+
+def _index_procedure_file(db: Session, icao: str, data: bytes, digest: str) -> tuple[int, int]:
+    """Parse one CIFP file's content (whose SHA-1 is `digest`) and store its procedures and
+    typed legs, resolving only the fixes this file references. Returns (sids, stars) added."""
+    routes, legs = parse_procedure_file(data)
+    cands = _fix_candidates(db, (leg.fix_ident for leg in legs))
+    apt = db.query(Airport.lat, Airport.lon).filter(Airport.icao == icao).one_or_none()
+    ref = (float(apt[0]), float(apt[1])) if apt else None
+    return _write_procedures(db, [parsed_cifp(icao, digest, routes, legs, cands, ref)])
+
+
+def _write_procedures(db: Session, batch: list[ParsedCifp], *, prune: bool = False) -> tuple[int, int]:
+    """Upsert the procedures and replace the legs of a batch of parsed files, with one
+    query per table instead of one per procedure. With `prune`, procedures of these
+    airports that are no longer in their file are deleted. Returns (sids, stars) added."""
+    if not batch:
+        return 0, 0
+    icaos = [p.icao for p in batch]
+    existing = {
+        (icao, proc_type, name, start): pid
+        for pid, icao, proc_type, name, start in db.query(
+            Procedure.id, Procedure.icao, Procedure.proc_type, Procedure.name, Procedure.start
+        ).filter(Procedure.icao.in_(icaos))
+    }
+    updates: list[dict] = []
+    inserts: list[dict] = []
+    cnt_sid = 0
+    cnt_star = 0
+    for p in batch:
+        for proc_type, name, start, route in p.routes:
+            pid = existing.pop((p.icao, proc_type, name, start), None)
+            if pid is not None:
+                updates.append({"id": pid, "route": route})
+                continue
+            inserts.append({"icao": p.icao, "proc_type": proc_type, "name": name, "start": start, "route": route})
+            if proc_type == 'SID':
+                cnt_sid += 1
+            elif proc_type == 'STAR':
+                cnt_star += 1
+    if updates:
+        db.execute(update(Procedure), updates)
+    if inserts:
+        db.execute(insert(Procedure), inserts)
+    if prune and existing:
+        # Whatever is left in `existing` was not in the new files
+        for ids in _in_chunks(list(existing.values())):
+            db.query(Procedure).filter(Procedure.id.in_(ids)).delete(synchronize_session=False)
+    db.query(ProcedureLeg).filter(ProcedureLeg.icao.in_(icaos)).delete(synchronize_session=False)
+    legs = [dict(zip(LEG_COLUMNS, row)) for p in batch for row in p.legs]
+    if legs:
+        # Core insert on the table: executemany without ORM bookkeeping per row
+        db.execute(ProcedureLeg.__table__.insert(), legs)
+    return cnt_sid, cnt_star
+
+
+def _record_source(db: Session, kind: str, name: str, mtime: float, size: int, sha1: str) -> None:
+    rec = db.query(SourceFile).filter(SourceFile.kind == kind, SourceFile.name == name).one_or_none()
+    if rec is None:
+        rec = SourceFile(kind=kind, name=name)
+        db.add(rec)
+    rec.mtime = mtime
+    rec.size = size
+    rec.sha1 = sha1
+    rec.indexed_at = datetime.utcnow()
+
+
+def _cifp_icaos(members: dict[str, CifpMember], limit_icaos: Optional[int] = None) -> list[str]:
+    icaos = sorted(members)
     if limit_icaos:
         try:
-            files = files[: max(1, int(limit_icaos))]
+            icaos = icaos[: max(1, int(limit_icaos))]
         except Exception:
             pass
-    _info("Procedures: root=%s total_files=%d limit=%s", root, len(files), limit_icaos)
+    return icaos
+
+
+def cifp_workers() -> int:
+    """Processes that parse CIFP files during an index run (CIFP_WORKERS, default: CPU count)."""
+    raw = os.getenv("CIFP_WORKERS", "").strip()
+    try:
+        n = int(raw) if raw else (os.cpu_count() or 1)
+    except ValueError:
+        n = 1
+    return max(1, n)
+
+
+def _cifp_write_batch() -> int:
+    try:
+        return max(1, int(os.getenv("CIFP_WRITE_BATCH", "100")))
+    except ValueError:
+        return 100
+
+
+def _airport_refs(db: Session) -> dict[str, tuple[float, float]]:
+    return {icao: (float(lat), float(lon)) for icao, lat, lon in db.query(Airport.icao, Airport.lat, Airport.lon).all()}
+
+
+def _parsed_cifp_files(db: Session, files: Iterable[tuple[CifpMember, bytes]], count: int) -> Iterable[tuple[CifpMember, ParsedCifp]]:
+    """Parsed, fix-resolved CIFP `files` (about `count` of them), from a process pool when CIFP_WORKERS > 1."""
+    # One pass over the fixes table serves leg resolution for every airport
+    cands = _fix_candidates(db)
+    workers = max(1, min(cifp_workers(), count))
+    _info("Procedures: parsing with %d worker(s)", workers)
+
+    def failed(member: CifpMember, e: Exception) -> None:
+        _info("Procedures: failed to read %s: %s", member.name, e)
+
+    return iter_parsed_cifp(files, lambda m: m.icao, cands, _airport_refs(db), workers=workers, on_error=failed)
+
+
+def index_procedures(db: Session, *, limit_icaos: Optional[int] = None, changed_only: bool = False) -> dict:
+    """Index the SIDs/STARs of every CIFP file.
+
+    With `changed_only`, files whose size/mtime and then content hash match
+    their SourceFile row are skipped, and airports whose file is gone lose
+    their procedures. The result then also has `files` (re-indexed) and `removed`.
+    """
+    src = cifp_source()
+    try:
+        members = src.members()
+    except Exception as e:
+        _info("Procedures: cannot list %s: %s", src.path, e)
+        members = {}
+    icaos = _cifp_icaos(members, limit_icaos)
+    _info("Procedures: root=%s total_files=%d limit=%s", src.path, len(icaos), limit_icaos)
+    out: dict = {"sids": 0, "stars": 0}
+    files: Iterable[tuple[CifpMember, bytes]]
+    if changed_only:
+        known = {rec.name: rec for rec in db.query(SourceFile).filter(SourceFile.kind == "cifp")}
+        # An empty or unreadable CIFP source removes nothing
+        out["removed"] = _drop_procedures(db, [name for name in known if name not in members]) if icaos else 0
+        stale = {i for i in icaos if not _stamp_matches(known.get(i), members[i].mtime, members[i].size)}
+        _info("Procedures: %d of %d files changed size/mtime, %d removed", len(stale), len(icaos), out["removed"])
+        icaos = sorted(stale)
+        files = _changed_cifp_files(_iter_cifp_files(src, stale), known)
+    else:
+        files = _iter_cifp_files(src, set(icaos))
+    if not icaos:
+        if changed_only:
+            out["files"] = 0
+        return out
 
     cnt_sid = 0
     cnt_star = 0
+    batch_size = _cifp_write_batch()
+    batch: list[tuple[CifpMember, ParsedCifp]] = []
+
+    def flush() -> None:
+        nonlocal cnt_sid, cnt_star
+        sids, stars = _write_procedures(db, [p for _, p in batch], prune=changed_only)
+        for member, p in batch:
+            _record_source(db, "cifp", member.icao, member.mtime, member.size, p.sha1)
+        cnt_sid += sids
+        cnt_star += stars
+        batch.clear()
+
+    # Workers parse ahead while this thread, the only writer, stores finished batches
+    done = 0
+    for member, parsed in _parsed_cifp_files(db, files, len(icaos)):
+        batch.append((member, parsed))
+        done += 1
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+    _info("Procedures: added SIDs=%d STARs=%d", cnt_sid, cnt_star)
+    out.update(sids=cnt_sid, stars=cnt_star)
+    if changed_only:
+        out["files"] = done
+    return out
+
+
+def _stamp_matches(rec: Optional[SourceFile], mtime: float, size: int) -> bool:
+    return rec is not None and rec.mtime == mtime and rec.size == size
+
+
+def _changed_cifp_files(
+    files: Iterable[tuple[CifpMember, bytes]], known: dict[str, SourceFile]
+) -> Iterable[tuple[CifpMember, bytes]]:
+    """Drop files whose content hash is unchanged (only touched or recompressed); refresh their stamp."""
+    for member, data in files:
+        rec = known.get(member.icao)
+        if rec is not None and rec.sha1 == data_sha1(data):
+            rec.mtime = member.mtime
+            rec.size = member.size
+            continue
+        yield member, data
+
+
+def _drop_procedures(db: Session, icaos: list[str]) -> int:
+    """Delete the procedures, legs and SourceFile rows of airports whose CIFP file is gone."""
+    for i in range(0, len(icaos), 500):
+        chunk = icaos[i:i + 500]
+        db.query(ProcedureLeg).filter(ProcedureLeg.icao.in_(chunk)).delete(synchronize_session=False)
+        db.query(Procedure).filter(Procedure.icao.in_(chunk)).delete(synchronize_session=False)
+        db.query(SourceFile).filter(SourceFile.kind == "cifp", SourceFile.name.in_(chunk)).delete(synchronize_session=False)
+    return len(icaos)
+
+
+def _iter_cifp_files(src: CifpSource, icaos: Optional[set] = None) -> Iterable[tuple[CifpMember, bytes]]:
+    """src.iter_files, logging and skipping an unreadable source instead of failing the run."""
+    try:
+        yield from src.iter_files(icaos)
+    except Exception as e:
+        _info("Procedures: failed to read %s: %s", src.path, e)
+
+
+# --- Incremental reindex (content hashes) ---
+
+def incremental_index_enabled() -> bool:
+    return os.getenv("INCREMENTAL_INDEX", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _navdata_sources() -> dict[str, Optional[str]]:
+    """SourceFile name (kind "navdata") -> current path of that navdata text file."""
+    return {
+        "earth_fix.dat": data_file("earth_fix.dat"),
+        "earth_awy.dat": data_file("earth_awy.dat"),
+        "earth_aptmeta.dat": airport_meta_path(),
+        "apt.dat": apt_dat_path(),
+    }
+
+
+def _navdata_changes(db: Session) -> dict[str, Optional[tuple[float, int, str]]]:
+    """Navdata files whose content differs from the recorded hash: name -> (mtime, size, sha1),
+    or None for a file that is gone. The hash is only computed when size or mtime changed."""
+    known = {rec.name: rec for rec in db.query(SourceFile).filter(SourceFile.kind == "navdata")}
+    changes: dict[str, Optional[tuple[float, int, str]]] = {}
+    for name, path in _navdata_sources().items():
+        rec = known.get(name)
+        if not path:
+            if rec is not None:
+                changes[name] = None
+            continue
+        st = os.stat(path)
+        if _stamp_matches(rec, st.st_mtime, st.st_size):
+            continue
+        digest = content_sha1(path)
+        if rec is not None and rec.sha1 == digest:
+            rec.mtime = st.st_mtime
+            rec.size = st.st_size
+            continue
+        changes[name] = (st.st_mtime, st.st_size, digest)
+    return changes
+
+
+def _record_navdata_sources(db: Session, changes: Optional[dict[str, Optional[tuple[float, int, str]]]] = None) -> None:
+    """Store the hashes in `changes` (default: hash every navdata file now)."""
+    if changes is None:
+        changes = {}
+        for name, path in _navdata_sources().items():
+            if path:
+                st = os.stat(path)
+                changes[name] = (st.st_mtime, st.st_size, content_sha1(path))
+            else:
+                changes[name] = None
+    for name, stamp in changes.items():
+        if stamp is None:
+            db.query(SourceFile).filter(SourceFile.kind == "navdata", SourceFile.name == name).delete(synchronize_session=False)
+        else:
+            _record_source(db, "navdata", name, *stamp)
+
+
+def _in_chunks(values: list, size: int = 500) -> Iterable[list]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _sync_airports(db: Session) -> int:
+    """index_airports with one read of the table and bulk writes. Returns airports added."""
+    coords = load_airport_coords() or {}
+    names = load_airport_names()
+    existing = {icao: (aid, lat, lon, name) for aid, icao, lat, lon, name in db.query(Airport.id, Airport.icao, Airport.lat, Airport.lon, Airport.name)}
+    inserts: list[dict] = []
+    updates: list[dict] = []
+    for icao, (lat, lon) in coords.items():
+        name = (names.get(icao) or '')[:128] or None
+        cur = existing.get(icao)
+        if cur is None:
+            inserts.append({"icao": icao, "lat": lat, "lon": lon, "name": name})
+        elif (cur[1], cur[2]) != (lat, lon) or (name and name != cur[3]):
+            updates.append({"id": cur[0], "lat": lat, "lon": lon, "name": name or cur[3]})
+    if inserts:
+        db.execute(insert(Airport), inserts)
+    if updates:
+        db.execute(update(Airport), updates)
+    _info("Airports: %d added, %d updated", len(inserts), len(updates))
+    return len(inserts)
+
+
+def _sync_fixes(db: Session) -> tuple[int, set[str]]:
+    """Make the fixes table match earth_fix.dat: insert new (ident, country, lat, lon) rows,
+    refresh usage/dbid/name, delete rows that are gone. Airways must be cleared first.
+    Returns (fixes added, idents whose rows were added, removed or changed usage)."""
+    existing = {
+        (ident, country, lat, lon): (fid, usage, dbid, name)
+        for fid, ident, country, lat, lon, usage, dbid, name in db.query(
+            Fix.id, Fix.ident, Fix.country, Fix.lat, Fix.lon, Fix.usage, Fix.dbid, Fix.name
+        )
+    }
+    wanted: dict[tuple, tuple] = {}
+    for ident, usage, country, lat, lon, dbid, name in fix_records():
+        wanted.setdefault((ident, country, lat, lon), (usage, dbid, name))
+    inserts = [
+        {"ident": k[0], "country": k[1], "lat": k[2], "lon": k[3], "usage": v[0], "dbid": v[1], "name": v[2]}
+        for k, v in wanted.items() if k not in existing
+    ]
+    updates = []
+    changed = {k[0] for k in wanted.keys() - existing.keys()}
+    for key, (fid, usage, dbid, name) in existing.items():
+        new = wanted.get(key)
+        if new is None:
+            changed.add(key[0])
+        elif new != (usage, dbid, name):
+            updates.append({"id": fid, "usage": new[0], "dbid": new[1], "name": new[2]})
+            if new[0] != usage:
+                changed.add(key[0])
+    removed = [fid for key, (fid, *_rest) in existing.items() if key not in wanted]
+    for ids in _in_chunks(removed):
+        db.query(Fix).filter(Fix.id.in_(ids)).delete(synchronize_session=False)
+    if inserts:
+        db.execute(insert(Fix), inserts)
+    if updates:
+        db.execute(update(Fix), updates)
+    _info("Fixes: %d added, %d updated, %d removed", len(inserts), len(updates), len(removed))
+    return len(inserts), changed
+
 
-    for fname in files:
-        icao = os.path.splitext(fname)[0].upper()
-        path = os.path.join(root, fname)
+def _rebuild_airways(db: Session) -> int:
+    """Fill the (already cleared) airways table from earth_awy.dat against the current fixes, with
+    the same endpoint choice as index_airways (exact country, else ENRT usage, else first row)."""
+    by_ident: dict[str, list[tuple[int, str, str]]] = {}
+    for fid, ident, country, usage in db.query(Fix.id, Fix.ident, Fix.country, Fix.usage).order_by(Fix.id):
+        by_ident.setdefault(ident, []).append((fid, (country or '').upper(), (usage or '').upper()))
+
+    def pick(ident: str, country: Optional[str]) -> Optional[int]:
+        rows = by_ident.get(ident)
+        if not rows:
+            return None
+        if country:
+            for fid, cc, _usage in rows:
+                if cc == country:
+                    return fid
+        for fid, _cc, usage in rows:
+            if usage == 'ENRT':
+                return fid
+        return rows[0][0]
+
+    seen: set[tuple] = set()
+    rows: list[dict] = []
+    total = 0
+    for fix1, fix1_cc, fix2, fix2_cc, direction, route_class, lower_fl, upper_fl, airway_name in airway_records():
+        total += 1
+        f1 = pick(fix1, fix1_cc)
+        f2 = pick(fix2, fix2_cc)
+        if f1 is None or f2 is None:
+            continue
+        key = (airway_name, f1, f2, direction, route_class, lower_fl, upper_fl)
+        if key in seen:
+            continue
+        seen.add(key)
+        rows.append(dict(zip(("name", "fix1_id", "fix2_id", "direction", "route_class", "lower_fl", "upper_fl"), key)))
+    if rows:
+        db.execute(Airway.__table__.insert(), rows)
+    _info("Airways: parsed=%d added segments=%d (rebuilt)", total, len(rows))
+    return len(rows)
+
+
+def _reresolve_legs(db: Session, idents: set[str]) -> int:
+    """Recompute the stored coordinates of procedure legs that use one of `idents`."""
+    if not idents:
+        return 0
+    cands = _fix_candidates(db, idents)
+    refs = _airport_refs(db)
+    updates: list[dict] = []
+    for chunk in _in_chunks(sorted(idents)):
+        for lid, icao, ident, region, lat, lon in db.query(
+            ProcedureLeg.id, ProcedureLeg.icao, ProcedureLeg.fix_ident, ProcedureLeg.fix_region, ProcedureLeg.lat, ProcedureLeg.lon
+        ).filter(ProcedureLeg.fix_ident.in_(chunk)):
+            pos = resolve_leg_fix(cands, ident, region or '', icao, refs.get(icao)) or (None, None)
+            if pos != (lat, lon):
+                updates.append({"id": lid, "lat": pos[0], "lon": pos[1]})
+    if updates:
+        db.execute(update(ProcedureLeg), updates)
+    _info("Procedures: %d legs re-resolved after fix changes", len(updates))
+    return len(updates)
+
+
+def run_incremental_index(db: Session) -> dict:
+    """Re-index only the navdata and CIFP files whose content hash changed since the last run.
+
+    A changed earth_fix.dat is diffed against the fixes table. The airways are
+    rebuilt when fixes or earth_awy.dat changed. Procedure legs that use a
+    changed fix are re-resolved, and only changed CIFP files are re-parsed.
+    """
+    _info("Incremental index: comparing source hashes")
+    changes = _navdata_changes(db)
+    _info("Incremental index: changed navdata files: %s", sorted(changes) or "none")
+    airac = upsert_airac(db)
+    if changes and compiled_navdata_enabled():
         try:
-            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                buckets: dict[tuple[str, str, str], list[str]] = {}
-                for line in f:
-                    if ('SID:' in line) or ('STAR' in line):
-                        parts = line.split(',')
-                        try:
-                            proc_tag = parts[0]
-                            proc_type, num = proc_tag.split(':', 1)
-                            proc_type = proc_type.strip().upper()
-                            name = parts[2].strip()
-                            start = parts[3].strip()
-                            seg = parts[4].replace('  ', ' ').strip()
-                        except Exception:
-                            continue
-                        key = (proc_type, name, start)
-                        if num.strip() == '010':
-                            buckets[key] = [seg]
-                        else:
-                            buckets.setdefault(key, []).append(seg)
-                for (proc_type, name, start), segments in buckets.items():
-                    route = ' '.join(s for s in segments if s).strip()
-                    existing = (
-                        db.query(Procedure)
-                        .filter(
-                            Procedure.icao == icao,
-                            Procedure.proc_type == proc_type,
-                            Procedure.name == name,
-                            Procedure.start == start,
-                        )
-                        .one_or_none()
-                    )
-                    if existing:
-                        existing.route = route
-                    else:
-                        db.add(Procedure(icao=icao, proc_type=proc_type, name=name, start=start, route=route))
-                        if proc_type == 'SID':
-                            cnt_sid += 1
-                        elif proc_type == 'STAR':
-                            cnt_star += 1
+            ensure_compiled_navdata()
         except Exception as e:
-            _info("Procedures: failed to read %s: %s", path, e)
-            continue
-    _info("Procedures: added SIDs=%d STARs=%d", cnt_sid, cnt_star)
-    return {"sids": cnt_sid, "stars": cnt_star}
+            _info("Compiled navdata not written (%s); parsing text files", e)
+
+    airports_added = fixes_added = airways_added = 0
+    touched: list[str] = []
+    if "earth_aptmeta.dat" in changes or "apt.dat" in changes:
+        airports_added = _sync_airports(db)
+        touched.append("airports")
+    changed_idents: set[str] = set()
+    if "earth_fix.dat" in changes or "earth_awy.dat" in changes:
+        # Airways point at fix ids, so they go first and are rebuilt against the new fixes
+        db.query(Airway).delete(synchronize_session=False)
+        if "earth_fix.dat" in changes:
+            fixes_added, changed_idents = _sync_fixes(db)
+            touched.append("fixes")
+        airways_added = _rebuild_airways(db)
+        touched.append("airways")
+    if "fixes" in touched or "airports" in touched:
+        spatial = rebuild_spatial_index(db)
+        if spatial:
+            _info("Spatial index: %s", spatial)
+
+    if lazy_procedures_enabled():
+        # Changed CIFP files are picked up on request and by the backfill
+        procs: dict = {"sids": 0, "stars": 0, "deferred": True}
+        _prepare_lazy_cifp()
+    else:
+        procs = index_procedures(db, changed_only=True)
+        if procs.get("files") or procs.get("removed"):
+            touched.append("procedures")
+    _reresolve_legs(db, changed_idents)
+    _record_navdata_sources(db, changes)
+    if touched:
+        refresh_navdata_stats(db, touched)
+        _bump_generation(db, airac)
+
+    out = {
+        "airac": 0,
+        "airports": airports_added,
+        "fixes": fixes_added,
+        "airways": airways_added,
+        "procedures": procs,
+        "skipped": not touched,
+        "changed": sorted(changes),
+    }
+    if not touched:
+        out["reason"] = "sources unchanged"
+    _info("Incremental index done: %s", out)
+    return out
+
+
+# --- Postgres bulk loader (COPY into staging tables, set-based merge) ---
+
+def pg_copy_enabled(db: Session) -> bool:
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    return os.getenv("PG_COPY_INDEX", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def _copy_text(value) -> str:
+    if value is None:
+        return r"\N"
+    s = str(value)
+    return s.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+class _CopyBuffer:
+    """File-like object producing COPY text-format data from row tuples on demand,
+    so the parsed files are streamed to the server without being held in memory."""
+
+    def __init__(self, rows: Iterable[tuple]) -> None:
+        self._rows = iter(rows)
+        self._buf = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buf) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._buf += "\t".join(_copy_text(v) for v in row) + "\n"
+            self.rows += 1
+        if size < 0:
+            out, self._buf = self._buf, ""
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+    readline = read
+
+
+def _pg_copy(db: Session, table: str, columns: tuple[str, ...], rows: Iterable[tuple]) -> int:
+    """COPY rows into `table` on the session's connection (psycopg2 or psycopg 3)."""
+    raw = db.connection().connection.driver_connection
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+    stream = _CopyBuffer(rows)
+    cur = raw.cursor()
+    try:
+        if hasattr(cur, "copy_expert"):
+            cur.copy_expert(sql, stream, size=1 << 16)
+        else:
+            with cur.copy(sql) as cp:
+                for chunk in iter(lambda: stream.read(1 << 16), ""):
+                    cp.write(chunk)
+    finally:
+        cur.close()
+    db.execute(text(f"ANALYZE {table}"))
+    return stream.rows
+
+
+_PG_STAGING = {
+    "stage_airports": "icao text, lat double precision, lon double precision, name text",
+    "stage_fixes": "ident text, usage text, country text, lat double precision, lon double precision, dbid text, name text",
+    "stage_airways": "fix1 text, fix1_cc text, fix2 text, fix2_cc text, direction text, route_class int, lower_fl int, upper_fl int, name text",
+    "stage_procedures": "icao text, proc_type text, name text, start text, route text",
+    "stage_legs": (
+        "icao text, proc_type text, name text, transition text, seq int, route_type text, fix_ident text, "
+        "fix_region text, path_term text, turn_dir text, course double precision, distance double precision, "
+        "alt_desc text, alt1 int, alt2 int, speed_limit int, lat double precision, lon double precision"
+    ),
+}
+
+def _pg_staging(db: Session) -> None:
+    for name, cols in _PG_STAGING.items():
+        db.execute(text(f"CREATE TEMP TABLE IF NOT EXISTS {name} ({cols}) ON COMMIT DROP"))
+        db.execute(text(f"TRUNCATE {name}"))
+
+
+def _pg_count(db: Session, table: str) -> int:
+    return int(db.execute(text(f"SELECT count(*) FROM {table}")).scalar() or 0)
+
+
+def _pg_load_airports(db: Session) -> int:
+    coords = load_airport_coords() or {}
+    names = load_airport_names()
+    staged = _pg_copy(db, "stage_airports", ("icao", "lat", "lon", "name"), (
+        (i, la, lo, (names.get(i) or '')[:128] or None) for i, (la, lo) in coords.items()
+    ))
+    before = _pg_count(db, "airports")
+    db.execute(text(
+        "INSERT INTO airports (icao, lat, lon, name) "
+        "SELECT DISTINCT ON (icao) icao, lat, lon, name FROM stage_airports ORDER BY icao "
+        "ON CONFLICT (icao) DO UPDATE SET lat = EXCLUDED.lat, lon = EXCLUDED.lon, "
+        "name = COALESCE(EXCLUDED.name, airports.name)"
+    ))
+    added = _pg_count(db, "airports") - before
+    _info("Airports: %d staged via COPY, %d added (others updated)", staged, added)
+    return added
+
+
+def _pg_load_fixes(db: Session) -> int:
+    path = data_file("earth_fix.dat")
+    if not path:
+        _info("Fixes: file not found: %s", os.path.join(_data_path(), "earth_fix.dat"))
+        return 0
+    staged = _pg_copy(db, "stage_fixes", ("ident", "usage", "country", "lat", "lon", "dbid", "name"), fix_records())
+    # Matched with IS NOT DISTINCT FROM rather than ON CONFLICT: fixes without a country
+    # never conflict on uq_fix_ident_country_coords and would be inserted again on every run
+    staged_rows = (
+        "SELECT DISTINCT ON (ident, country, lat, lon) ident, usage, country, lat, lon, dbid, name "
+        "FROM stage_fixes ORDER BY ident, country, lat, lon"
+    )
+    same_fix = "f.ident = s.ident AND f.country IS NOT DISTINCT FROM s.country AND f.lat = s.lat AND f.lon = s.lon"
+    db.execute(text(
+        f"UPDATE fixes f SET usage = s.usage, dbid = s.dbid, name = s.name FROM ({staged_rows}) s WHERE {same_fix}"
+    ))
+    added = db.execute(text(
+        "INSERT INTO fixes (ident, usage, country, lat, lon, dbid, name) "
+        f"SELECT s.ident, s.usage, s.country, s.lat, s.lon, s.dbid, s.name FROM ({staged_rows}) s "
+        f"WHERE NOT EXISTS (SELECT 1 FROM fixes f WHERE {same_fix})"
+    )).rowcount or 0
+    _info("Fixes: %d staged via COPY, %d added", staged, added)
+    return added
+
+
+def _pg_load_airways(db: Session) -> int:
+    path = data_file("earth_awy.dat")
+    if not path:
+        _info("Airways: file not found: %s", os.path.join(_data_path(), "earth_awy.dat"))
+        return 0
+
+    staged = _pg_copy(db, "stage_airways", ("fix1", "fix1_cc", "fix2", "fix2_cc", "direction", "route_class", "lower_fl", "upper_fl", "name"), airway_records())
+    # Same endpoint choice as index_airways: exact country, else ENRT usage, else first row
+    pick = (
+        "SELECT f.id FROM fixes f WHERE f.ident = s.{c} "
+        "ORDER BY (upper(coalesce(f.country, '')) = s.{c}_cc) DESC, (upper(coalesce(f.usage, '')) = 'ENRT') DESC, f.id LIMIT 1"
+    )
+    res = db.execute(text(
+        "INSERT INTO airways (name, fix1_id, fix2_id, direction, route_class, lower_fl, upper_fl) "
+        "SELECT DISTINCT r.name, r.f1, r.f2, r.direction, r.route_class, r.lower_fl, r.upper_fl FROM ("
+        f"  SELECT s.*, ({pick.format(c='fix1')}) AS f1, ({pick.format(c='fix2')}) AS f2 FROM stage_airways s"
+        ") r "
+        "WHERE r.f1 IS NOT NULL AND r.f2 IS NOT NULL AND NOT EXISTS ("
+        "  SELECT 1 FROM airways a WHERE a.name = r.name AND a.fix1_id = r.f1 AND a.fix2_id = r.f2"
+        "  AND a.direction = r.direction AND a.route_class = r.route_class"
+        "  AND a.lower_fl = r.lower_fl AND a.upper_fl = r.upper_fl)"
+    ))
+    added = res.rowcount or 0
+    _info("Airways: parsed=%d added segments=%d (COPY)", staged, added)
+    return added
+
+
+def _pg_load_procedures(db: Session) -> dict:
+    src = cifp_source()
+    try:
+        icaos = src.icaos()
+    except Exception as e:
+        _info("Procedures: cannot list %s: %s", src.path, e)
+        icaos = []
+    _info("Procedures: root=%s total_files=%d (COPY)", src.path, len(icaos))
+    if not icaos:
+        return {"sids": 0, "stars": 0}
+    procs: list[tuple] = []
+    sources: list[dict] = []
+    # Called here, not inside legs(): it queries the fixes before COPY holds the connection
+    parsed_files = _parsed_cifp_files(db, _iter_cifp_files(src), len(icaos))
+
+    def legs():
+        # Legs stream straight into COPY; the (much smaller) text routes are collected on the side
+        for member, parsed in parsed_files:
+            procs.extend((member.icao, *route) for route in parsed.routes)
+            sources.append({"kind": "cifp", "name": member.icao, "mtime": member.mtime, "size": member.size,
+                            "sha1": parsed.sha1, "indexed_at": datetime.utcnow()})
+            yield from parsed.legs
+
+    _pg_copy(db, "stage_legs", LEG_COLUMNS, legs())
+    _pg_copy(db, "stage_procedures", ("icao", "proc_type", "name", "start", "route"), procs)
+    db.execute(text("DELETE FROM procedure_legs WHERE icao IN (SELECT DISTINCT icao FROM stage_procedures)"))
+    db.execute(text("DELETE FROM procedures WHERE icao IN (SELECT DISTINCT icao FROM stage_procedures)"))
+    db.execute(text(
+        "INSERT INTO procedures (icao, proc_type, name, start, route) "
+        "SELECT DISTINCT ON (icao, proc_type, name, start) icao, proc_type, name, start, route "
+        "FROM stage_procedures ORDER BY icao, proc_type, name, start"
+    ))
+    cols = ", ".join(LEG_COLUMNS)
+    db.execute(text(f"INSERT INTO procedure_legs ({cols}) SELECT {cols} FROM stage_legs"))
+    counts = dict(db.execute(text(
+        "SELECT proc_type, count(*) FROM (SELECT DISTINCT icao, proc_type, name, start FROM stage_procedures) p GROUP BY proc_type"
+    )).all())
+    if sources:
+        db.query(SourceFile).filter(SourceFile.kind == "cifp", SourceFile.name.in_([s["name"] for s in sources])).delete(synchronize_session=False)
+        db.execute(insert(SourceFile), sources)
+    out = {"sids": int(counts.get("SID", 0)), "stars": int(counts.get("STAR", 0))}
+    _info("Procedures: added SIDs=%d STARs=%d (COPY)", out["sids"], out["stars"])
+    return out
+
+
+def pg_copy_index(db: Session, *, procedures: bool = True) -> dict:
+    """Load airports, fixes, airways and (optionally) procedures through COPY + set-based merges."""
+    db.flush()
+    _pg_staging(db)
+    out = {
+        "airports": _pg_load_airports(db),
+        "fixes": _pg_load_fixes(db),
+        "airways": _pg_load_airways(db),
+    }
+    if procedures:
+        out["procedures"] = _pg_load_procedures(db)
+    return out
+
+
+# --- Lazy (on-demand) procedure indexing ---
+
+_icao_locks: dict[str, threading.Lock] = {}
+_icao_locks_guard = threading.Lock()
+_backfill_lock = threading.Lock()
+
+
+def lazy_procedures_enabled() -> bool:
+    return os.getenv("LAZY_PROCEDURES", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _icao_lock(icao: str) -> threading.Lock:
+    with _icao_locks_guard:
+        lock = _icao_locks.get(icao)
+        if lock is None:
+            lock = _icao_locks[icao] = threading.Lock()
+        return lock
+
+
+def _prepare_lazy_cifp() -> None:
+    """Extract a tar CIFP archive now, so lazy lookups on requests read single files."""
+    try:
+        src = cifp_source()
+        if src.kind == "tar":
+            _info("Procedures: CIFP archive extracted to %s", src.extract())
+    except Exception as e:
+        _info("Procedures: cannot extract CIFP archive: %s", e)
+
+
+def ensure_procedures_indexed(icao: str) -> bool:
+    """Index one airport's CIFP file on first use (lazy mode only).
+
+    The file is re-parsed when its mtime/size changed and its SHA-1 differs
+    from the recorded one. A per-ICAO lock plus a database-level claim (see
+    _claim_source) prevent concurrent requests, in this or another worker
+    process, from indexing the same airport twice. The work is done and committed in its own
+    session, so the caller's pending changes are never committed or rolled
+    back with it. Returns True if the airport was (re)indexed.
+    """
+    if not lazy_procedures_enabled():
+        return False
+    icao = (icao or '').strip().upper()
+    if not icao:
+        return False
+    try:
+        member = cifp_source().get(icao)
+    except Exception as e:
+        _info("Procedures: cannot list CIFP files: %s", e)
+        return False
+    if member is None:
+        return False
+    return _ensure_member_indexed(member)
+
+
+def _claim_source(db: Session, kind: str, name: str) -> None:
+    """Hold a database-wide claim on one source file until the transaction ends.
+
+    The per-ICAO lock only covers one process; this serializes workers of a
+    multi-process deployment. Postgres takes a transaction-scoped advisory
+    lock; on SQLite a no-op UPDATE takes the database write lock, so other
+    writers wait up to the busy timeout.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtext(:key))"), {"key": f"{kind}:{name}"})
+    else:
+        db.execute(
+            text("UPDATE source_files SET indexed_at = indexed_at WHERE kind = :kind AND name = :name"),
+            {"kind": kind, "name": name},
+        )
+
+
+def _source_fresh(rec: Optional[SourceFile], member: CifpMember) -> bool:
+    return rec is not None and rec.mtime == member.mtime and rec.size == member.size
+
+
+def _lazy_session() -> Session:
+    from app.db.session import SessionLocal
+
+    return SessionLocal()
+
+
+def _ensure_member_indexed(member: CifpMember, data: Optional[bytes] = None) -> bool:
+    db = _lazy_session()
+    try:
+        return _index_member(db, member, data)
+    finally:
+        db.close()
+
+
+def _index_member(db: Session, member: CifpMember, data: Optional[bytes]) -> bool:
+    icao = member.icao
+    query = db.query(SourceFile).filter(SourceFile.kind == "cifp", SourceFile.name == icao)
+    if _source_fresh(query.one_or_none(), member):
+        return False
+    with _icao_lock(icao):
+        try:
+            _claim_source(db, "cifp", icao)
+        except OperationalError as e:
+            db.rollback()
+            _info("Procedures: lazy index skipped for %s: %s", icao, e)
+            return False
+        # Another request or worker may have indexed it while we waited
+        db.expire_all()
+        rec = query.one_or_none()
+        if _source_fresh(rec, member):
+            db.rollback()
+            return False
+        try:
+            if data is None:
+                with member.open() as f:
+                    data = f.read()
+        except Exception as e:
+            db.rollback()
+            _info("Procedures: lazy index failed for %s: %s", icao, e)
+            return False
+        digest = data_sha1(data)
+        if rec is not None and rec.sha1 == digest:
+            rec.mtime = member.mtime
+            rec.size = member.size
+            db.commit()
+            return False
+        try:
+            db.query(Procedure).filter(Procedure.icao == icao).delete(synchronize_session=False)
+            sids, stars = _index_procedure_file(db, icao, data, digest)
+            _record_source(db, "cifp", icao, member.mtime, member.size, digest)
+            refresh_navdata_stats(db, ("procedures",))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            _info("Procedures: lazy index failed for %s: %s", icao, e)
+            return False
+    _info("Procedures: lazily indexed %s (SIDs=%d STARs=%d)", icao, sids, stars)
+    return True
+
+
+def backfill_procedures() -> None:
+    """Background task: lazily index every CIFP file not yet indexed.
+
+    Each airport is indexed and committed in its own session (see
+    _ensure_member_indexed), so foreground requests keep being served. Only
+    one backfill runs at a time per process. Stale files are read in one pass
+    over the CIFP source, so an archive is decompressed once.
+    """
+    if not _backfill_lock.acquire(blocking=False):
+        _info("Procedures: backfill already running")
+        return
+    try:
+        src = cifp_source()
+        members = src.members()
+        db = _lazy_session()
+        try:
+            known = {
+                name: (mtime, size)
+                for name, mtime, size in db.query(SourceFile.name, SourceFile.mtime, SourceFile.size).filter(SourceFile.kind == "cifp")
+            }
+        finally:
+            db.close()
+        stale = {icao for icao, m in members.items() if known.get(icao) != (m.mtime, m.size)}
+        _info("Procedures: backfill start (%d files, %d to check)", len(members), len(stale))
+        done = 0
+        for member, data in _iter_cifp_files(src, stale):
+            if _ensure_member_indexed(member, data):
+                done += 1
+        _info("Procedures: backfill done (%d airports indexed)", done)
+    except Exception as e:
+        _info("Procedures: backfill failed: %s", e)
+    finally:
+        _backfill_lock.release()
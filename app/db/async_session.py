@@ -0,0 +1,98 @@
+"""Async engine/session for I/O-bound read handlers.
+
+Engines are created on first use so the sync app keeps working when the
+async driver (aiosqlite, or asyncpg for Postgres) is not installed.
+"""
+import asyncio
+import os
+import threading
+
+from sqlalchemy import event
+
+from .session import DATABASE_URL, IS_SQLITE, _sqlite_pragmas
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver equivalent."""
+    scheme, sep, rest = url.partition("://")
+    base = scheme.split("+", 1)[0]
+    if base == "sqlite":
+        return f"sqlite+aiosqlite{sep}{rest}"
+    if base in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg{sep}{rest}"
+    return url
+
+
+_async_engine = None
+_async_sessionmaker = None
+_async_url = None
+_retired = []
+_lock = threading.Lock()
+
+
+def _target():
+    """(url, snapshot) the async engine should currently point at."""
+    from .snapshot import current_snapshot
+
+    snap = current_snapshot()
+    if snap is not None:
+        return snap.async_url(), snap
+    return os.getenv("ASYNC_DATABASE_URL") or async_database_url(DATABASE_URL), None
+
+
+def get_async_engine():
+    global _async_engine, _async_sessionmaker, _async_url
+    url, snap = _target()
+    if _async_engine is not None and _async_url == url:
+        return _async_engine
+    with _lock:
+        if _async_engine is None or _async_url != url:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            eng = create_async_engine(url, pool_pre_ping=True)
+            if IS_SQLITE:
+                # Async handlers only read; same query-only profile as the sync read pool
+                event.listen(eng.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+            if snap is not None:
+                from .snapshot import _attach_disk
+
+                event.listen(eng.sync_engine, "connect", _attach_disk(snap.disk_path))
+            if _async_engine is not None:
+                # Navdata snapshot was swapped; the old engine is disposed on next use
+                _retired.append(_async_engine)
+            _async_sessionmaker = async_sessionmaker(eng, expire_on_commit=False)
+            _async_engine = eng
+            _async_url = url
+    return _async_engine
+
+
+async def _dispose_retired() -> None:
+    while _retired:
+        await _retired.pop().dispose()
+
+
+async def get_async_read_db():
+    """AsyncSession dependency for read-only handlers."""
+    from .snapshot import check_navdata_snapshot, navdata_check_due
+
+    if navdata_check_due():
+        # Reloading copies the navdata tables; keep that off the event loop
+        await asyncio.to_thread(check_navdata_snapshot)
+    get_async_engine()
+    await _dispose_retired()
+    db = _async_sessionmaker()
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_sessionmaker, _async_url
+    eng = _async_engine
+    _async_engine = None
+    _async_sessionmaker = None
+    _async_url = None
+    await _dispose_retired()
+    if eng is not None:
+        await eng.dispose()
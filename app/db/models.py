@@ -9,6 +9,7 @@ from sqlalchemy import (
     String,
     Float,
     DateTime,
+    Date,
     Boolean,
     ForeignKey,
     Index,
@@ -29,6 +30,8 @@ class AiracCycle(Base):
     revision = Column(String(20), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     current = Column(Boolean, default=False, nullable=False)
+    # Bumped by every index run that changed navdata within the cycle (see dbnav.navdata_version)
+    generation = Column(Integer, nullable=True)
 
 
 class Fix(Base):
@@ -55,6 +58,7 @@ class Airport(Base):
     lat = Column(Float, nullable=False)
     lon = Column(Float, nullable=False)
     country = Column(String(4), nullable=True)
+    name = Column(String(128), nullable=True)  # from apt.dat when available
 
 
 class Airway(Base):
@@ -81,6 +85,8 @@ class Airway(Base):
 class FlightPlan(Base):
     __tablename__ = "flight_plans"
     id = Column(Integer, primary_key=True)
+    # Public identifier generated before insert (rows may be written behind the request)
+    ref = Column(String(32), unique=True, index=True, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     origin = Column(String(8), index=True, nullable=False)
     dest = Column(String(8), index=True, nullable=False)
@@ -92,9 +98,33 @@ class FlightPlan(Base):
     route_list = Column(Text, nullable=True)  # space-joined tokens
     sid_text = Column(Text, nullable=True)
     star_text = Column(Text, nullable=True)
+    # Compact JSON with the resolved route geometry (see utils.route_geometry)
+    geometry = Column(Text, nullable=True)
+    distance_nm = Column(Float, nullable=True)  # sum of route legs between fixes
 
     __table_args__ = (
         Index("ix_fpl_origin_dest", "origin", "dest"),
+        # Keyset pagination on (created_at, id), optionally after an equality filter
+        Index("ix_fpl_created", "created_at", "id"),
+        Index("ix_fpl_origin_created", "origin", "created_at", "id"),
+        Index("ix_fpl_dest_created", "dest", "created_at", "id"),
+        Index("ix_fpl_aircraft_created", "aircraft", "created_at", "id"),
+        Index("ix_fpl_cycle_created", "cycle", "created_at", "id"),
+    )
+
+
+class FlightPlanDaily(Base):
+    """Per-day, per-city-pair flight plan aggregates, maintained on insert."""
+    __tablename__ = "flight_plan_daily"
+    day = Column(Date, primary_key=True)
+    origin = Column(String(8), primary_key=True)
+    dest = Column(String(8), primary_key=True)
+    plans = Column(Integer, default=0, nullable=False)
+    route_nm_sum = Column(Float, default=0.0, nullable=False)
+    route_nm_count = Column(Integer, default=0, nullable=False)  # plans with a known distance
+
+    __table_args__ = (
+        Index("ix_fpl_daily_pair", "origin", "dest"),
     )
 
 
@@ -111,3 +141,58 @@ class Procedure(Base):
         UniqueConstraint("icao", "proc_type", "name", "start", name="uq_proc_key"),
         Index("ix_proc_icao_type_name", "icao", "proc_type", "name"),
     )
+
+
+class ProcedureLeg(Base):
+    __tablename__ = "procedure_legs"
+    id = Column(Integer, primary_key=True)
+    icao = Column(String(8), nullable=False)
+    proc_type = Column(String(8), nullable=False)  # 'SID' | 'STAR'
+    name = Column(String(64), nullable=False)
+    transition = Column(String(32), nullable=True)  # same value as Procedure.start
+    seq = Column(Integer, nullable=False)  # CIFP sequence number (010, 020, ...)
+    route_type = Column(String(2), nullable=True)
+    fix_ident = Column(String(8), nullable=True)
+    fix_region = Column(String(4), nullable=True)
+    path_term = Column(String(2), nullable=True)  # leg type: IF, TF, CF, DF, VA, ...
+    turn_dir = Column(String(1), nullable=True)
+    course = Column(Float, nullable=True)  # degrees magnetic
+    distance = Column(Float, nullable=True)  # NM (or minutes for timed legs)
+    alt_desc = Column(String(2), nullable=True)  # '+', '-', 'B', '@'/' ' ...
+    alt1 = Column(Integer, nullable=True)  # feet
+    alt2 = Column(Integer, nullable=True)  # feet
+    speed_limit = Column(Integer, nullable=True)  # knots
+    lat = Column(Float, nullable=True)  # resolved fix coordinates (None if unresolved)
+    lon = Column(Float, nullable=True)
+
+    __table_args__ = (
+        Index("ix_leg_proc", "icao", "proc_type", "name", "transition", "seq"),
+    )
+
+
+class SourceFile(Base):
+    """Navdata source file fingerprint, used to skip re-parsing unchanged inputs."""
+    __tablename__ = "source_files"
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(16), nullable=False)  # 'cifp' | 'navdata'
+    name = Column(String(128), nullable=False)  # ICAO for CIFP files, file name (earth_fix.dat, ...) for navdata
+    mtime = Column(Float, nullable=True)
+    size = Column(Integer, nullable=True)
+    sha1 = Column(String(40), nullable=True)
+    indexed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "name", name="uq_source_kind_name"),
+    )
+
+
+class NavdataStats(Base):
+    """Single-row table of materialized counts for the admin status views."""
+    __tablename__ = "navdata_stats"
+    id = Column(Integer, primary_key=True)  # always 1
+    airports = Column(Integer, default=0, nullable=False)
+    fixes = Column(Integer, default=0, nullable=False)
+    airways = Column(Integer, default=0, nullable=False)
+    procedures = Column(Integer, default=0, nullable=False)
+    flights = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
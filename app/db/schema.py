@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import logging
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from .models import Base
+
+log = logging.getLogger(__name__)
+
+
+def ensure_schema(engine: Engine) -> List[str]:
+    """Create missing tables and add missing nullable columns to existing ones.
+
+    `create_all` never alters existing tables, so databases created before a
+    column was added (e.g. flight_plans.geometry) would otherwise fail on
+    insert. Only additive, nullable columns (and their indexes) are handled;
+    anything else still needs a reindex or manual migration. Returns the
+    "table.column" names added.
+    """
+    Base.metadata.create_all(bind=engine)
+    added: List[str] = []
+    insp = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not insp.has_table(table.name):
+                continue
+            existing = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in existing or not col.nullable:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {col.name} {col_type}'))
+                added.append(f"{table.name}.{col.name}")
+            for idx in table.indexes:
+                idx.create(bind=conn, checkfirst=True)
+    if added:
+        log.info("Schema upgraded: added columns %s", ", ".join(added))
+    return added
+
+
+if __name__ == "__main__":
+    # One-off migration step: python -m app.db.schema
+    from .session import engine
+
+    logging.basicConfig(level=logging.INFO)
+    added = ensure_schema(engine)
+    print("Schema ready; added columns:", ", ".join(added) or "none")
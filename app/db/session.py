@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
 
@@ -11,15 +11,67 @@ def _default_db_url() -> str:
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", _default_db_url())
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
-# SQLite needs check_same_thread=False for FastAPI multi-threaded default
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
-    pool_pre_ping=True,
-)
+
+def _sqlite_pragmas(read_only: bool):
+    """Serving profile applied to every new SQLite connection.
+
+    WAL lets readers proceed while an index run or flight-plan insert holds
+    the write lock; synchronous=NORMAL is durable across app crashes in WAL
+    mode and avoids an fsync per commit. Sizes are configurable via env.
+    """
+    cache_kb = int(float(os.getenv("SQLITE_CACHE_MB", "64")) * 1024)
+    mmap_bytes = int(float(os.getenv("SQLITE_MMAP_MB", "256")) * 1024 * 1024)
+    busy_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").strip().upper()
+    if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+        synchronous = "NORMAL"
+
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            if os.getenv("SQLITE_WAL", "1").strip().lower() not in ("0", "false", "no", "off"):
+                cur.execute("PRAGMA journal_mode=WAL")
+            cur.execute(f"PRAGMA synchronous={synchronous}")
+            cur.execute(f"PRAGMA cache_size=-{cache_kb}")
+            cur.execute(f"PRAGMA mmap_size={mmap_bytes}")
+            cur.execute("PRAGMA temp_store=MEMORY")
+            cur.execute(f"PRAGMA busy_timeout={busy_ms}")
+            if read_only:
+                cur.execute("PRAGMA query_only=ON")
+        finally:
+            cur.close()
+
+    return _on_connect
+
+
+def _make_engine(read_only: bool = False, **kwargs):
+    # SQLite needs check_same_thread=False for FastAPI multi-threaded default
+    eng = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False} if IS_SQLITE else {},
+        pool_pre_ping=True,
+        **kwargs,
+    )
+    if IS_SQLITE:
+        event.listen(eng, "connect", _sqlite_pragmas(read_only))
+    return eng
+
+
+# Write engine: indexing, flight-plan inserts, schema changes
+engine = _make_engine()
+
+# Read engine: a separate query-only pool so planner/map reads on SQLite never
+# queue behind writers. Other databases share the write engine.
+if IS_SQLITE:
+    _read_pool = int(os.getenv("SQLITE_READ_POOL", "8"))
+    read_engine = _make_engine(read_only=True, pool_size=_read_pool, max_overflow=_read_pool)
+else:
+    read_engine = engine
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 
 def get_db():
@@ -28,3 +80,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """Session for handlers that only read (planner inputs, maps, suggestions)."""
+    from .snapshot import check_navdata_snapshot
+
+    check_navdata_snapshot()
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,206 @@
+"""In-memory navdata snapshot for the read path (SQLite only).
+
+Navdata only changes when /admin/index runs, so with NAVDATA_SNAPSHOT=1 the
+navdata tables are copied into a shared-cache in-memory SQLite database at
+startup and after each index, and the read sessions (get_read_db and the
+async read engine) are pointed at it. Every snapshot connection ATTACHes
+the on-disk database as `disk`; SQLite resolves unqualified table names in
+`main` first and then in attached databases, so tables that are not copied
+(flight_plans, navdata_stats, source_files, ...) are still read from disk
+by the same queries. A new snapshot is built under a fresh name and swapped
+in atomically; sessions already open keep the previous one until they close.
+
+Each snapshot records the navdata version it was copied at. When another
+worker process runs the index, the read path notices the on-disk version
+moving (checked at most every NAVDATA_CHECK_INTERVAL_S seconds) and reloads.
+"""
+from __future__ import annotations
+
+import itertools
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from sqlalchemy import Table, create_engine, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from .models import AiracCycle, Airport, Airway, Fix, Procedure, ProcedureLeg
+from .spatial import rebuild_spatial_index
+from .session import IS_SQLITE, ReadSessionLocal, _sqlite_pragmas, engine, read_engine
+
+log = logging.getLogger(__name__)
+
+_names = itertools.count(1)
+_lock = threading.Lock()
+_current: Optional["NavdataSnapshot"] = None
+_check_interval = float(os.getenv("NAVDATA_CHECK_INTERVAL_S", "1"))
+_checked_at = 0.0
+_reload_lock = threading.Lock()
+
+
+def snapshot_enabled() -> bool:
+    return IS_SQLITE and os.getenv("NAVDATA_SNAPSHOT", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _snapshot_tables() -> List[Table]:
+    tables = [AiracCycle.__table__, Airport.__table__, Fix.__table__, Airway.__table__]
+    # Lazy mode writes procedures outside of an index run; leave them on disk
+    from app.core.indexer import lazy_procedures_enabled
+
+    if not lazy_procedures_enabled():
+        tables += [Procedure.__table__, ProcedureLeg.__table__]
+    return tables
+
+
+def _attach_disk(path: str):
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        try:
+            cur.execute("ATTACH DATABASE ? AS disk", (path,))
+        finally:
+            cur.close()
+
+    return _on_connect
+
+
+class NavdataSnapshot:
+    """One generation of the in-memory copy; `engine` serves query-only reads."""
+
+    def __init__(self, disk_path: str) -> None:
+        self.name = f"navsnap{os.getpid()}_{next(_names)}"
+        self.disk_path = disk_path
+        self.uri = f"file:{self.name}?mode=memory&cache=shared"
+        # Holds the shared-cache database open for as long as the snapshot lives
+        self._keeper = sqlite3.connect(self.uri, uri=True, check_same_thread=False)
+        self.counts: dict = {}
+        self.version: Optional[str] = None
+        self.engine = self._make_engine()
+
+    def _make_engine(self):
+        pool = int(os.getenv("SQLITE_READ_POOL", "8"))
+        eng = create_engine(
+            f"sqlite:///{self.uri}&uri=true",
+            connect_args={"check_same_thread": False},
+            poolclass=QueuePool,
+            pool_size=pool,
+            max_overflow=pool,
+        )
+        event.listen(eng, "connect", _sqlite_pragmas(read_only=True))
+        event.listen(eng, "connect", _attach_disk(self.disk_path))
+        return eng
+
+    def async_url(self) -> str:
+        return f"sqlite+aiosqlite:///{self.uri}&uri=true"
+
+    def load(self) -> dict:
+        """Copy navdata tables from the attached disk database in one read transaction."""
+        build = create_engine(f"sqlite:///{self.uri}&uri=true", poolclass=StaticPool)
+        event.listen(build, "connect", _attach_disk(self.disk_path))
+        tables = _snapshot_tables()
+        counts = {}
+        with build.begin() as conn:
+            for table in tables:
+                conn.execute(CreateTable(table))
+                cols = ", ".join(c.name for c in table.columns)
+                res = conn.exec_driver_sql(
+                    f"INSERT INTO main.{table.name} ({cols}) SELECT {cols} FROM disk.{table.name}"
+                )
+                counts[table.name] = res.rowcount
+            # Indexes after the bulk copy, as the indexer would
+            for table in tables:
+                for idx in table.indexes:
+                    idx.create(bind=conn)
+        # Same R*Tree tables the indexer keeps on disk (see app.db.spatial)
+        from app.utils.dbnav import navdata_version_db
+
+        with Session(build) as s:
+            rebuild_spatial_index(s)
+            s.execute(text("ANALYZE main"))
+            s.commit()
+            self.version = navdata_version_db(s)
+        build.dispose()
+        self.counts = counts
+        return counts
+
+    def close(self) -> None:
+        self.engine.dispose()
+        try:
+            self._keeper.close()
+        except Exception:
+            pass
+
+
+def current_snapshot() -> Optional[NavdataSnapshot]:
+    return _current
+
+
+def refresh_navdata_snapshot() -> Optional[dict]:
+    """Build a new snapshot from disk and swap the read sessions over to it.
+
+    Returns the copied row counts, or None when snapshots are disabled.
+    """
+    global _current
+    if not snapshot_enabled():
+        return None
+    with _lock:
+        t0 = time.perf_counter()
+        snap = NavdataSnapshot(engine.url.database)
+        try:
+            counts = snap.load()
+        except Exception:
+            snap.close()
+            raise
+        old, _current = _current, snap
+        ReadSessionLocal.configure(bind=snap.engine)
+        if old is not None:
+            old.close()
+        log.info("Navdata snapshot %s loaded in %.2fs: %s", snap.name, time.perf_counter() - t0, counts)
+        return counts
+
+
+def navdata_check_due() -> bool:
+    """True when a snapshot is loaded and its version has not been checked recently."""
+    return _current is not None and time.monotonic() - _checked_at >= _check_interval
+
+
+def check_navdata_snapshot() -> None:
+    """Reload the snapshot if the on-disk navdata version moved (an index ran in another process).
+
+    Throttled by navdata_check_due(); while one thread reloads, the others keep
+    reading the current snapshot instead of waiting.
+    """
+    global _checked_at
+    if not navdata_check_due():
+        return
+    _checked_at = time.monotonic()
+    if not _reload_lock.acquire(blocking=False):
+        return
+    try:
+        from app.utils.dbnav import navdata_version_db
+
+        snap = _current
+        if snap is None:
+            return
+        with Session(read_engine) as s:
+            version = navdata_version_db(s)
+        if version != snap.version:
+            log.info("Navdata version changed on disk (%s -> %s); reloading snapshot", snap.version, version)
+            refresh_navdata_snapshot()
+    except Exception:
+        log.exception("Navdata snapshot reload failed; keeping %s", getattr(_current, "name", None))
+    finally:
+        _reload_lock.release()
+
+
+def close_navdata_snapshot() -> None:
+    global _current
+    with _lock:
+        snap, _current = _current, None
+        ReadSessionLocal.configure(bind=read_engine)
+        if snap is not None:
+            snap.close()
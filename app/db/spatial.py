@@ -0,0 +1,194 @@
+"""Spatial index over fix and airport coordinates.
+
+SQLite: R*Tree virtual tables (fix_rtree, airport_rtree) keyed by row id,
+rebuilt by the indexer. Postgres: GiST expression indexes on point(lon, lat),
+maintained by the database itself. Other databases (or a missing R*Tree)
+fall back to plain lat/lon range filters, so callers always get correct
+results and only the speed differs.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Column, Float, Integer, MetaData, Table, func, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from .models import Airport, Fix
+
+log = logging.getLogger(__name__)
+
+# (min_lat, min_lon, max_lat, max_lon)
+BBox = Tuple[float, float, float, float]
+
+# Virtual tables live outside Base.metadata so create_all never touches them
+_rtree_meta = MetaData()
+fix_rtree = Table(
+    "fix_rtree", _rtree_meta,
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float), Column("max_lat", Float),
+    Column("min_lon", Float), Column("max_lon", Float),
+)
+airport_rtree = Table(
+    "airport_rtree", _rtree_meta,
+    Column("id", Integer, primary_key=True),
+    Column("min_lat", Float), Column("max_lat", Float),
+    Column("min_lon", Float), Column("max_lon", Float),
+)
+
+_RTREES = ((fix_rtree, "fixes"), (airport_rtree, "airports"))
+
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+
+def bbox_around(lat: float, lon: float, radius_nm: float) -> BBox:
+    """Bounding box containing the circle of `radius_nm` around (lat, lon)."""
+    dlat = radius_nm / 60.0
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, radius_nm / (60.0 * cos_lat))
+    return _clamp(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+
+
+def corridor_bbox(a: Tuple[float, float], b: Tuple[float, float], margin_nm: float) -> Optional[BBox]:
+    """Bounding box of the great-circle path from `a` to `b` (lat, lon), padded by `margin_nm`.
+
+    The latitude range includes the path's vertex when the path passes it, so
+    long routes keep their poleward bulge. Returns None when no plain box fits:
+    the padded path crosses the antimeridian, comes near a pole, or the
+    endpoints are antipodal. Callers then query without a box.
+    """
+    lat1, lon1 = a
+    lat2, lon2 = b
+    dlon = (lon2 - lon1 + 540.0) % 360.0 - 180.0
+    phi1, phi2, dl = math.radians(lat1), math.radians(lat2), math.radians(dlon)
+    lo_lat, hi_lat = min(lat1, lat2), max(lat1, lat2)
+    # North components of the course at departure and arrival; a sign change means the
+    # path turns around at its vertex between the endpoints
+    east = math.sin(dl) * math.cos(phi2)
+    north1 = math.cos(phi1) * math.sin(phi2) - math.sin(phi1) * math.cos(phi2) * math.cos(dl)
+    north2 = math.cos(phi1) * math.sin(phi2) * math.cos(dl) - math.sin(phi1) * math.cos(phi2)
+    course = math.hypot(east, north1)
+    if course < 1e-12 and abs(dlon) > 1e-9:
+        return None  # antipodal: no unique great circle
+    if course >= 1e-12 and (north1 > 0) != (north2 > 0):
+        vertex = math.degrees(math.acos(min(1.0, abs(east / course * math.cos(phi1)))))
+        if north1 > 0:
+            hi_lat = max(hi_lat, vertex)
+        else:
+            lo_lat = min(lo_lat, -vertex)
+    dlat = margin_nm / 60.0
+    lo_lat, hi_lat = lo_lat - dlat, hi_lat + dlat
+    widest = max(abs(lo_lat), abs(hi_lat))
+    if widest >= 89.0:
+        return None
+    pad = margin_nm / (60.0 * math.cos(math.radians(widest)))
+    lo_lon, hi_lon = sorted((lon1, lon1 + dlon))
+    lo_lon, hi_lon = lo_lon - pad, hi_lon + pad
+    if lo_lon < -180.0 or hi_lon > 180.0:
+        return None
+    return (lo_lat, lo_lon, hi_lat, hi_lon)
+
+
+def _clamp(min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> BBox:
+    min_lat, max_lat = max(-90.0, min_lat), min(90.0, max_lat)
+    if min_lon < -180.0 or max_lon > 180.0:
+        # Crosses the antimeridian: keep the latitude band, drop the longitude filter
+        min_lon, max_lon = -180.0, 180.0
+    return (min_lat, min_lon, max_lat, max_lon)
+
+
+def has_rtree(db: Session) -> bool:
+    if _dialect(db) != "sqlite":
+        return False
+    row = db.execute(text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='fix_rtree'")).first()
+    return row is not None
+
+
+def ensure_spatial_index(db: Session) -> bool:
+    """Create the spatial structures for this database; False if unsupported."""
+    dialect = _dialect(db)
+    try:
+        if dialect == "sqlite":
+            for table, _ in _RTREES:
+                db.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table.name} "
+                    "USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+                ))
+            return True
+        if dialect == "postgresql":
+            db.execute(text("CREATE INDEX IF NOT EXISTS ix_fixes_point ON fixes USING gist (point(lon, lat))"))
+            db.execute(text("CREATE INDEX IF NOT EXISTS ix_airports_point ON airports USING gist (point(lon, lat))"))
+            return True
+    except Exception as e:
+        # e.g. SQLite built without the R*Tree module
+        log.warning("Spatial index unavailable (%s): %s", dialect, e)
+    return False
+
+
+def rebuild_spatial_index(db: Session) -> dict:
+    """Refill the R*Tree tables from fixes/airports (no-op where the DB maintains its own index)."""
+    if not ensure_spatial_index(db) or _dialect(db) != "sqlite":
+        return {}
+    counts = {}
+    for table, source in _RTREES:
+        db.execute(text(f"DELETE FROM {table.name}"))
+        res = db.execute(text(
+            f"INSERT INTO {table.name} (id, min_lat, max_lat, min_lon, max_lon) "
+            f"SELECT id, lat, lat, lon, lon FROM {source}"
+        ))
+        counts[table.name] = res.rowcount
+    return counts
+
+
+def _rtree_where(table: Table, bbox: BBox):
+    min_lat, min_lon, max_lat, max_lon = bbox
+    return (
+        (table.c.max_lat >= min_lat) & (table.c.min_lat <= max_lat)
+        & (table.c.max_lon >= min_lon) & (table.c.min_lon <= max_lon)
+    )
+
+
+def _range_where(model, bbox: BBox, dialect: str):
+    min_lat, min_lon, max_lat, max_lon = bbox
+    if dialect == "postgresql":
+        # Matches the GiST expression index created in ensure_spatial_index
+        box = func.box(func.point(min_lon, min_lat), func.point(max_lon, max_lat))
+        return func.point(model.lon, model.lat).op("<@")(box)
+    return model.lat.between(min_lat, max_lat) & model.lon.between(min_lon, max_lon)
+
+
+def fix_ids_in_bbox(db: Session, bbox: BBox) -> Select:
+    """SELECT of Fix ids inside `bbox`, for use as an IN (...) subquery."""
+    if has_rtree(db):
+        return select(fix_rtree.c.id).where(_rtree_where(fix_rtree, bbox))
+    return select(Fix.id).where(_range_where(Fix, bbox, _dialect(db)))
+
+
+def airport_ids_in_bbox(db: Session, bbox: BBox) -> Select:
+    if has_rtree(db):
+        return select(airport_rtree.c.id).where(_rtree_where(airport_rtree, bbox))
+    return select(Airport.id).where(_range_where(Airport, bbox, _dialect(db)))
+
+
+def fixes_in_bbox(db: Session, bbox: BBox, *, limit: Optional[int] = None) -> List[Tuple[str, Optional[str], float, float]]:
+    """(ident, country, lat, lon) of fixes inside `bbox`."""
+    stmt = select(Fix.ident, Fix.country, Fix.lat, Fix.lon).where(Fix.id.in_(fix_ids_in_bbox(db, bbox)))
+    if limit:
+        stmt = stmt.limit(limit)
+    return [(i, c, float(la), float(lo)) for i, c, la, lo in db.execute(stmt).all()]
+
+
+def airports_in_bbox(db: Session, bbox: BBox, *, limit: Optional[int] = None) -> List[Tuple[str, float, float]]:
+    """(icao, lat, lon) of airports inside `bbox`, sorted by ICAO."""
+    stmt = (
+        select(Airport.icao, Airport.lat, Airport.lon)
+        .where(Airport.id.in_(airport_ids_in_bbox(db, bbox)))
+        .order_by(Airport.icao)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return [(i, float(la), float(lo)) for i, la, lo in db.execute(stmt).all()]
@@ -0,0 +1,80 @@
+"""Materialized navdata/flight counts (navdata_stats, one row with id=1).
+
+The indexer refreshes the navdata counts after each run and flight-plan
+writes increment `flights` in the same transaction, so status pages read a
+single row instead of running COUNT(*) over every table.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from .models import Airport, Airway, Fix, FlightPlan, NavdataStats, Procedure
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+STATS_ID = 1
+COUNTED = {
+    "airports": Airport,
+    "fixes": Fix,
+    "airways": Airway,
+    "procedures": Procedure,
+    "flights": FlightPlan,
+}
+
+
+def _count_stmt(key: str):
+    return select(func.count()).select_from(COUNTED[key])
+
+
+def _as_dict(row: NavdataStats) -> Dict[str, int]:
+    return {key: int(getattr(row, key) or 0) for key in COUNTED}
+
+
+def refresh_navdata_stats(db: Session, keys: Optional[Iterable[str]] = None) -> Dict[str, int]:
+    """Recount `keys` (default: all) and store them; caller commits."""
+    db.flush()  # sessions run with autoflush=False; count pending rows too
+    keys = list(keys or COUNTED)
+    values = {key: int(db.execute(_count_stmt(key)).scalar() or 0) for key in keys}
+    row = db.get(NavdataStats, STATS_ID)
+    if row is None:
+        # First refresh counts everything so the row is complete
+        missing = {key: int(db.execute(_count_stmt(key)).scalar() or 0) for key in COUNTED if key not in values}
+        row = NavdataStats(id=STATS_ID, **values, **missing)
+        db.add(row)
+    else:
+        for key, value in values.items():
+            setattr(row, key, value)
+    row.updated_at = datetime.utcnow()
+    db.flush()
+    return _as_dict(row)
+
+
+def add_flights(db: Session, n: int = 1) -> None:
+    """Increment the flight count in the caller's transaction."""
+    res = db.execute(
+        update(NavdataStats)
+        .where(NavdataStats.id == STATS_ID)
+        .values(flights=NavdataStats.flights + n, updated_at=datetime.utcnow())
+    )
+    if not res.rowcount:
+        refresh_navdata_stats(db)
+
+
+def get_navdata_stats(db: Session) -> Dict[str, int]:
+    """One-row read; counts live (without writing) if the row does not exist yet."""
+    row = db.get(NavdataStats, STATS_ID)
+    if row is not None:
+        return _as_dict(row)
+    return {key: int(db.execute(_count_stmt(key)).scalar() or 0) for key in COUNTED}
+
+
+async def get_navdata_stats_async(db: "AsyncSession") -> Dict[str, int]:
+    row = await db.get(NavdataStats, STATS_ID)
+    if row is not None:
+        return _as_dict(row)
+    return {key: int((await db.execute(_count_stmt(key))).scalar() or 0) for key in COUNTED}
@@ -1,13 +1,20 @@
 import os
 import sys
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from .api.routes import router as api_router
 from .api.admin import router as admin_router
-from .db.models import Base
-from .db.session import engine
+from .api.history import router as history_router
+from .db.schema import ensure_schema
+from .db.session import SessionLocal, engine
+from .db.async_session import dispose_async_engine
+from .db.snapshot import close_navdata_snapshot, refresh_navdata_snapshot
+from .services.plan_writer import plan_writer
+from .utils.dbnav import navdata_version_db
+from .utils.navgraph import ensure_navgraph
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -31,8 +38,44 @@ def _configure_logging():
     logger.setLevel(logging.INFO)
 
 
+def _attach_navgraph() -> None:
+    """Map the shared airway graph, compiling it once if no worker has yet."""
+    db = SessionLocal()
+    try:
+        ensure_navgraph(db, version=navdata_version_db(db))
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # Schema upgrade is a startup step rather than an import side effect, so
+    # importing the app (tests, tooling, worker fork) stays cheap. Deployments
+    # that migrate once via `python -m app.db.schema` can set AUTO_SCHEMA=0.
+    if os.getenv("AUTO_SCHEMA", "1").strip().lower() not in ("0", "false", "no", "off"):
+        try:
+            ensure_schema(engine)
+        except Exception as e:
+            # Lazy create will be available via /admin/init if this fails
+            logging.getLogger("app").warning("Schema check failed: %s", e)
+    try:
+        refresh_navdata_snapshot()
+    except Exception as e:
+        # Reads fall back to the on-disk database
+        logging.getLogger("app").warning("Navdata snapshot not loaded: %s", e)
+    try:
+        _attach_navgraph()
+    except Exception as e:
+        logging.getLogger("app").warning("Shared navgraph not attached: %s", e)
+    yield
+    # Commit queued flight plans before the process exits
+    plan_writer.stop()
+    await dispose_async_engine()
+    close_navdata_snapshot()
+
+
 def create_app() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=_lifespan)
 
     # Mount static if present
     if os.path.isdir(STATIC_DIR):
@@ -47,15 +90,9 @@ def create_app() -> FastAPI:
     # Include API routes
     app.include_router(api_router)
     app.include_router(admin_router)
+    app.include_router(history_router)
 
     return app
 
 
 app = create_app()
-
-# Ensure tables exist on import (container start)
-try:
-    Base.metadata.create_all(bind=engine)
-except Exception:
-    # Lazy create will be available via /admin/init if this fails
-    pass
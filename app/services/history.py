@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import base64
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.db.models import FlightPlan, FlightPlanDaily
+
+MAX_PAGE_SIZE = 200
+
+_PAGE_COLUMNS = (
+    FlightPlan.id, FlightPlan.ref, FlightPlan.created_at, FlightPlan.origin, FlightPlan.dest,
+    FlightPlan.aircraft, FlightPlan.fl_start, FlightPlan.fl_end, FlightPlan.cycle,
+    FlightPlan.route_text, FlightPlan.sid_text, FlightPlan.star_text, FlightPlan.distance_nm,
+)
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("ascii")
+        ts, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {cursor!r}") from e
+
+
+def list_plans(
+    db: Session,
+    *,
+    origin: Optional[str] = None,
+    dest: Optional[str] = None,
+    aircraft: Optional[str] = None,
+    cycle: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> dict:
+    """Newest-first page of flight plans using keyset pagination on (created_at, id).
+
+    Each page is a single index range scan (see the ix_fpl_*_created indexes),
+    so cost does not grow with the page number the way OFFSET does.
+    """
+    limit = max(1, min(int(limit or 50), MAX_PAGE_SIZE))
+    stmt = select(*_PAGE_COLUMNS)
+    if origin:
+        stmt = stmt.where(FlightPlan.origin == origin.strip().upper())
+    if dest:
+        stmt = stmt.where(FlightPlan.dest == dest.strip().upper())
+    if aircraft:
+        stmt = stmt.where(FlightPlan.aircraft == aircraft.strip())
+    if cycle:
+        stmt = stmt.where(FlightPlan.cycle == cycle.strip())
+    if cursor:
+        ts, row_id = decode_cursor(cursor)
+        stmt = stmt.where(tuple_(FlightPlan.created_at, FlightPlan.id) < tuple_(ts, row_id))
+    stmt = stmt.order_by(FlightPlan.created_at.desc(), FlightPlan.id.desc()).limit(limit + 1)
+    rows = db.execute(stmt).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    items = []
+    for r in rows:
+        items.append({
+            "ref": r.ref,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+            "origin": r.origin,
+            "dest": r.dest,
+            "aircraft": r.aircraft,
+            "fl_start": r.fl_start,
+            "fl_end": r.fl_end,
+            "cycle": r.cycle,
+            "route_text": r.route_text,
+            "sid_text": r.sid_text,
+            "star_text": r.star_text,
+            "distance_nm": r.distance_nm,
+        })
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more and rows else None
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def _daily_deltas(rows: List[dict]) -> Dict[Tuple[date, str, str], List[float]]:
+    deltas: Dict[Tuple[date, str, str], List[float]] = defaultdict(lambda: [0, 0.0, 0])
+    for row in rows:
+        created = row.get("created_at") or datetime.utcnow()
+        d = deltas[(created.date(), row["origin"], row["dest"])]
+        d[0] += 1
+        if row.get("distance_nm") is not None:
+            d[1] += float(row["distance_nm"])
+            d[2] += 1
+    return deltas
+
+
+def record_daily_stats(db: Session, rows: List[dict]) -> None:
+    """Fold newly inserted FlightPlan rows into flight_plan_daily; caller commits."""
+    dialect = db.get_bind().dialect.name
+    for (day, origin, dest), (plans, nm_sum, nm_count) in _daily_deltas(rows).items():
+        values = {"day": day, "origin": origin, "dest": dest, "plans": plans,
+                  "route_nm_sum": nm_sum, "route_nm_count": nm_count}
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            stmt = dialect_insert(FlightPlanDaily).values(**values)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["day", "origin", "dest"],
+                set_={
+                    "plans": FlightPlanDaily.plans + stmt.excluded.plans,
+                    "route_nm_sum": FlightPlanDaily.route_nm_sum + stmt.excluded.route_nm_sum,
+                    "route_nm_count": FlightPlanDaily.route_nm_count + stmt.excluded.route_nm_count,
+                },
+            )
+            db.execute(stmt)
+            continue
+        res = db.execute(
+            update(FlightPlanDaily)
+            .where(FlightPlanDaily.day == day, FlightPlanDaily.origin == origin, FlightPlanDaily.dest == dest)
+            .values(plans=FlightPlanDaily.plans + plans,
+                    route_nm_sum=FlightPlanDaily.route_nm_sum + nm_sum,
+                    route_nm_count=FlightPlanDaily.route_nm_count + nm_count)
+        )
+        if not res.rowcount:
+            db.execute(insert(FlightPlanDaily).values(**values))
+
+
+def rebuild_daily_stats(db: Session) -> int:
+    """Recompute flight_plan_daily from flight_plans in one set-based pass; caller commits."""
+    day = func.date(FlightPlan.created_at)
+    src = select(
+        day.label("day"),
+        FlightPlan.origin,
+        FlightPlan.dest,
+        func.count().label("plans"),
+        func.coalesce(func.sum(FlightPlan.distance_nm), 0.0).label("route_nm_sum"),
+        func.count(FlightPlan.distance_nm).label("route_nm_count"),
+    ).group_by(day, FlightPlan.origin, FlightPlan.dest)
+    db.execute(delete(FlightPlanDaily))
+    res = db.execute(
+        insert(FlightPlanDaily).from_select(
+            ["day", "origin", "dest", "plans", "route_nm_sum", "route_nm_count"], src
+        )
+    )
+    return res.rowcount or 0
+
+
+def history_stats(db: Session, *, days: int = 30, top: int = 10) -> dict:
+    """Top city pairs, plans per day and average route length from flight_plan_daily."""
+    since = datetime.utcnow().date() - timedelta(days=max(1, int(days or 30)) - 1)
+    in_range = FlightPlanDaily.day >= since
+    plans = func.sum(FlightPlanDaily.plans)
+    nm_sum = func.sum(FlightPlanDaily.route_nm_sum)
+    nm_count = func.sum(FlightPlanDaily.route_nm_count)
+
+    pairs = db.execute(
+        select(FlightPlanDaily.origin, FlightPlanDaily.dest, plans.label("plans"),
+               nm_sum.label("nm_sum"), nm_count.label("nm_count"))
+        .where(in_range)
+        .group_by(FlightPlanDaily.origin, FlightPlanDaily.dest)
+        .order_by(plans.desc(), FlightPlanDaily.origin, FlightPlanDaily.dest)
+        .limit(max(1, min(int(top or 10), 100)))
+    ).all()
+    per_day = db.execute(
+        select(FlightPlanDaily.day, plans.label("plans")).where(in_range)
+        .group_by(FlightPlanDaily.day).order_by(FlightPlanDaily.day)
+    ).all()
+    total_plans, total_nm, total_nm_count = db.execute(
+        select(plans, nm_sum, nm_count).where(in_range)
+    ).one()
+
+    def avg(s, n) -> Optional[float]:
+        return round(float(s) / int(n), 1) if n else None
+
+    return {
+        "since": since.isoformat(),
+        "total_plans": int(total_plans or 0),
+        "avg_route_nm": avg(total_nm, total_nm_count),
+        "top_pairs": [
+            {"origin": o, "dest": d, "plans": int(p), "avg_route_nm": avg(s, n)}
+            for o, d, p, s, n in pairs
+        ],
+        "per_day": [{"day": str(d), "plans": int(p)} for d, p in per_day],
+    }
@@ -0,0 +1,82 @@
+"""Conditional-GET helpers for responses that only change with the navdata.
+
+ETags are weak validators hashed from the navdata version (AIRAC cycle plus
+index generation, see dbnav.navdata_version_db) or other version input and
+the request parameters, so a handler can answer If-None-Match with 304
+before doing any rendering work.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Dict, Generic, Optional, Tuple, TypeVar
+
+from fastapi import Request, Response
+
+T = TypeVar("T")
+
+
+def make_etag(*parts: object) -> str:
+    raw = "\x1f".join("" if p is None else str(p) for p in parts)
+    return 'W/"' + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:24] + '"'
+
+
+def cache_control(max_age: int, *, immutable: bool = False) -> str:
+    value = f"public, max-age={max(0, int(max_age))}"
+    return value + ", immutable" if immutable else value
+
+
+def _opaque(tag: str) -> str:
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison of `etag` against the request's If-None-Match list."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    want = _opaque(etag)
+    return any(_opaque(t) == want for t in header.split(","))
+
+
+def not_modified(etag: str, cache: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache})
+
+
+def set_cache_headers(resp: Response, etag: str, cache: str) -> Response:
+    resp.headers["ETag"] = etag
+    resp.headers["Cache-Control"] = cache
+    return resp
+
+
+class TTLCache(Generic[T]):
+    """Small thread-safe key -> value memo whose entries expire after `ttl` seconds."""
+
+    def __init__(self, ttl: float, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, T]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[T]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None:
+                return None
+            if time.monotonic() - hit[0] > self.ttl:
+                del self._data[key]
+                return None
+            return hit[1]
+
+    def put(self, key: str, value: T) -> None:
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                now = time.monotonic()
+                self._data = {k: v for k, v in self._data.items() if now - v[0] <= self.ttl}
+                if len(self._data) >= self.max_entries:
+                    self._data.pop(next(iter(self._data)))
+            self._data[key] = (time.monotonic(), value)
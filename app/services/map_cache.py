@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+def _env_flag(name: str, default: str = "") -> bool:
+    return os.getenv(name, default).strip().lower() in ("1", "true", "yes", "on")
+
+
+class MapCache:
+    """Thread-safe LRU cache for rendered maps, bounded by total stored bytes.
+
+    Values are (text, total_distance_nm). With `compress=True` the text is
+    stored gzip-compressed, which typically shrinks Folium HTML ~10x at the
+    cost of a decompress on hit.
+    """
+
+    def __init__(self, max_bytes: int, *, compress: bool = False) -> None:
+        self.max_bytes = max(0, int(max_bytes))
+        self.compress = compress
+        self._items: OrderedDict[str, Tuple[bytes, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+        blob, total = entry
+        text = gzip.decompress(blob) if self.compress else blob
+        return text.decode("utf-8"), total
+
+    def put(self, key: str, text: str, total: float) -> None:
+        blob = text.encode("utf-8")
+        if self.compress:
+            blob = gzip.compress(blob, compresslevel=5)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[0])
+            self._items[key] = (blob, total)
+            self._bytes += len(blob)
+            while self._bytes > self.max_bytes and self._items:
+                _, (evicted, _) = self._items.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes,
+                    "hits": self.hits, "misses": self.misses, "compress": self.compress}
+
+
+def map_cache_key(kind: str, items: str, origin: str, dest: str, theme: Optional[str], version: Optional[str]) -> str:
+    """Hash of (kind, normalized route tokens, origin, dest, theme, navdata version).
+
+    Folium only distinguishes light from dark tiles, so theme is folded to
+    'light'/'dark'; pass theme=None for theme-independent payloads.
+    """
+    tokens = " ".join(t.upper() for t in (items or "").split())
+    theme_key = "" if theme is None else ("light" if theme.strip().lower() == "light" else "dark")
+    raw = "\x1f".join([kind, tokens, (origin or "").strip().upper(), (dest or "").strip().upper(), theme_key, (version or "").strip()])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+map_cache = MapCache(
+    int(float(os.getenv("MAP_CACHE_MB", "32")) * 1024 * 1024),
+    compress=_env_flag("MAP_CACHE_GZIP"),
+)
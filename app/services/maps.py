@@ -1,9 +1,18 @@
-from typing import List, Tuple, Dict
-import folium
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Tuple, Dict, Optional
 from app.utils.geo import haversine_nm
 
+if TYPE_CHECKING:
+    import folium
+
+# folium (and branca) are only imported when a server-side map is rendered;
+# the default Leaflet path never needs them, which keeps worker startup fast.
+
 
 def _add_distance_label(m: folium.Map, lat: float, lon: float, text: str, color: str = '#cfd8dc') -> None:
+    import folium
+
     folium.map.Marker(
         location=[lat, lon],
         icon=folium.DivIcon(html=(
@@ -15,6 +24,8 @@ def _add_distance_label(m: folium.Map, lat: float, lon: float, text: str, color:
 
 
 def _add_text_label(m: folium.Map, lat: float, lon: float, text: str, *, color: str = '#8bd9f8', dy_px: int = -14, size_px: int = 11, weight='normal') -> None:
+    import folium
+
     folium.map.Marker(
         location=[lat, lon],
         icon=folium.DivIcon(html=(
@@ -25,6 +36,93 @@ def _add_text_label(m: folium.Map, lat: float, lon: float, text: str, *, color:
     ).add_to(m)
 
 
+def _route_legs(
+    coords: List[Tuple[float, float, str]],
+    o: Optional[Tuple[float, float]],
+    d: Optional[Tuple[float, float]],
+    route_indicates_none: bool,
+) -> List[Tuple[float, float, float, float, str]]:
+    """Return map legs as (lat1, lon1, lat2, lon2, kind), kind in {'route', 'connector'}.
+
+    Connectors are the dashed airport <-> first/last fix legs (or the airport
+    pair itself when no route was generated).
+    """
+    legs: List[Tuple[float, float, float, float, str]] = []
+    if o and coords:
+        legs.append((o[0], o[1], coords[0][0], coords[0][1], 'connector'))
+    for i in range(len(coords) - 1):
+        legs.append((coords[i][0], coords[i][1], coords[i + 1][0], coords[i + 1][1], 'route'))
+    if d and coords:
+        legs.append((coords[-1][0], coords[-1][1], d[0], d[1], 'connector'))
+    if (o and d) and route_indicates_none and not coords:
+        legs.append((o[0], o[1], d[0], d[1], 'connector'))
+    return legs
+
+
+def _pt(lat: float, lon: float) -> List[float]:
+    # GeoJSON order is [lon, lat]; 5 decimals is ~1 m, plenty for a route map
+    return [round(lon, 5), round(lat, 5)]
+
+
+def build_route_geojson(
+    coords: List[Tuple[float, float, str]],
+    apt_coords: Dict[str, Tuple[float, float]],
+    origin: str,
+    dest: str,
+    route_indicates_none: bool,
+) -> dict:
+    """Build a compact GeoJSON FeatureCollection for the client-side map.
+
+    Features: one 'route' LineString (with per-leg distances), 'connector'
+    LineStrings, and 'fix'/'origin'/'dest' Points. The collection carries
+    `total_distance_nm` as a foreign member.
+    """
+    origin_u = (origin or '').upper()
+    dest_u = (dest or '').upper()
+    o = apt_coords.get(origin_u) if origin_u else None
+    d = apt_coords.get(dest_u) if dest_u else None
+
+    features: List[dict] = []
+    legs = _route_legs(coords, o, d, route_indicates_none)
+    route_legs_nm: List[float] = []
+    total_distance_nm = 0.0
+    for (lat1, lon1, lat2, lon2, kind) in legs:
+        leg_nm = haversine_nm(lat1, lon1, lat2, lon2)
+        total_distance_nm += leg_nm
+        if kind == 'route':
+            route_legs_nm.append(round(leg_nm, 1))
+        else:
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": [_pt(lat1, lon1), _pt(lat2, lon2)]},
+                "properties": {"kind": "connector", "distance_nm": round(leg_nm, 1)},
+            })
+    if len(coords) >= 2:
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [_pt(lat, lon) for lat, lon, _ in coords]},
+            "properties": {"kind": "route", "legs_nm": route_legs_nm},
+        })
+    for lat, lon, name in coords:
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": _pt(lat, lon)},
+            "properties": {"kind": "fix", "name": name},
+        })
+    for kind, code, pos in (("origin", origin_u, o), ("dest", dest_u, d)):
+        if pos:
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": _pt(pos[0], pos[1])},
+                "properties": {"kind": kind, "name": code},
+            })
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "total_distance_nm": round(total_distance_nm, 1),
+    }
+
+
 def build_route_map_html(
     coords: List[Tuple[float, float, str]],
     apt_coords: Dict[str, Tuple[float, float]],
@@ -39,6 +137,8 @@ def build_route_map_html(
     - Default behavior: treat 'auto'/None as dark tiles (map defaults to dark).
       Only when theme is explicitly 'light' do we use light tiles.
     """
+    import folium
+
     theme = (theme or 'auto').lower()
     # Default map theme is dark. Use light tiles only if explicitly requested.
     tiles_name = 'CartoDB positron' if theme == 'light' else 'CartoDB dark_matter'
@@ -64,22 +164,10 @@ def build_route_map_html(
         points.append(d)
 
     label_legs: List[Tuple[float, float, float, float, str]] = []
-    if o and coords:
-        first = coords[0]
-        folium.PolyLine([[o[0], o[1]], [first[0], first[1]]], color='#90a4ae', weight=2, opacity=0.85, dash_array='4,6').add_to(m)
-        label_legs.append((o[0], o[1], first[0], first[1], '#cfd8dc'))
-    if len(coords) >= 2:
-        for i in range(len(coords) - 1):
-            lat1, lon1, _ = coords[i]
-            lat2, lon2, _ = coords[i + 1]
-            label_legs.append((lat1, lon1, lat2, lon2, '#ffd54f'))
-    if d and coords:
-        last = coords[-1]
-        folium.PolyLine([[last[0], last[1]], [d[0], d[1]]], color='#90a4ae', weight=2, opacity=0.85, dash_array='4,6').add_to(m)
-        label_legs.append((last[0], last[1], d[0], d[1], '#cfd8dc'))
-    if (o and d) and route_indicates_none and not coords:
-        folium.PolyLine([[o[0], o[1]], [d[0], d[1]]], color='#90a4ae', weight=2, opacity=0.85, dash_array='4,6').add_to(m)
-        label_legs.append((o[0], o[1], d[0], d[1], '#cfd8dc'))
+    for (lat1, lon1, lat2, lon2, kind) in _route_legs(coords, o, d, route_indicates_none):
+        if kind == 'connector':
+            folium.PolyLine([[lat1, lon1], [lat2, lon2]], color='#90a4ae', weight=2, opacity=0.85, dash_array='4,6').add_to(m)
+        label_legs.append((lat1, lon1, lat2, lon2, '#cfd8dc' if kind == 'connector' else '#ffd54f'))
 
     total_distance_nm = 0.0
     for (lat1, lon1, lat2, lon2, color) in label_legs:
@@ -1,15 +1,19 @@
 from typing import Tuple, Optional, List
 from datetime import datetime
-import requests
-from bs4 import BeautifulSoup
 from .loadsheets import parse_loadsheet
 
 # These services currently reuse the logic from RouteHelper via HTTP/HTML parsing
 # to minimize risk while modularizing. They can be improved later to share pure
 # utility functions.
+#
+# requests and BeautifulSoup/html5lib are imported on first call rather than at
+# module import: only the handlers that reach external services need them.
 
 
 def fetch_loadsheet(origin: str, dest: str, plane: str) -> tuple[str, Optional[dict]]:
+    import requests
+    from bs4 import BeautifulSoup
+
     headers = {
         'okstart': 1,
         'EQPT': plane.upper(),
@@ -31,6 +35,9 @@ def fetch_loadsheet(origin: str, dest: str, plane: str) -> tuple[str, Optional[d
 
 
 def fetch_route(origin: str, dest: str, minalt: str, maxalt: str, cycle: int) -> tuple[List[str], str]:
+    import requests
+    from bs4 import BeautifulSoup
+
     headers = {
         'id1': origin.upper(),
         'ic1': '',
@@ -58,6 +65,9 @@ def fetch_route(origin: str, dest: str, minalt: str, maxalt: str, cycle: int) ->
 
 
 def fetch_metar(icao: str) -> str:
+    import requests
+    from bs4 import BeautifulSoup
+
     r = requests.get(f'https://aviationweather.gov/api/data/metar?ids={icao}')
     soup = BeautifulSoup(r.text, 'html5lib')
     return soup.text or ""
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import logging
+import os
+import queue
+import threading
+import uuid
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.db.models import FlightPlan
+from app.db.stats import add_flights
+from app.services.history import record_daily_stats
+
+log = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def new_plan_ref() -> str:
+    """Public flight-plan identifier, known before the row is written."""
+    return uuid.uuid4().hex
+
+
+def write_behind_enabled() -> bool:
+    return os.getenv("PLAN_WRITE_BEHIND", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def insert_flight_plans(db, rows: List[dict]) -> None:
+    """Insert FlightPlan rows and update counters/daily aggregates; caller commits."""
+    db.execute(insert(FlightPlan), rows)
+    add_flights(db, len(rows))
+    record_daily_stats(db, rows)
+
+
+class FlightPlanWriter:
+    """Background writer that batches FlightPlan inserts into grouped transactions.
+
+    `submit()` never touches the database: rows go into a bounded queue and a
+    single thread commits them in batches of up to `batch_size`, waiting at
+    most `flush_interval` seconds to fill a batch. Rows stay visible through
+    `pending()` until their batch is committed. `stop()` drains the queue.
+    """
+
+    def __init__(self, *, max_pending: int = 1000, batch_size: int = 100, flush_interval: float = 0.5) -> None:
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+        self._queue: "queue.Queue[object]" = queue.Queue(maxsize=max(1, max_pending))
+        self._pending: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self.written = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="flightplan-writer", daemon=True)
+                self._thread.start()
+
+    def submit(self, row: dict) -> bool:
+        """Queue a row (must carry `ref`); False if the buffer is full."""
+        self.start()
+        with self._lock:
+            self._pending[row["ref"]] = row
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(row["ref"], None)
+            return False
+        return True
+
+    def pending(self, ref: str) -> Optional[dict]:
+        with self._lock:
+            return self._pending.get(ref)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        with self._lock:
+            thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            log.warning("Flight plan writer did not finish within %.1fs (%d rows pending)", timeout, len(self._pending))
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, "written": self.written, "failed": self.failed}
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    nxt = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    break
+                if nxt is _STOP:
+                    stopping = True
+                    break
+                batch.append(nxt)
+            self._write(batch)
+
+    def _write(self, batch: List[dict]) -> None:
+        from app.db.session import SessionLocal
+
+        db = SessionLocal()
+        try:
+            try:
+                insert_flight_plans(db, batch)
+                db.commit()
+                self.written += len(batch)
+            except Exception as e:
+                # Retry one by one so a single bad row does not drop the batch
+                db.rollback()
+                log.warning("Flight plan batch of %d failed (%s); retrying individually", len(batch), e)
+                for row in batch:
+                    try:
+                        insert_flight_plans(db, [row])
+                        db.commit()
+                        self.written += 1
+                    except Exception as e2:
+                        db.rollback()
+                        self.failed += 1
+                        log.error("Dropping flight plan %s: %s", row.get("ref"), e2)
+        finally:
+            db.close()
+            with self._lock:
+                for row in batch:
+                    self._pending.pop(row["ref"], None)
+
+
+plan_writer = FlightPlanWriter(
+    max_pending=int(os.getenv("PLAN_WRITE_QUEUE", "1000")),
+    batch_size=int(os.getenv("PLAN_WRITE_BATCH", "100")),
+    flush_interval=float(os.getenv("PLAN_WRITE_FLUSH_MS", "500")) / 1000.0,
+)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 import logging
 from sqlalchemy.orm import Session
 
-from app.utils.db_graph import build_graph_from_db, nearest_graph_fixes_db
-from app.utils.dbnav import get_airport_coords_db
+from app.utils import airways as file_graph
+from app.utils.db_graph import build_graph, nearby_graph_fixes_db, nearest_graph_fixes_db
+from app.utils.airport_index import get_airport_index
+from app.db.spatial import corridor_bbox
 
 log = logging.getLogger(__name__)
 
@@ -27,6 +30,7 @@ class PlannerOptions:
     max_dct_steps: int = 3              # max number of DCT hops (we may cap to 5)
     dct_radius_nm: float = 120.0        # search radius for DCT neighbors
     dct_neighbors_limit: int = 25       # limit neighbors examined per node
+    corridor_nm: Optional[float] = None # only load airways within this margin of the origin/dest box
 
 
 def _pick_cruise_fl(fl_start: int, fl_end: int) -> int:
@@ -178,35 +182,89 @@ def _dijkstra_with_dct(
     return route_nodes, best_cost, airway_labels
 
 
+@dataclass
+class PlannedRoute:
+    route_list: List[str]
+    route_text: str
+    nodes: List[str] = field(default_factory=list)  # IDENT@CC graph nodes, in order
+    points: List[Tuple[float, float, str]] = field(default_factory=list)  # (lat, lon, ident)
+    distance_nm: Optional[float] = None
+
+
 def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str], str]:
     """Generate a route list per standards in route_generator_context.md.
 
     Output is (route_list, route_text)
     """
+    planned = plan_standards_route_detailed(db, opts)
+    return planned.route_list, planned.route_text
+
+
+# (cruise_fl=, fl_range=, include_only_matching_class=, bbox=) -> (adj, coords)
+GraphBuilder = Callable[..., Tuple[Dict[str, List[Tuple[str, float, str]]], Dict[str, Tuple[float, float]]]]
+AirportLookup = Callable[[str], Optional[Tuple[float, float]]]
+# (coords, adj, lat, lon, max_radius_nm=, limit=) -> [(node, distance_nm)], nearest first
+NearbyFixes = Callable[..., List[Tuple[str, float]]]
+
+
+def plan_standards_route_detailed(db: Session, opts: PlannerOptions) -> PlannedRoute:
+    """Same as plan_standards_route, but also returns the resolved graph nodes
+    and their coordinates so callers can persist the geometry."""
+    return _plan_with_retry(opts, get_airport_index(db).get, partial(build_graph, db), partial(nearby_graph_fixes_db, db))
+
+
+def plan_route_from_files(opts: PlannerOptions) -> PlannedRoute:
+    """plan_standards_route_detailed without a database: airports and airways are
+    read from the navdata files under DATA_PATH (or their compiled snapshot)."""
+    return _plan_with_retry(opts, file_graph.load_airports().get, file_graph.build_graph)
+
+
+def _plan_with_retry(
+    opts: PlannerOptions,
+    airport: AirportLookup,
+    graph: GraphBuilder,
+    nearby: NearbyFixes = nearest_graph_fixes_db,
+) -> PlannedRoute:
+    planned = _plan(opts, airport, graph, nearby)
+    if not planned.route_list and opts.corridor_nm:
+        log.info("No route inside %.0fNM corridor; retrying with the full airway graph", opts.corridor_nm)
+        planned = _plan(replace(opts, corridor_nm=None), airport, graph, nearby)
+    return planned
+
+
+def _plan(opts: PlannerOptions, airport: AirportLookup, graph: GraphBuilder, nearby: NearbyFixes) -> PlannedRoute:
     origin = (opts.origin or "").upper().strip()
     dest = (opts.dest or "").upper().strip()
     log.info("Planner start: %s->%s FL[%s,%s]", origin, dest, opts.fl_start, opts.fl_end)
     if not origin or not dest:
-        return [], "No route generated."
+        return PlannedRoute([], "No route generated.")
 
     # Choose a representative cruise FL and graph altitude window
     cruise_fl = _pick_cruise_fl(opts.fl_start, opts.fl_end)
     fl_lo, fl_hi = min(opts.fl_start, opts.fl_end), max(opts.fl_start, opts.fl_end)
 
+    o_ll = airport(origin)
+    d_ll = airport(dest)
+    if not o_ll or not d_ll:
+        log.warning("Missing airport coords for origin/dest")
+        return PlannedRoute([], "No route generated. (Airport coordinates not found)")
+
+    # Optional corridor: bounding-box query on the spatial index instead of the whole airway table
+    bbox = corridor_bbox(o_ll, d_ll, opts.corridor_nm) if opts.corridor_nm else None
+    if bbox is not None:
+        log.debug("Corridor bbox=%s", bbox)
+    elif opts.corridor_nm:
+        log.info("Corridor crosses the antimeridian or nears a pole; using the full airway graph")
+
     # Build airway graph filtered by class and altitude
-    adj, coords = build_graph_from_db(
-        db,
+    adj, coords = graph(
         cruise_fl=cruise_fl,
         fl_range=(fl_lo, fl_hi),
         include_only_matching_class=opts.strict_class_match,
+        bbox=bbox,
     )
 
-    apt_coords = get_airport_coords_db(db)
-    o_ll = apt_coords.get(origin)
-    d_ll = apt_coords.get(dest)
-    if not o_ll or not d_ll:
-        log.warning("Missing airport coords for origin/dest")
-        return [], "No route generated. (Airport coordinates not found)"
+    node_coords = coords
 
     # Candidate graph nodes near origin/dest to attach to en-route network
     # Use user-selected radius first, then adaptively expand
@@ -217,7 +275,7 @@ def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str],
     def adaptive_candidates(lat: float, lon: float) -> List[Tuple[str, float]]:
         for mul in (1.0, 1.5, 2.0, 3.0, 4.0):
             r = min(500.0, base_radius * mul)
-            cands = nearest_graph_fixes_db(coords, adj, lat, lon, max_radius_nm=r, limit=limit_n)
+            cands = nearby(coords, adj, lat, lon, max_radius_nm=r, limit=limit_n)
             log.debug("Candidate pass r=%.1f -> %d", r, len(cands))
             if cands:
                 return cands
@@ -227,7 +285,7 @@ def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str],
     dest_candidates = adaptive_candidates(d_ll[0], d_ll[1])
     if not origin_candidates or not dest_candidates:
         log.warning("Candidates missing. origin=%d dest=%d", len(origin_candidates), len(dest_candidates))
-        return [], "No route generated. (No nearby airway fixes)"
+        return PlannedRoute([], "No route generated. (No nearby airway fixes)")
     log.debug("Origin candidates: %s", origin_candidates[:6])
     log.debug("Dest candidates: %s", dest_candidates[:6])
 
@@ -258,7 +316,7 @@ def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str],
     if not best_route:
         if not opts.allow_dct_bridging or opts.max_dct_steps <= 0:
             log.info("No graph path found and DCT bridging disabled")
-            return [], "No route generated. (No graph path)"
+            return PlannedRoute([], "No route generated. (No graph path)")
         log.info("No graph-only path found. Retrying with limited DCT bridging...")
         # Retry allowing DCT hops, gradually increasing steps
         max_steps_cap = min(5, max(1, opts.max_dct_steps))
@@ -290,16 +348,17 @@ def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str],
             # Fallback: rebuild graph allowing mixed route classes and retry
             if opts.strict_class_match:
                 log.info("Retrying with mixed route classes (strict_class_match=False)")
-                adj2, coords2 = build_graph_from_db(
-                    db,
+                adj2, coords2 = graph(
                     cruise_fl=cruise_fl,
                     fl_range=(fl_lo, fl_hi),
                     include_only_matching_class=False,
+                    bbox=bbox,
                 )
+                node_coords = coords2
                 def adaptive_candidates2(lat: float, lon: float) -> List[Tuple[str, float]]:
                     for mul in (1.0, 1.5, 2.0, 3.0, 4.0):
                         r = min(600.0, base_radius * mul)
-                        cands = nearest_graph_fixes_db(coords2, adj2, lat, lon, max_radius_nm=r, limit=max(10, limit_n))
+                        cands = nearby(coords2, adj2, lat, lon, max_radius_nm=r, limit=max(10, limit_n))
                         log.debug("[mix] Candidate pass r=%.1f -> %d", r, len(cands))
                         if cands:
                             return cands
@@ -341,9 +400,9 @@ def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str],
                                         best_airways = awys
                                         best_pair = (s, g)
                 if not best_route:
-                    return [], "No route generated. (No graph/DCT path)"
+                    return PlannedRoute([], "No route generated. (No graph/DCT path)")
             else:
-                return [], "No route generated. (No graph/DCT path)"
+                return PlannedRoute([], "No route generated. (No graph/DCT path)")
 
     # Assemble route string: we will output fixes separated with airways when airway changes
     # e.g., FIX1 AWY FIX2 FIX3 AWY2 FIX4 ...
@@ -369,5 +428,12 @@ def plan_standards_route(db: Session, opts: PlannerOptions) -> Tuple[List[str],
         best_pair[0] if best_pair else '',
         best_pair[1] if best_pair else '',
     )
-    return route_list, route_text
+    points = [(*node_coords[n], n.split('@')[0]) for n in best_route if n in node_coords]
+    return PlannedRoute(
+        route_list,
+        route_text,
+        nodes=list(best_route),
+        points=points,
+        distance_nm=best_cost if best_cost != float('inf') else None,
+    )
 
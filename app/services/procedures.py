@@ -1,6 +1,10 @@
-from typing import Tuple, List, Dict
+from itertools import groupby
+from typing import Tuple, List, Dict, Iterable
 from sqlalchemy.orm import Session
+from app.core.indexer import ensure_procedures_indexed
+from app.db.models import ProcedureLeg
 from app.utils.dbnav import get_procedure_texts_db
+from app.utils.geo import haversine_nm
 
 
 def _clean_dictionary(obj_dict: Dict[str, str], proc_type: str) -> None:
@@ -62,14 +66,61 @@ def infer_sid_star(db: Session, origin: str, dest: str, route_list: List[str]) -
     star_text = "No STAR fix found."
     try:
         if origin and route_list:
+            ensure_procedures_indexed(origin)
             sid_dict = get_procedure_texts_db(db, origin, kind='SID')
             sid_text = search_in_dict_text(sid_dict, route_list[0]) or sid_text
     except Exception as e:
         sid_text = f"Error: {e}"
     try:
         if dest and route_list:
+            ensure_procedures_indexed(dest)
             star_dict = get_procedure_texts_db(db, dest, kind='STAR')
             star_text = search_in_dict_text(star_dict, route_list[-1]) or star_text
     except Exception as e:
         star_text = f"Error: {e}"
     return sid_text, star_text
+
+
+def procedure_geometry(legs: Iterable[ProcedureLeg]) -> Tuple[List[Tuple[float, float, str]], float]:
+    """Return (points, length_nm) for one procedure transition's legs.
+
+    Legs without resolved coordinates (e.g. VA/VM legs) are skipped; the length
+    is the sum of great-circle distances between consecutive resolved fixes.
+    """
+    points: List[Tuple[float, float, str]] = []
+    for leg in legs:
+        if leg.lat is None or leg.lon is None:
+            continue
+        if points and points[-1][2] == leg.fix_ident:
+            continue
+        points.append((leg.lat, leg.lon, leg.fix_ident or ''))
+    length_nm = 0.0
+    for (lat1, lon1, _), (lat2, lon2, _) in zip(points, points[1:]):
+        length_nm += haversine_nm(lat1, lon1, lat2, lon2)
+    return points, length_nm
+
+
+def procedure_geojson(legs: Iterable[ProcedureLeg]) -> dict:
+    """GeoJSON FeatureCollection with one LineString per procedure transition.
+
+    `legs` must be ordered by name, transition and sequence (as returned by
+    get_procedure_legs_async). Each feature carries the procedure name,
+    transition, fix idents and its length in NM.
+    """
+    features: List[dict] = []
+    for (proc_type, name, transition), group in groupby(legs, key=lambda leg: (leg.proc_type, leg.name, leg.transition)):
+        points, length_nm = procedure_geometry(group)
+        if not points:
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": [[round(lon, 5), round(lat, 5)] for lat, lon, _ in points]},
+            "properties": {
+                "kind": (proc_type or '').lower(),
+                "name": name,
+                "transition": transition or '',
+                "fixes": [ident for _, _, ident in points],
+                "length_nm": round(length_nm, 1),
+            },
+        })
+    return {"type": "FeatureCollection", "features": features}
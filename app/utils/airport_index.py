@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import re
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db.models import Airport
+from app.utils.dbnav import navdata_version_async, navdata_version_db
+
+_WORD_RE = re.compile(r"[A-Z0-9]+")
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall((text or '').upper())
+
+
+def _deletes(s: str) -> List[str]:
+    """`s` plus every string obtained by deleting one character from it."""
+    return [s] + [s[:i] + s[i + 1:] for i in range(len(s))]
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """True if `b` is one substitution, adjacent swap, insertion or deletion away from `a`."""
+    la, lb = len(a), len(b)
+    if la == lb:
+        diff = [k for k in range(la) if a[k] != b[k]]
+        if len(diff) == 1:
+            return True
+        return len(diff) == 2 and diff[1] == diff[0] + 1 and a[diff[0]] == b[diff[1]] and a[diff[1]] == b[diff[0]]
+    if abs(la - lb) != 1:
+        return False
+    short, long_ = (a, b) if la < lb else (b, a)
+    k = 0
+    while k < len(short) and short[k] == long_[k]:
+        k += 1
+    return short[k:] == long_[k + 1:]
+
+
+class AirportIndex:
+    """Read-only airport table held as sorted ICAOs plus coordinate arrays.
+
+    `get()` is a dict lookup and `suggest()` a binary search over the sorted
+    ICAOs with airport-name and one-typo matching on top. It quacks like the old {ICAO: (lat, lon)} dict, so it can
+    be passed wherever airport coordinates were expected.
+    """
+
+    def __init__(
+        self,
+        icaos: List[str],
+        lats: List[float],
+        lons: List[float],
+        *,
+        names: Optional[List[Optional[str]]] = None,
+        version: Optional[str] = None,
+    ) -> None:
+        order = sorted(range(len(icaos)), key=icaos.__getitem__)
+        self.version = version
+        self.icaos: List[str] = [icaos[i] for i in order]
+        self.names: List[Optional[str]] = [names[i] for i in order] if names else [None] * len(order)
+        self.lat = np.asarray([lats[i] for i in order], dtype=np.float64)
+        self.lon = np.asarray([lons[i] for i in order], dtype=np.float64)
+        self._pos = {icao: i for i, icao in enumerate(self.icaos)}
+        # Text structures for suggest(), built on first use (the planner never needs them)
+        self._text: Optional[tuple] = None
+
+    @classmethod
+    def from_db(cls, db: Session, *, version: Optional[str] = None) -> "AirportIndex":
+        icaos: List[str] = []
+        lats: List[float] = []
+        lons: List[float] = []
+        names: List[Optional[str]] = []
+        for icao, lat, lon, name in db.query(Airport.icao, Airport.lat, Airport.lon, Airport.name).all():
+            if icao:
+                icaos.append(icao.upper())
+                lats.append(float(lat))
+                lons.append(float(lon))
+                names.append(name)
+        return cls(icaos, lats, lons, names=names, version=version)
+
+    def __len__(self) -> int:
+        return len(self.icaos)
+
+    def __contains__(self, icao: object) -> bool:
+        return isinstance(icao, str) and icao.upper() in self._pos
+
+    def get(self, icao: Optional[str], default: Optional[Tuple[float, float]] = None) -> Optional[Tuple[float, float]]:
+        i = self._pos.get((icao or '').upper())
+        if i is None:
+            return default
+        return (float(self.lat[i]), float(self.lon[i]))
+
+    def _text_index(self) -> tuple:
+        """(name words per airport, sorted name tokens, token positions, one-deletion map)."""
+        if self._text is None:
+            name_words = [tuple(_words(n)) if n else () for n in self.names]
+            pairs = sorted({(w, i) for i, ws in enumerate(name_words) for w in ws})
+            deletes: Dict[str, List[int]] = {}
+            for i, icao in enumerate(self.icaos):
+                for key in set(_deletes(icao)):
+                    deletes.setdefault(key, []).append(i)
+            self._text = (name_words, [w for w, _ in pairs], [i for _, i in pairs], deletes)
+        return self._text
+
+    def suggest(self, q: str, limit: int = 20) -> List[Tuple[str, Optional[str]]]:
+        """(ICAO, name) suggestions for `q`, best matches first.
+
+        ICAO prefix matches come first, then airports whose name has a word
+        starting with every word of `q` ("heath", "san fr"), then ICAOs one
+        edit (typo, missing or extra letter) away from `q`.
+        """
+        p = (q or '').strip().upper()
+        lim = max(0, int(limit or 0))
+        if not p or not lim:
+            return []
+        out: List[int] = []
+        seen = set()
+
+        def add(i: int) -> None:
+            if i not in seen:
+                seen.add(i)
+                out.append(i)
+
+        start = bisect_left(self.icaos, p)
+        for i in range(start, len(self.icaos)):
+            if len(out) >= lim or not self.icaos[i].startswith(p):
+                break
+            add(i)
+
+        name_words, tokens, token_pos, deletes = self._text_index()
+        words = _words(p)
+        if words and len(out) < lim:
+            key = max(words, key=len)  # longest word narrows the candidates most
+            j = bisect_left(tokens, key)
+            cands = set()
+            while j < len(tokens) and tokens[j].startswith(key):
+                cands.add(token_pos[j])
+                j += 1
+            for i in sorted(cands):
+                if len(out) >= lim:
+                    break
+                if all(any(w.startswith(x) for w in name_words[i]) for x in words):
+                    add(i)
+
+        if len(out) < lim and 3 <= len(p) <= 8:
+            # Shared one-deletion keys find every ICAO within one edit (plus some at two)
+            fuzzy = set()
+            for key in _deletes(p):
+                fuzzy.update(deletes.get(key, ()))
+            # Same-length typos first, then a missing or extra letter
+            ranked = sorted(
+                (len(self.icaos[i]) != len(p), i) for i in fuzzy
+                if i not in seen and _one_edit(p, self.icaos[i])
+            )
+            for _, i in ranked[:lim - len(out)]:
+                add(i)
+
+        return [(self.icaos[i], self.names[i]) for i in out]
+
+
+_index: Optional[AirportIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_airport_index(db: Session) -> AirportIndex:
+    """Shared airport index, reloaded when the navdata version (cycle + index generation) changes."""
+    global _index
+    version = navdata_version_db(db)
+    idx = _index
+    if idx is not None and idx.version == version:
+        return idx
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = AirportIndex.from_db(db, version=version)
+        return _index
+
+
+async def get_airport_index_async(db) -> AirportIndex:
+    """get_airport_index for an AsyncSession; the table is only read on a version change."""
+    global _index
+    version = await navdata_version_async(db)
+    idx = _index
+    if idx is not None and idx.version == version:
+        return idx
+    built = await db.run_sync(lambda s: AirportIndex.from_db(s, version=version))
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = built
+        return _index
+
+
+def refresh_airport_index(db: Session) -> AirportIndex:
+    """Rebuild the shared index (call after indexing changed the airports table)."""
+    global _index
+    with _index_lock:
+        _index = AirportIndex.from_db(db, version=navdata_version_db(db))
+        return _index
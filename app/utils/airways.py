@@ -1,12 +1,22 @@
+"""File-backed airway graph: plans routes straight from DATA_PATH, without an indexed database."""
+import logging
 import os
 import os.path
+import threading
 from dataclasses import dataclass
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 
-from .navdata import load_fix_catalog
-from .logging_utils import debug
+from .compiled_navdata import get_compiled_navdata
+from .navdata import airway_records, load_airport_coords, load_fix_catalog
+from .navfiles import data_file
 from .geo import haversine_nm
 
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+# (min_lat, min_lon, max_lat, max_lon), as in app.db.spatial
+BBox = Tuple[float, float, float, float]
+
 
 def _data_path() -> str:
     return os.getenv("DATA_PATH", ".")
@@ -25,78 +35,48 @@ class AirwaySegment:
     airway: str
 
 
-def _parse_awy_line(line: str) -> Optional[AirwaySegment]:
-    """Parse a single earth_awy.dat line.
+def _stamp() -> tuple:
+    # Changes whenever one of the navdata files is replaced or edited
+    out = []
+    for name in ("earth_fix.dat", "earth_awy.dat", "earth_aptmeta.dat", "earth_metadata.dat", "cycle.json"):
+        path = data_file(name)
+        try:
+            st = os.stat(path) if path else None
+        except OSError:
+            st = None
+        if st is not None:
+            out.append((os.path.basename(path), st.st_size, st.st_mtime_ns))
+    return (os.path.abspath(_data_path()), tuple(out))
 
-    Supports both formats:
-    - With explicit freq fields (13 tokens total)
-    - Without freq fields (11 tokens total)
-    """
-    if not line or line.startswith(";"):
-        return None
-    parts = line.strip().split()
-    # Heuristic: ignore very short or malformed lines
-    if len(parts) < 11:
-        return None
-
-    try:
-        if len(parts) >= 13:
-            # fix1_id fix1_cc fix1_type fix1_freq fix2_id fix2_cc fix2_type fix2_freq dir cls low up name
-            fix1 = parts[0].upper()
-            fix1_cc = parts[1].upper()
-            # parts[2] type
-            # parts[3] freq
-            fix2 = parts[4].upper()
-            fix2_cc = parts[5].upper()
-            direction = parts[8].upper()
-            route_class = int(parts[9])
-            lower_fl = int(parts[10])
-            upper_fl = int(parts[11])
-            airway = parts[12].upper()
-        else:
-            # 11 tokens: fix1_id fix1_cc fix1_type fix2_id fix2_cc fix2_type dir cls low up name
-            fix1 = parts[0].upper()
-            fix1_cc = parts[1].upper()
-            fix2 = parts[3].upper()
-            fix2_cc = parts[4].upper()
-            direction = parts[6].upper()
-            route_class = int(parts[7])
-            lower_fl = int(parts[8])
-            upper_fl = int(parts[9])
-            airway = parts[10].upper()
-    except Exception:
-        return None
-
-    if direction not in ("N", "P", "M"):
-        # Some data may use other markers; ignore
-        return None
-
-    return AirwaySegment(
-        fix1=fix1,
-        fix1_cc=fix1_cc,
-        fix2=fix2,
-        fix2_cc=fix2_cc,
-        direction=direction,
-        route_class=route_class,
-        lower_fl=lower_fl,
-        upper_fl=upper_fl,
-        airway=airway,
-    )
+
+_cache: Dict[str, Tuple[tuple, object]] = {}
+_cache_lock = threading.Lock()
+
+
+def _cached(name: str, load: Callable[[], T]) -> T:
+    """Per-process memo of a parsed file set, dropped when the files change."""
+    stamp = _stamp()
+    hit = _cache.get(name)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]  # type: ignore[return-value]
+    with _cache_lock:
+        hit = _cache.get(name)
+        if hit is None or hit[0] != stamp:
+            hit = _cache[name] = (stamp, load())
+        return hit[1]  # type: ignore[return-value]
 
 
 def load_airway_segments() -> List[AirwaySegment]:
-    path = os.path.join(_data_path(), "earth_awy.dat")
-    segs: List[AirwaySegment] = []
-    try:
-        with open(path, "r", encoding="utf-8", errors="ignore") as f:
-            for raw in f:
-                seg = _parse_awy_line(raw)
-                if seg:
-                    segs.append(seg)
-    except FileNotFoundError:
-        return []
-    debug(f"Loaded airway segments: {len(segs)} from {path}")
-    return segs
+    def load() -> List[AirwaySegment]:
+        segs = [AirwaySegment(*rec) for rec in airway_records()]
+        log.debug("Loaded airway segments: %d from %s", len(segs), _data_path())
+        return segs
+    return _cached("segments", load)
+
+
+def load_airports() -> Dict[str, Tuple[float, float]]:
+    """ICAO -> (lat, lon) from earth_aptmeta.dat, cached like the airway segments."""
+    return _cached("airports", load_airport_coords)
 
 
 def _fl_overlaps(edge: AirwaySegment, fl_range: Tuple[int, int]) -> bool:
@@ -115,15 +95,27 @@ def build_graph(
     cruise_fl: int,
     fl_range: Tuple[int, int],
     include_only_matching_class: bool = True,
+    bbox: Optional[BBox] = None,
 ) -> Tuple[Dict[str, List[Tuple[str, float, str]]], Dict[str, Tuple[float, float]]]:
     """Build adjacency graph from airway segments.
 
-    Returns (adj, coords_index) where adj maps FIX -> list of (neighbor, distance_nm, airway_name).
+    Returns (adj, coords_index) where adj maps FIX@CC -> list of (neighbor, distance_nm, airway_name),
+    the same shape as db_graph.build_graph. Uses the compiled navdata graph when it
+    is current, otherwise the parsed text files (cached until they change).
     """
+    nav = get_compiled_navdata()
+    if nav is not None:
+        return nav.navgraph().subgraph(
+            cruise_fl=cruise_fl,
+            fl_range=fl_range,
+            include_only_matching_class=include_only_matching_class,
+            bbox=bbox,
+        )
     segs = load_airway_segments()
-    catalog = load_fix_catalog()
+    catalog = _cached("catalog", load_fix_catalog)
     # Coordinates keyed by IDENT@CC
     coords: Dict[str, Tuple[float, float]] = {}
+    adj: Dict[str, List[Tuple[str, float, str]]] = {}
 
     # Filter segments by altitude overlap and class
     # First compute overlap stats for debugging
@@ -141,55 +133,52 @@ def build_graph(
         if include_only_matching_class and not _class_matches(s, cruise_fl):
             continue
         usable.append(s)
-    debug(
-        f"Graph filter: FL={cruise_fl} desired_class={desired_class} range={fl_range} "
-        f"overlap_c1={overlap_c1} overlap_c2={overlap_c2} usable_segments={len(usable)}"
+    log.debug(
+        "Graph filter: FL=%s desired_class=%s range=%s overlap_c1=%d overlap_c2=%d usable_segments=%d",
+        cruise_fl, desired_class, fl_range, overlap_c1, overlap_c2, len(usable),
     )
 
-    adj: Dict[str, List[Tuple[str, float, str]]] = {}
-
-    def resolve(ident: str, cc: str) -> Optional[Tuple[float, float]]:
+    def resolve(ident: str, cc: str) -> Optional[Tuple[str, float, float]]:
         lst = catalog.get(ident)
         if not lst:
             return None
         # prefer exact country match
-        for rec in lst:
-            if rec.country == cc:
-                return (rec.lat, rec.lon)
-        # fallback ENRT anywhere
-        for rec in lst:
-            if rec.usage == 'ENRT':
-                debug(f"No country match for {ident}@{cc}; using ENRT fallback")
-                return (rec.lat, rec.lon)
-        # last resort: first
-        debug(f"No country/ENRT match for {ident}@{cc}; using first record fallback")
-        r0 = lst[0]
-        return (r0.lat, r0.lon)
-
-    def add_edge(a_ident: str, a_cc: str, b_ident: str, b_cc: str, airway: str) -> None:
-        a_key = f"{a_ident}@{a_cc}"
-        b_key = f"{b_ident}@{b_cc}"
-        if a_key not in coords:
-            c = resolve(a_ident, a_cc)
-            if c:
-                coords[a_key] = c
-        if b_key not in coords:
-            c = resolve(b_ident, b_cc)
-            if c:
-                coords[b_key] = c
-        if a_key not in coords or b_key not in coords:
-            return
-        lat1, lon1 = coords[a_key]
-        lat2, lon2 = coords[b_key]
-        d = haversine_nm(lat1, lon1, lat2, lon2)
-        adj.setdefault(a_key, []).append((b_key, d, airway))
-
+        rec = next((r for r in lst if cc and r.country == cc), None)
+        if rec is None:
+            # fallback ENRT anywhere, then the first record
+            rec = next((r for r in lst if r.usage == 'ENRT'), None) or lst[0]
+            log.debug("No country match for %s@%s; using %s@%s", ident, cc, rec.ident, rec.country)
+        # Keyed by the resolved record's country, like the database graph
+        key = f"{rec.ident}@{rec.country}" if rec.country else rec.ident
+        return (key, rec.lat, rec.lon)
+
+    def inside(lat: float, lon: float) -> bool:
+        if bbox is None:
+            return True
+        min_lat, min_lon, max_lat, max_lon = bbox
+        return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+    resolved: Dict[Tuple[str, str], Optional[Tuple[str, float, float]]] = {}
     for s in usable:
+        k1 = (s.fix1, s.fix1_cc)
+        k2 = (s.fix2, s.fix2_cc)
+        if k1 not in resolved:
+            resolved[k1] = resolve(*k1)
+        if k2 not in resolved:
+            resolved[k2] = resolve(*k2)
+        a, b = resolved[k1], resolved[k2]
+        if not a or not b:
+            continue
+        if not (inside(a[1], a[2]) or inside(b[1], b[2])):
+            continue
+        coords[a[0]] = (a[1], a[2])
+        coords[b[0]] = (b[1], b[2])
+        d = haversine_nm(a[1], a[2], b[1], b[2])
         if s.direction in ("N", "P"):
-            add_edge(s.fix1, s.fix1_cc, s.fix2, s.fix2_cc, s.airway)
+            adj.setdefault(a[0], []).append((b[0], d, s.airway))
         if s.direction in ("N", "M"):
-            add_edge(s.fix2, s.fix2_cc, s.fix1, s.fix1_cc, s.airway)
-    debug(f"Graph nodes={len(adj)} edges={sum(len(v) for v in adj.values())}")
+            adj.setdefault(b[0], []).append((a[0], d, s.airway))
+    log.debug("Graph nodes=%d edges=%d", len(adj), sum(len(v) for v in adj.values()))
     return adj, coords
 
 
@@ -1,7 +1,15 @@
+import multiprocessing
 import os
-from typing import List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple, TypeVar
 from dotenv import load_dotenv
 
+from app.utils.geo import haversine_nm
+from app.utils.navfiles import cifp_source, data_sha1
+from app.utils.navparse import iter_lines
+
 load_dotenv()
 
 
@@ -10,22 +18,305 @@ def _data_path() -> str:
 
 
 def list_cifp_icaos(prefix: str = "", limit: int = 20) -> List[str]:
-    base_cifp = os.path.join(_data_path(), 'CIFP')
-    search_dir = base_cifp if os.path.isdir(base_cifp) else _data_path()
-    codes: list[str] = []
     try:
-        for name in os.listdir(search_dir):
-            if name.lower().endswith('.dat'):
-                code = os.path.splitext(name)[0]
-                codes.append(code)
+        codes = cifp_source(_data_path()).icaos()
     except Exception:
         return []
     p = (prefix or '').strip().upper()
     if p:
-        codes = [c for c in codes if c.upper().startswith(p)]
-    codes.sort()
+        codes = [c for c in codes if c.startswith(p)]
     try:
         lim = max(0, int(limit))
     except Exception:
         lim = 20
     return codes[:lim]
+
+
+# --- Procedure leg tokenizer ---
+# X-Plane CIFP records are comma separated; the first field is "<TYPE>:<SEQ>".
+# Field positions (0-based) follow the XP CIFP 1101 layout.
+_F_ROUTE_TYPE = 1
+_F_NAME = 2
+_F_TRANSITION = 3
+_F_FIX = 4
+_F_FIX_REGION = 5
+_F_TURN_DIR = 9
+_F_PATH_TERM = 11
+_F_COURSE = 20
+_F_DISTANCE = 21
+_F_ALT_DESC = 22
+_F_ALT1 = 23
+_F_ALT2 = 24
+_F_SPEED = 27
+
+_LEG_PREFIXES = ("SID:", "STAR:")
+
+
+@dataclass(frozen=True)
+class CifpLeg:
+    proc_type: str  # 'SID' | 'STAR'
+    seq: int
+    route_type: str
+    name: str
+    transition: str
+    fix_ident: str  # '' for legs without a fix (e.g. VA, VM)
+    fix_region: str
+    path_term: str
+    turn_dir: str
+    course: Optional[float]
+    distance: Optional[float]
+    alt_desc: str
+    alt1: Optional[int]
+    alt2: Optional[int]
+    speed_limit: Optional[int]
+
+
+def _field(parts: List[str], i: int) -> str:
+    return parts[i].strip() if i < len(parts) else ''
+
+
+def _tenths(raw: str) -> Optional[float]:
+    # Courses and distances are stored as tenths without a decimal point ("0700" -> 70.0)
+    if not raw or not raw.isdigit():
+        return None
+    return int(raw) / 10.0
+
+
+def _altitude(raw: str) -> Optional[int]:
+    if not raw:
+        return None
+    if raw.startswith('FL'):
+        raw = raw[2:]
+        return int(raw) * 100 if raw.isdigit() else None
+    return int(raw) if raw.isdigit() else None
+
+
+def parse_cifp_leg(line: str) -> Optional[CifpLeg]:
+    """Parse one SID/STAR record of a CIFP .dat file; other records return None."""
+    if not line.startswith(_LEG_PREFIXES):
+        return None
+    parts = line.rstrip(';\r\n').split(',')
+    if len(parts) < 5:
+        return None
+    proc_type, _, num = parts[0].partition(':')
+    num = num.strip()
+    if not num.isdigit():
+        return None
+    speed = _field(parts, _F_SPEED)
+    return CifpLeg(
+        proc_type=proc_type,
+        seq=int(num),
+        route_type=_field(parts, _F_ROUTE_TYPE),
+        name=_field(parts, _F_NAME),
+        transition=_field(parts, _F_TRANSITION),
+        fix_ident=_field(parts, _F_FIX).upper(),
+        fix_region=_field(parts, _F_FIX_REGION).upper(),
+        path_term=_field(parts, _F_PATH_TERM).upper(),
+        turn_dir=_field(parts, _F_TURN_DIR).upper(),
+        course=_tenths(_field(parts, _F_COURSE)),
+        distance=_tenths(_field(parts, _F_DISTANCE)),
+        alt_desc=_field(parts, _F_ALT_DESC),
+        alt1=_altitude(_field(parts, _F_ALT1)),
+        alt2=_altitude(_field(parts, _F_ALT2)),
+        speed_limit=int(speed) if speed.isdigit() else None,
+    )
+
+
+def parse_cifp_lines(lines: Iterable[str]) -> Iterator[CifpLeg]:
+    for line in lines:
+        leg = parse_cifp_leg(line)
+        if leg:
+            yield leg
+
+
+def iter_cifp_legs(path: str) -> Iterator[CifpLeg]:
+    """Stream SID/STAR legs from a CIFP .dat file (optionally compressed) in file order."""
+    return parse_cifp_lines(iter_lines(path))
+
+
+def parse_cifp_data(data: bytes) -> Iterator[CifpLeg]:
+    """SID/STAR legs of one CIFP file already read into memory (e.g. an archive member)."""
+    return parse_cifp_lines(data.decode('utf-8', 'ignore').split('\n'))
+
+
+# --- Procedure files -> compact records ---
+# Everything below is plain data in and out, so it can run in pool workers
+# without a database session (see iter_parsed_cifp).
+
+# IDENT -> [(country, usage, lat, lon), ...]
+FixCandidates = Dict[str, List[Tuple[str, str, float, float]]]
+LatLon = Tuple[float, float]
+T = TypeVar('T')
+
+# Column order of the tuples returned by leg_rows (procedure_legs columns)
+LEG_COLUMNS = (
+    "icao", "proc_type", "name", "transition", "seq", "route_type", "fix_ident", "fix_region", "path_term",
+    "turn_dir", "course", "distance", "alt_desc", "alt1", "alt2", "speed_limit", "lat", "lon",
+)
+
+
+class ParsedCifp(NamedTuple):
+    icao: str
+    sha1: str  # of the decompressed content
+    routes: List[Tuple[str, str, str, str]]  # (proc_type, name, start, route)
+    legs: List[tuple]  # rows in LEG_COLUMNS order
+
+
+def parse_procedure_file(data: bytes) -> Tuple[Dict[Tuple[str, str, str], str], List[CifpLeg]]:
+    """Text routes keyed by (proc_type, name, transition), plus all typed legs of one CIFP file."""
+    buckets: Dict[Tuple[str, str, str], List[str]] = {}
+    legs: List[CifpLeg] = []
+    for leg in parse_cifp_data(data):
+        key = (leg.proc_type, leg.name, leg.transition)
+        if leg.seq == 10:
+            buckets[key] = [leg.fix_ident]
+        else:
+            buckets.setdefault(key, []).append(leg.fix_ident)
+        legs.append(leg)
+    routes = {key: ' '.join(s for s in segments if s).strip() for key, segments in buckets.items()}
+    return routes, legs
+
+
+def resolve_leg_fix(
+    cands: FixCandidates,
+    ident: str,
+    region: str,
+    icao: str,
+    ref: Optional[LatLon],
+) -> Optional[LatLon]:
+    lst = cands.get(ident)
+    if not lst:
+        return None
+    # Terminal waypoints carry the airport ICAO in the usage column
+    for country, usage, lat, lon in lst:
+        if usage == icao:
+            return (lat, lon)
+    same_region = [c for c in lst if c[0] == region] or lst
+    if len(same_region) == 1 or ref is None:
+        return (same_region[0][2], same_region[0][3])
+    best = min(same_region, key=lambda c: haversine_nm(ref[0], ref[1], c[2], c[3]))
+    return (best[2], best[3])
+
+
+def leg_rows(icao: str, legs: List[CifpLeg], cands: FixCandidates, ref: Optional[LatLon]) -> List[tuple]:
+    rows = []
+    for leg in legs:
+        pos = resolve_leg_fix(cands, leg.fix_ident, leg.fix_region, icao, ref) if leg.fix_ident else None
+        rows.append((
+            icao,
+            leg.proc_type,
+            leg.name,
+            leg.transition,
+            leg.seq,
+            leg.route_type or None,
+            leg.fix_ident or None,
+            leg.fix_region or None,
+            leg.path_term or None,
+            leg.turn_dir or None,
+            leg.course,
+            leg.distance,
+            leg.alt_desc or None,
+            leg.alt1,
+            leg.alt2,
+            leg.speed_limit,
+            pos[0] if pos else None,
+            pos[1] if pos else None,
+        ))
+    return rows
+
+
+def parsed_cifp(
+    icao: str,
+    sha1: str,
+    routes: Dict[Tuple[str, str, str], str],
+    legs: List[CifpLeg],
+    cands: FixCandidates,
+    ref: Optional[LatLon],
+) -> ParsedCifp:
+    """ParsedCifp from the output of parse_procedure_file, with the legs resolved against `cands`."""
+    return ParsedCifp(
+        icao,
+        sha1,
+        [(proc_type, name, start, route) for (proc_type, name, start), route in routes.items()],
+        leg_rows(icao, legs, cands, ref),
+    )
+
+
+def parse_cifp_file(icao: str, data: bytes, cands: FixCandidates, ref: Optional[LatLon]) -> ParsedCifp:
+    routes, legs = parse_procedure_file(data)
+    return parsed_cifp(icao, data_sha1(data), routes, legs, cands, ref)
+
+
+# Set once per pool worker by _init_worker, so the fix table is sent to each worker only once
+_worker_cands: FixCandidates = {}
+_worker_airports: Dict[str, LatLon] = {}
+
+
+def _init_worker(cands: FixCandidates, airports: Dict[str, LatLon]) -> None:
+    global _worker_cands, _worker_airports
+    _worker_cands = cands
+    _worker_airports = airports
+
+
+def _parse_in_worker(icao: str, data: bytes) -> ParsedCifp:
+    return parse_cifp_file(icao, data, _worker_cands, _worker_airports.get(icao))
+
+
+def iter_parsed_cifp(
+    files: Iterable[Tuple[T, bytes]],
+    icao_of: Callable[[T], str],
+    cands: FixCandidates,
+    airports: Dict[str, LatLon],
+    *,
+    workers: int = 1,
+    on_error: Optional[Callable[[T, Exception], None]] = None,
+) -> Iterator[Tuple[T, ParsedCifp]]:
+    """(item, ParsedCifp) for each (item, content) of `files`, in input order.
+
+    With workers > 1 the files are parsed and their legs resolved in a process
+    pool while the caller consumes (and writes) earlier results; at most a few
+    files per worker are in flight, so memory stays bounded. A file that fails
+    to parse is passed to `on_error` and skipped.
+    """
+    if workers <= 1:
+        for item, data in files:
+            try:
+                parsed = parse_cifp_file(icao_of(item), data, cands, airports.get(icao_of(item)))
+            except Exception as e:
+                if on_error:
+                    on_error(item, e)
+                continue
+            yield item, parsed
+        return
+
+    # spawn, not fork: the indexer runs inside a threaded web server
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(cands, airports),
+    )
+    pending: deque = deque()
+
+    def settle():
+        item, fut = pending.popleft()
+        try:
+            return item, fut.result()
+        except Exception as e:
+            if on_error:
+                on_error(item, e)
+            return item, None
+
+    try:
+        for item, data in files:
+            pending.append((item, pool.submit(_parse_in_worker, icao_of(item), data)))
+            if len(pending) >= workers * 4:
+                item, parsed = settle()
+                if parsed is not None:
+                    yield item, parsed
+        while pending:
+            item, parsed = settle()
+            if parsed is not None:
+                yield item, parsed
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
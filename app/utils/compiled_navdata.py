@@ -0,0 +1,372 @@
+"""Compiled navdata: the X-Plane text files parsed once into a binary file.
+
+`compile_navdata()` parses earth_fix.dat, earth_awy.dat, earth_aptmeta.dat
+(and airport names from apt.dat when present) and writes them as fixed-width
+numpy arrays, one file per AIRAC cycle, in the same container format as the
+shared navgraph (see app.utils.navgraph). Idents are fixed-width byte
+strings; repeated text (usage, type codes, names, airway names) is interned
+into one string table. The file also carries the resolved airway graph, so
+NavGraph can open it directly.
+
+Loaders in app.utils.navdata map the file read-only instead of parsing text.
+It is only used while every source file still has the size and mtime it had
+when compiled; otherwise they fall back to the text files.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.utils.navdata import airport_meta_path, apt_dat_path, parse_airport_coords, parse_airport_names
+from app.utils.navfiles import data_file
+from app.utils.navgraph import MappedArrays, NavGraph, _graph_arrays, write_arrays
+from app.utils.navparse import AirwayRecord, FixRecord, iter_airway_records, iter_fix_records
+
+log = logging.getLogger(__name__)
+
+KIND = "navdata"
+# Bump when the arrays written below change
+SCHEMA = 1
+
+_lock = threading.Lock()
+_current: Optional["CompiledNavdata"] = None
+_current_stamp: Optional[Tuple[str, int]] = None
+
+
+def compiled_navdata_enabled() -> bool:
+    return os.getenv("COMPILED_NAVDATA", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def compiled_navdata_dir() -> str:
+    default = os.path.join(os.getenv("DB_DIR", os.path.join(os.getcwd(), "var", "lib", "routehelper")), "navdata")
+    return os.getenv("COMPILED_NAVDATA_DIR", default)
+
+
+def _data_path(data_path: Optional[str]) -> str:
+    return data_path or os.getenv("DATA_PATH", ".")
+
+
+def _read_cycle(data_path: str) -> Optional[str]:
+    try:
+        with open(os.path.join(data_path, "cycle.json"), "r", encoding="utf-8") as f:
+            return str(json.load(f).get("cycle", "")).strip() or None
+    except Exception:
+        return None
+
+
+def compiled_path(cycle: Optional[str], out_dir: Optional[str] = None) -> str:
+    return os.path.join(out_dir or compiled_navdata_dir(), f"navdata-{cycle or 'none'}.bin")
+
+
+def _sources(data_path: str) -> Dict[str, Optional[str]]:
+    return {
+        "cycle": os.path.join(data_path, "cycle.json"),
+        "fix": data_file("earth_fix.dat", data_path),
+        "awy": data_file("earth_awy.dat", data_path),
+        "aptmeta": airport_meta_path(data_path),
+        "apt": apt_dat_path(data_path),
+    }
+
+
+def _stamp(path: Optional[str]) -> Optional[List]:
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [os.path.abspath(path), st.st_size, st.st_mtime_ns]
+
+
+def _source_stamps(data_path: str) -> Dict[str, Optional[List]]:
+    return {k: _stamp(p) for k, p in _sources(data_path).items()}
+
+
+class _Strings:
+    """Interning table: each distinct string stored once; -1 means None."""
+
+    def __init__(self) -> None:
+        self.index: Dict[str, int] = {}
+
+    def __call__(self, value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.index)
+        return i
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        encoded = [s.encode("utf-8") for s in self.index]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        if encoded:
+            np.cumsum([len(b) for b in encoded], out=offsets[1:])
+        return {
+            "str_data": np.frombuffer(b"".join(encoded) or b"\0", dtype=np.uint8),
+            "str_off": offsets,
+        }
+
+
+def _fixed(values: List[str]) -> np.ndarray:
+    # Width is the longest value in this file, so nothing gets truncated
+    return np.array([v.encode("utf-8") for v in values], dtype=bytes)
+
+
+def _resolve_endpoints(fixes: List[FixRecord]):
+    """Same endpoint choice as the indexer: exact country, else ENRT usage, else first record."""
+    by_ident: Dict[str, List[FixRecord]] = {}
+    for rec in fixes:
+        by_ident.setdefault(rec[0], []).append(rec)
+
+    def resolve(ident: str, cc: str) -> Optional[FixRecord]:
+        rows = by_ident.get(ident)
+        if not rows:
+            return None
+        if cc:
+            for r in rows:
+                if (r[2] or '') == cc:
+                    return r
+        for r in rows:
+            if (r[1] or '') == 'ENRT':
+                return r
+        return rows[0]
+
+    return resolve
+
+
+def compile_navdata(data_path: Optional[str] = None, out_path: Optional[str] = None) -> dict:
+    """Parse the navdata text files under `data_path` and write the compiled file."""
+    data_path = _data_path(data_path)
+    t0 = time.perf_counter()
+    stamps = _source_stamps(data_path)
+    cycle = _read_cycle(data_path)
+    src = _sources(data_path)
+
+    # Same de-duplication as the indexer: one row per (ident, country, lat, lon)
+    fixes: List[FixRecord] = []
+    seen: set = set()
+    if src["fix"]:
+        for rec in iter_fix_records(src["fix"]):
+            key = (rec[0], rec[2], rec[3], rec[4])
+            if key not in seen:
+                seen.add(key)
+                fixes.append(rec)
+    airways: List[AirwayRecord] = list(iter_airway_records(src["awy"])) if src["awy"] else []
+    coords = parse_airport_coords(data_path)
+    names = parse_airport_names(data_path)
+
+    strings = _Strings()
+    fix_ident = _fixed([r[0] for r in fixes])
+    arrays: Dict[str, np.ndarray] = {
+        "fix_ident": fix_ident,
+        "fix_country": _fixed([r[2] or '' for r in fixes]),
+        "fix_has_country": np.array([r[2] is not None for r in fixes], dtype=np.bool_),
+        "fix_lat": np.array([r[3] for r in fixes], dtype=np.float64),
+        "fix_lon": np.array([r[4] for r in fixes], dtype=np.float64),
+        "fix_usage": np.array([strings(r[1]) for r in fixes], dtype=np.int32),
+        "fix_dbid": np.array([strings(r[5]) for r in fixes], dtype=np.int32),
+        "fix_name": np.array([strings(r[6]) for r in fixes], dtype=np.int32),
+    }
+    # Stable sort keeps file order among equal idents, so the first hit is the first record
+    order = np.argsort(fix_ident, kind="stable").astype(np.int32)
+    arrays["fix_sorted"] = order
+    arrays["fix_ident_sorted"] = fix_ident[order]
+
+    arrays.update({
+        "seg_fix1": _fixed([a[0] for a in airways]),
+        "seg_cc1": _fixed([a[1] for a in airways]),
+        "seg_fix2": _fixed([a[2] for a in airways]),
+        "seg_cc2": _fixed([a[3] for a in airways]),
+        "seg_dir": _fixed([a[4] for a in airways]),
+        "seg_class": np.array([a[5] for a in airways], dtype=np.int8),
+        "seg_lo": np.array([a[6] for a in airways], dtype=np.int32),
+        "seg_hi": np.array([a[7] for a in airways], dtype=np.int32),
+        "seg_name": np.array([strings(a[8]) for a in airways], dtype=np.int32),
+    })
+
+    name_icaos = sorted(names)
+    arrays["name_icao"] = _fixed(name_icaos)
+    arrays["name_text"] = np.array([strings(names[i]) for i in name_icaos], dtype=np.int32)
+
+    # Resolved airway graph and airport table, readable by NavGraph
+    resolve = _resolve_endpoints(fixes)
+    segments = []
+    for f1, c1, f2, c2, direction, rclass, lo, hi, name in airways:
+        r1 = resolve(f1, c1)
+        r2 = resolve(f2, c2)
+        if r1 and r2:
+            segments.append((name, direction, rclass, lo, hi, r1[0], r1[2], r1[3], r1[4], r2[0], r2[2], r2[3], r2[4]))
+    arrays.update(_graph_arrays(segments, ((i, la, lo) for i, (la, lo) in coords.items())))
+    arrays.update(strings.arrays())
+
+    meta = {
+        "kind": KIND,
+        "schema": SCHEMA,
+        "cycle": cycle,
+        "source": "files",
+        "data_path": os.path.abspath(data_path),
+        "sources": stamps,
+        "built_at": time.time(),
+    }
+    if out_path is None:
+        os.makedirs(compiled_navdata_dir(), exist_ok=True)
+        out_path = compiled_path(cycle)
+    write_arrays(out_path, meta, arrays)
+    counts = {
+        "path": out_path,
+        "fixes": len(fixes),
+        "airways": len(airways),
+        "airports": len(coords),
+        "names": len(names),
+        "edges": int(len(arrays["edge_from"])),
+        "bytes": os.path.getsize(out_path),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+    log.info("Compiled navdata %s", counts)
+    return counts
+
+
+class CompiledNavdata:
+    """Read-only view over a compiled navdata file (see module docstring)."""
+
+    def __init__(self, path: str) -> None:
+        self.data = MappedArrays(path)
+        self.path = path
+        meta = self.data.meta
+        if meta.get("kind") != KIND or meta.get("schema") != SCHEMA:
+            raise ValueError(f"{path}: not a compiled navdata file of schema {SCHEMA}")
+        self.meta = meta
+        self.cycle: Optional[str] = meta.get("cycle")
+        self._strings: Optional[List[str]] = None
+        self._graph: Optional[NavGraph] = None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.data[name]
+
+    def is_current(self, data_path: Optional[str] = None) -> bool:
+        """True while the source files still match what was compiled."""
+        return self.meta.get("sources") == _source_stamps(_data_path(data_path))
+
+    def strings(self) -> List[str]:
+        if self._strings is None:
+            blob = self.data["str_data"].tobytes()
+            off = self.data["str_off"].tolist()
+            self._strings = [blob[off[i]:off[i + 1]].decode("utf-8") for i in range(len(off) - 1)]
+        return self._strings
+
+    def _text(self, ids: np.ndarray) -> List[Optional[str]]:
+        table = self.strings()
+        return [table[i] if i >= 0 else None for i in ids.tolist()]
+
+    @staticmethod
+    def _decode(arr: np.ndarray) -> List[str]:
+        return [b.decode("utf-8") for b in arr.tolist()]
+
+    def iter_fix_records(self) -> Iterator[FixRecord]:
+        d = self.data
+        countries = [c if has else None for c, has in zip(self._decode(d["fix_country"]), d["fix_has_country"].tolist())]
+        return iter(zip(
+            self._decode(d["fix_ident"]),
+            self._text(d["fix_usage"]),
+            countries,
+            d["fix_lat"].tolist(),
+            d["fix_lon"].tolist(),
+            self._text(d["fix_dbid"]),
+            self._text(d["fix_name"]),
+        ))
+
+    def iter_airway_records(self) -> Iterator[AirwayRecord]:
+        d = self.data
+        return iter(zip(
+            self._decode(d["seg_fix1"]),
+            self._decode(d["seg_cc1"]),
+            self._decode(d["seg_fix2"]),
+            self._decode(d["seg_cc2"]),
+            self._decode(d["seg_dir"]),
+            d["seg_class"].tolist(),
+            d["seg_lo"].tolist(),
+            d["seg_hi"].tolist(),
+            self._text(d["seg_name"]),
+        ))
+
+    def fix_index(self) -> Dict[str, Tuple[float, float]]:
+        """IDENT -> (lat, lon) of the first record per ident, like navdata.parse_fix_index."""
+        d = self.data
+        idents, first = np.unique(d["fix_ident_sorted"], return_index=True)
+        rows = d["fix_sorted"][first]
+        return dict(zip(self._decode(idents), zip(d["fix_lat"][rows].tolist(), d["fix_lon"][rows].tolist())))
+
+    def fix_position(self, ident: str) -> Optional[Tuple[float, float]]:
+        """(lat, lon) of the first record for `ident`, by binary search on the mapped arrays."""
+        d = self.data
+        k = (ident or '').strip().upper().encode("utf-8")
+        keys = d["fix_ident_sorted"]
+        i = int(np.searchsorted(keys, k))
+        if i < len(keys) and keys[i] == k:
+            row = int(d["fix_sorted"][i])
+            return (float(d["fix_lat"][row]), float(d["fix_lon"][row]))
+        return None
+
+    def airport_coords(self) -> Dict[str, Tuple[float, float]]:
+        d = self.data
+        return dict(zip(self._decode(d["apt_icao"]), zip(d["apt_lat"].tolist(), d["apt_lon"].tolist())))
+
+    def airport_names(self) -> Dict[str, str]:
+        d = self.data
+        return dict(zip(self._decode(d["name_icao"]), self._text(d["name_text"])))
+
+    def navgraph(self) -> NavGraph:
+        if self._graph is None:
+            self._graph = NavGraph(self.path)
+        return self._graph
+
+
+def get_compiled_navdata(data_path: Optional[str] = None) -> Optional[CompiledNavdata]:
+    """The compiled file for the current cycle if it exists and matches the sources, else None."""
+    global _current, _current_stamp
+    if not compiled_navdata_enabled():
+        return None
+    data_path = _data_path(data_path)
+    path = compiled_path(_read_cycle(data_path))
+    try:
+        stamp = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        return None
+    nav = _current
+    if stamp != _current_stamp:
+        with _lock:
+            if stamp != _current_stamp:
+                try:
+                    _current = CompiledNavdata(path)
+                except (OSError, ValueError) as e:
+                    log.warning("Compiled navdata %s not usable: %s", path, e)
+                    _current = None
+                _current_stamp = stamp
+            nav = _current
+    if nav is None or not nav.is_current(data_path):
+        return None
+    return nav
+
+
+def ensure_compiled_navdata(data_path: Optional[str] = None) -> Optional[CompiledNavdata]:
+    """Compile the navdata files unless an up-to-date compiled file already exists."""
+    if not compiled_navdata_enabled():
+        return None
+    nav = get_compiled_navdata(data_path)
+    if nav is not None:
+        return nav
+    compile_navdata(data_path)
+    return get_compiled_navdata(data_path)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(name)s: %(message)s")
+    print(json.dumps(compile_navdata(sys.argv[1] if len(sys.argv) > 1 else None), indent=2))
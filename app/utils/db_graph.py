@@ -4,7 +4,10 @@ from typing import Dict, List, Tuple, Optional
 from sqlalchemy.orm import Session, aliased
 
 from app.db.models import Airway, Fix
+from app.db.spatial import BBox, bbox_around, fix_ids_in_bbox, fixes_in_bbox
+from app.utils.dbnav import navdata_version_db
 from app.utils.geo import haversine_nm
+from app.utils.navgraph import get_navgraph
 
 
 def _fl_overlaps(lo: int, hi: int, seg_lo: int, seg_hi: int) -> bool:
@@ -17,10 +20,13 @@ def build_graph_from_db(
     cruise_fl: int,
     fl_range: Tuple[int, int],
     include_only_matching_class: bool = True,
+    bbox: Optional[BBox] = None,
 ) -> Tuple[Dict[str, List[Tuple[str, float, str]]], Dict[str, Tuple[float, float]]]:
     """Build adjacency graph from Airway and Fix tables.
 
     Returns (adj, coords_index) where adj maps FIX@CC -> list of (neighbor, distance_nm, airway_name).
+    With `bbox` (min_lat, min_lon, max_lat, max_lon) only segments touching a
+    fix inside the box are loaded, via the spatial index.
     """
     lo, hi = fl_range
     desired_class = 2 if cruise_fl >= 245 else 1
@@ -29,7 +35,7 @@ def build_graph_from_db(
     # We'll resolve fixes into keys IDENT@CC using stored Fix.country
     F1 = aliased(Fix)
     F2 = aliased(Fix)
-    segs = (
+    query = (
         db.query(
             Airway.name,
             Airway.direction,
@@ -41,8 +47,11 @@ def build_graph_from_db(
         )
         .join(F1, F1.id == Airway.fix1_id)
         .join(F2, F2.id == Airway.fix2_id)
-        .all()
     )
+    if bbox is not None:
+        inside = fix_ids_in_bbox(db, bbox)
+        query = query.filter(Airway.fix1_id.in_(inside) | Airway.fix2_id.in_(inside))
+    segs = query.all()
 
     adj: Dict[str, List[Tuple[str, float, str]]] = {}
     coords: Dict[str, Tuple[float, float]] = {}
@@ -75,6 +84,32 @@ def build_graph_from_db(
     return adj, coords
 
 
+def build_graph(
+    db: Session,
+    *,
+    cruise_fl: int,
+    fl_range: Tuple[int, int],
+    include_only_matching_class: bool = True,
+    bbox: Optional[BBox] = None,
+) -> Tuple[Dict[str, List[Tuple[str, float, str]]], Dict[str, Tuple[float, float]]]:
+    """build_graph_from_db, cut from the shared compiled graph when it matches the current navdata version."""
+    graph = get_navgraph()
+    if graph is not None and graph.version == navdata_version_db(db):
+        return graph.subgraph(
+            cruise_fl=cruise_fl,
+            fl_range=fl_range,
+            include_only_matching_class=include_only_matching_class,
+            bbox=bbox,
+        )
+    return build_graph_from_db(
+        db,
+        cruise_fl=cruise_fl,
+        fl_range=fl_range,
+        include_only_matching_class=include_only_matching_class,
+        bbox=bbox,
+    )
+
+
 def nearest_graph_fixes_db(
     coords_index: Dict[str, Tuple[float, float]],
     graph: Dict[str, List[Tuple[str, float, str]]],
@@ -92,4 +127,29 @@ def nearest_graph_fixes_db(
         if d <= max_radius_nm:
             out.append((fix, d))
     out.sort(key=lambda x: x[1])
-    return out[:limit]
\ No newline at end of file
+    return out[:limit]
+
+
+def nearby_graph_fixes_db(
+    db: Session,
+    coords_index: Dict[str, Tuple[float, float]],
+    graph: Dict[str, List[Tuple[str, float, str]]],
+    ref_lat: float,
+    ref_lon: float,
+    *,
+    max_radius_nm: float = 100.0,
+    limit: int = 10,
+) -> List[Tuple[str, float]]:
+    """nearest_graph_fixes_db, with candidates read from the spatial index instead of
+    scanning every graph node; distances use the graph's own coordinates."""
+    best: Dict[str, float] = {}
+    for ident, cc, _lat, _lon in fixes_in_bbox(db, bbox_around(ref_lat, ref_lon, max_radius_nm)):
+        cc_u = (cc or '').upper()
+        fix = f"{ident.upper()}@{cc_u}" if cc_u else ident.upper()
+        if fix in best or fix not in graph or fix not in coords_index:
+            continue
+        lat, lon = coords_index[fix]
+        d = haversine_nm(ref_lat, ref_lon, lat, lon)
+        if d <= max_radius_nm:
+            best[fix] = d
+    return sorted(best.items(), key=lambda x: x[1])[:limit]
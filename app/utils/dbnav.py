@@ -1,9 +1,37 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.db.models import Airport, Fix, Procedure
+from app.db.models import AiracCycle, Airport, Fix, Procedure, ProcedureLeg, SourceFile
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def current_cycle_db(db: Session) -> str | None:
+    """Cycle string of the most recently indexed AIRAC, or None."""
+    row = db.query(AiracCycle.cycle).order_by(AiracCycle.id.desc()).first()
+    if not row:
+        return None
+    return (row[0] or '').strip() or None
+
+
+def _version_stmt():
+    return select(AiracCycle.cycle, AiracCycle.generation).order_by(AiracCycle.id.desc()).limit(1)
+
+
+def _version(row) -> str | None:
+    if not row:
+        return None
+    return f"{(row[0] or '').strip()}.{int(row[1] or 0)}"
+
+
+def navdata_version_db(db: Session) -> str | None:
+    """"<cycle>.<generation>" of the latest AIRAC: changes with the cycle and with every
+    index run that changed navdata, so it can key ETags and in-memory navdata caches."""
+    return _version(db.execute(_version_stmt()).first())
 
 
 def get_airport_coords_db(db: Session) -> Dict[str, Tuple[float, float]]:
@@ -67,4 +95,40 @@ def get_procedure_texts_db(db: Session, icao: str, *, kind: str) -> dict[str, st
     for name, start, route in rows:
         key = f"{name}-{start or ''}"
         out[key] = route or ''
-    return out
\ No newline at end of file
+    return out
+
+
+# Async variants (AsyncSession from app.db.async_session) for non-blocking handlers
+
+async def navdata_version_async(db: "AsyncSession") -> str | None:
+    return _version((await db.execute(_version_stmt())).first())
+
+
+async def procedure_source_async(db: "AsyncSession", icao: str) -> str | None:
+    """Content hash of the CIFP file the airport's procedures were indexed from."""
+    stmt = select(SourceFile.sha1).where(SourceFile.kind == "cifp", SourceFile.name == (icao or '').upper())
+    return (await db.execute(stmt)).scalar()
+
+
+async def latest_airac_async(db: "AsyncSession") -> AiracCycle | None:
+    return (await db.execute(select(AiracCycle).order_by(AiracCycle.id.desc()).limit(1))).scalars().first()
+
+
+async def get_procedure_texts_async(db: "AsyncSession", icao: str, *, kind: str) -> dict[str, str]:
+    stmt = select(Procedure.name, Procedure.start, Procedure.route).where(
+        Procedure.icao == (icao or '').upper(), Procedure.proc_type == kind
+    )
+    out: dict[str, str] = {}
+    for name, start, route in (await db.execute(stmt)).all():
+        out[f"{name}-{start or ''}"] = route or ''
+    return out
+
+
+async def get_procedure_legs_async(db: "AsyncSession", icao: str, *, kind: str, name: str | None = None, transition: str | None = None) -> List[ProcedureLeg]:
+    stmt = select(ProcedureLeg).where(ProcedureLeg.icao == (icao or '').upper(), ProcedureLeg.proc_type == kind)
+    if name:
+        stmt = stmt.where(ProcedureLeg.name == name.upper())
+    if transition is not None:
+        stmt = stmt.where(ProcedureLeg.transition == transition.upper())
+    stmt = stmt.order_by(ProcedureLeg.name, ProcedureLeg.transition, ProcedureLeg.seq)
+    return list((await db.execute(stmt)).scalars().all())
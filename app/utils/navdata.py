@@ -1,73 +1,145 @@
 import os
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from dotenv import load_dotenv
 
+from app.utils.navfiles import data_file
+from app.utils.navparse import (
+    AirwayRecord,
+    FixRecord,
+    iter_airport_names,
+    iter_airport_records,
+    iter_airway_records,
+    iter_fix_records,
+)
+
 load_dotenv()
 
 
+class CatalogFix(NamedTuple):
+    ident: str
+    usage: Optional[str]
+    country: Optional[str]
+    lat: float
+    lon: float
+
+
 def _data_path() -> str:
     return os.getenv('DATA_PATH', '.')
 
 
+def _compiled():
+    # Imported here: the compiled reader pulls in numpy and this module is used by the CLI too
+    from app.utils.compiled_navdata import get_compiled_navdata
+    return get_compiled_navdata()
+
+
+def airport_meta_path(data_path: Optional[str] = None) -> Optional[str]:
+    base = data_path or _data_path()
+    return data_file('earth_aptmeta.dat', base) or data_file('earth_metadata.dat', base)
+
+
+def apt_dat_path(data_path: Optional[str] = None) -> Optional[str]:
+    base = data_path or _data_path()
+    return data_file('apt.dat', base) or data_file(os.path.join('Earth nav data', 'apt.dat'), base)
+
+
+def fix_records() -> Iterable[FixRecord]:
+    """earth_fix.dat records, from the compiled snapshot when it is current."""
+    nav = _compiled()
+    if nav is not None:
+        return nav.iter_fix_records()
+    path = data_file('earth_fix.dat')
+    return iter_fix_records(path) if path else iter(())
+
+
+def airway_records() -> Iterable[AirwayRecord]:
+    """earth_awy.dat records, from the compiled snapshot when it is current."""
+    nav = _compiled()
+    if nav is not None:
+        return nav.iter_airway_records()
+    path = data_file('earth_awy.dat')
+    return iter_airway_records(path) if path else iter(())
+
+
+def load_fix_catalog() -> Dict[str, List[CatalogFix]]:
+    """IDENT -> every earth_fix.dat record for it, in file order (ident is not unique)."""
+    catalog: Dict[str, List[CatalogFix]] = {}
+    for ident, usage, country, lat, lon, _dbid, _name in fix_records():
+        catalog.setdefault(ident, []).append(CatalogFix(ident, usage, country, lat, lon))
+    return catalog
+
+
 def load_fix_index() -> Dict[str, Tuple[float, float]]:
+    nav = _compiled()
+    if nav is not None:
+        return nav.fix_index()
+    return parse_fix_index()
+
+
+def parse_fix_index(data_path: Optional[str] = None) -> Dict[str, Tuple[float, float]]:
+    """IDENT -> (lat, lon) of its first record in earth_fix.dat."""
     index: dict = {}
-    fix_path = os.path.join(_data_path(), 'earth_fix.dat')
+    fix_path = data_file('earth_fix.dat', data_path)
+    if not fix_path:
+        return index
     try:
-        with open(fix_path, 'r', encoding='utf-8', errors='ignore') as f:
-            for line in f:
-                line = line.strip()
-                if not line or line.startswith(';'):
-                    continue
-                parts = line.split()
-                if len(parts) < 3:
-                    continue
-                try:
-                    lat = float(parts[0])
-                    lon = float(parts[1])
-                    ident = parts[2].upper()
-                    if ident and ident not in index:
-                        index[ident] = (lat, lon)
-                except Exception:
-                    continue
+        for ident, _usage, _country, lat, lon, _dbid, _name in iter_fix_records(fix_path):
+            if ident not in index:
+                index[ident] = (lat, lon)
     except FileNotFoundError:
         index = {}
     return index
 
 
 def load_airport_coords() -> Dict[str, Tuple[float, float]]:
+    nav = _compiled()
+    if nav is not None:
+        return nav.airport_coords()
+    return parse_airport_coords()
+
+
+def parse_airport_coords(data_path: Optional[str] = None) -> Dict[str, Tuple[float, float]]:
     coords: dict = {}
-    meta_candidates = [
-        os.path.join(_data_path(), 'earth_aptmeta.dat'),
-        os.path.join(_data_path(), 'earth_metadata.dat'),
-    ]
-    meta_path = next((p for p in meta_candidates if os.path.isfile(p)), None)
+    meta_path = airport_meta_path(data_path)
     if meta_path:
         try:
-            with open(meta_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith(';'):
-                        continue
-                    parts = line.split()
-                    if len(parts) >= 4:
-                        code = parts[0].upper()
-                        try:
-                            lat = float(parts[2])
-                            lon = float(parts[3])
-                            coords[code] = (lat, lon)
-                        except Exception:
-                            continue
+            for icao, lat, lon in iter_airport_records(meta_path):
+                coords[icao] = (lat, lon)
         except Exception:
             coords = {}
     return coords
 
 
+def load_airport_names() -> Dict[str, str]:
+    """Airport names from an X-Plane apt.dat, if one is available (optional)."""
+    nav = _compiled()
+    if nav is not None:
+        return nav.airport_names()
+    return parse_airport_names()
+
+
+def parse_airport_names(data_path: Optional[str] = None) -> Dict[str, str]:
+    names: dict = {}
+    path = apt_dat_path(data_path)
+    if not path:
+        return names
+    try:
+        for icao, name, alias in iter_airport_names(path):
+            # An icao_code alias never replaces a real airport's own name
+            if not alias or icao not in names:
+                names[icao] = name
+    except Exception:
+        names = {}
+    return names
+
+
 def get_route_fix_coords(items_text: str) -> List[Tuple[float, float, str]]:
-    index = load_fix_index()
+    nav = _compiled()
+    lookup = nav.fix_position if nav is not None else load_fix_index().get
     seq = [s for s in (items_text or '').split() if s.strip()]
     coords: list[tuple[float, float, str]] = []
     for it in seq:
-        pos = index.get(it.upper())
+        pos = lookup(it.upper())
         if pos:
             coords.append((pos[0], pos[1], it.upper()))
     return coords
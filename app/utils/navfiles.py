@@ -0,0 +1,374 @@
+"""Locate and open navdata source files, plain or compressed.
+
+Every `earth_*.dat` / `apt.dat` file may also be present gzip-, xz- or
+zstd-compressed (`earth_fix.dat.gz`, `.xz`, `.zst`). The plain file wins
+when both exist. `open_binary` returns a decompressing stream, so readers
+(app.utils.navparse) keep reading fixed-size chunks and memory stays flat.
+
+CIFP procedure files can come from a `CIFP/` directory or from one archive
+in DATA_PATH (see CIFP_BUNDLES) holding `<ICAO>.dat` members, each of which
+may itself be compressed. Looking up one airport costs a dict lookup in a
+listing cached per directory mtime plus one stat; a tar archive is extracted
+once per archive version into CIFP_CACHE_DIR, so single members are never
+found by decompressing the stream up to them. zstd needs the optional
+`zstandard` package; it is imported only when a `.zst` file is opened.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import io
+import lzma
+import os
+import shutil
+import tarfile
+import threading
+import time
+import uuid
+import zipfile
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+COMPRESSED_SUFFIXES = (".gz", ".xz", ".zst")
+# Searched in DATA_PATH, in this order, when there is no CIFP/ directory
+CIFP_BUNDLES = ("CIFP.zip", "CIFP.tar.zst", "CIFP.tar.xz", "CIFP.tar.gz", "CIFP.tgz", "CIFP.tar")
+
+
+def _data_path(data_path: Optional[str] = None) -> str:
+    return data_path or os.getenv("DATA_PATH", ".")
+
+
+def data_file(name: str, data_path: Optional[str] = None) -> Optional[str]:
+    """Path of `name` under DATA_PATH, or of its compressed variant; None if neither exists."""
+    base = os.path.join(_data_path(data_path), name)
+    for path in (base, *(base + s for s in COMPRESSED_SUFFIXES)):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def strip_compressed_suffix(name: str) -> str:
+    low = name.lower()
+    for s in COMPRESSED_SUFFIXES:
+        if low.endswith(s):
+            return name[: -len(s)]
+    return name
+
+
+def _zstd_reader(raw: BinaryIO) -> BinaryIO:
+    try:
+        import zstandard
+    except ImportError as e:
+        raise RuntimeError("reading .zst navdata needs the 'zstandard' package (pip install zstandard)") from e
+    return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)  # type: ignore[return-value]
+
+
+def wrap_decompress(raw: BinaryIO, name: str) -> BinaryIO:
+    """Decompressing reader over `raw`, chosen by the suffix of `name`; `raw` itself if uncompressed."""
+    low = name.lower()
+    if low.endswith(".gz"):
+        return gzip.GzipFile(fileobj=raw, mode="rb")  # type: ignore[return-value]
+    if low.endswith(".xz"):
+        return lzma.LZMAFile(raw, mode="rb")  # type: ignore[return-value]
+    if low.endswith(".zst"):
+        return _zstd_reader(raw)
+    return raw
+
+
+def open_binary(path: str) -> BinaryIO:
+    """Open a navdata file for reading bytes, decompressing on the fly by suffix."""
+    low = path.lower()
+    if low.endswith(".gz"):
+        return gzip.open(path, "rb")  # type: ignore[return-value]
+    if low.endswith(".xz"):
+        return lzma.open(path, "rb")  # type: ignore[return-value]
+    if low.endswith(".zst"):
+        return _zstd_reader(open(path, "rb"))
+    return open(path, "rb")
+
+
+def data_sha1(data: bytes) -> str:
+    """SHA-1 of content already read (and decompressed), matching content_sha1 of its file."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def stream_sha1(f: BinaryIO) -> str:
+    h = hashlib.sha1()
+    for chunk in iter(lambda: f.read(1 << 20), b""):
+        h.update(chunk)
+    return h.hexdigest()
+
+
+def content_sha1(path: str) -> str:
+    """SHA-1 of the decompressed content, so recompressing a file does not change it."""
+    with open_binary(path) as f:
+        return stream_sha1(f)
+
+
+# --- CIFP sources ---------------------------------------------------------------
+
+class CifpMember:
+    """One airport's procedure file: its ICAO, size/mtime stamp and how to open it."""
+
+    __slots__ = ("icao", "name", "size", "mtime", "_source")
+
+    def __init__(self, icao: str, name: str, size: int, mtime: float, source: "CifpSource") -> None:
+        self.icao = icao
+        self.name = name
+        self.size = size
+        self.mtime = mtime
+        self._source = source
+
+    def open(self) -> BinaryIO:
+        return self._source.open_member(self)
+
+    def sha1(self) -> str:
+        with self.open() as f:
+            return stream_sha1(f)
+
+
+def _member_icao(name: str) -> Optional[str]:
+    base = strip_compressed_suffix(os.path.basename(name))
+    stem, ext = os.path.splitext(base)
+    if ext.lower() != ".dat" or not stem:
+        return None
+    return stem.upper()
+
+
+class CifpSource:
+    """CIFP `<ICAO>.dat` files in a directory or a zip/tar archive.
+
+    Zip members are opened individually. Tar archives are compressed as one
+    stream: `iter_files` reads the whole archive in one pass and is what the
+    indexer uses, while single members are read from the extract() copy.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.is_dir = os.path.isdir(path)
+        self.kind = "dir" if self.is_dir else ("zip" if path.lower().endswith(".zip") else "tar")
+        self._members: Optional[Dict[str, CifpMember]] = None
+
+    def __repr__(self) -> str:
+        return f"CifpSource({self.path!r})"
+
+    # -- listing
+    def members(self) -> Dict[str, CifpMember]:
+        """ICAO -> member. For a directory the plain `.dat` wins over a compressed one.
+
+        A directory is scanned (one stat per file) once per CifpSource, so index
+        runs see current sizes and mtimes; use get() to look up a single airport.
+        """
+        if self._members is None:
+            self._members = self._scan()
+        return self._members
+
+    def icaos(self) -> List[str]:
+        if self.is_dir:
+            return sorted(_dir_listing(self.path))
+        return sorted(self.members())
+
+    def get(self, icao: str) -> Optional[CifpMember]:
+        icao = (icao or "").strip().upper()
+        if not self.is_dir or self._members is not None:
+            return self.members().get(icao)
+        name = _dir_listing(self.path).get(icao)
+        if name is None:
+            return None
+        try:
+            st = os.stat(os.path.join(self.path, name))
+        except OSError:
+            return None
+        return CifpMember(icao, name, st.st_size, st.st_mtime, self)
+
+    def _add(self, out: Dict[str, CifpMember], name: str, size: int, mtime: float) -> None:
+        icao = _member_icao(name)
+        if icao is None:
+            return
+        prev = out.get(icao)
+        if prev is None or (prev.name != strip_compressed_suffix(prev.name) and name == strip_compressed_suffix(name)):
+            out[icao] = CifpMember(icao, name, size, mtime, self)
+
+    def _scan(self) -> Dict[str, CifpMember]:
+        out: Dict[str, CifpMember] = {}
+        if self.is_dir:
+            try:
+                entries = list(os.scandir(self.path))
+            except OSError:
+                return out
+            for e in entries:
+                if e.is_file():
+                    st = e.stat()
+                    self._add(out, e.name, st.st_size, st.st_mtime)
+        elif self.kind == "zip":
+            with zipfile.ZipFile(self.path) as z:
+                for info in z.infolist():
+                    if not info.is_dir():
+                        self._add(out, info.filename, info.file_size, _zip_mtime(info))
+        else:
+            with self._open_tar() as t:
+                for info in t:
+                    if info.isfile():
+                        self._add(out, info.name, info.size, float(info.mtime))
+        return out
+
+    # -- reading
+    @contextmanager
+    def _open_tar(self) -> Iterator[tarfile.TarFile]:
+        # "r|" reads the archive as a stream: no seeking, one member at a time
+        if self.path.lower().endswith(".zst"):
+            with _zstd_reader(open(self.path, "rb")) as raw, tarfile.open(fileobj=raw, mode="r|") as t:
+                yield t
+        else:
+            with tarfile.open(self.path, mode="r|*") as t:
+                yield t
+
+    def open_member(self, member: CifpMember) -> BinaryIO:
+        if self.is_dir:
+            return open_binary(os.path.join(self.path, member.name))
+        if self.kind == "zip":
+            # Archive members are small (one airport), so they are read whole
+            with zipfile.ZipFile(self.path) as z:
+                data = z.read(member.name)
+            return wrap_decompress(io.BytesIO(data), member.name)
+        path = os.path.join(self.extract(), member.icao + ".dat")
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"{member.name} not in {self.path}")
+        return open(path, "rb")
+
+    def extract(self) -> str:
+        """Directory holding every member of this tar archive as a decompressed `<ICAO>.dat`.
+
+        Extracted in one pass on first use and shared by all processes until the
+        archive's size or mtime changes; the indexer calls it in lazy mode so
+        requests find the files ready.
+        """
+        if self.kind != "tar":
+            raise ValueError(f"{self.path} is not a tar archive")
+        st = os.stat(self.path)
+        # Archive name plus a hash of its path, so two DATA_PATHs never share or clean up each other's copy
+        base = f"{os.path.basename(self.path)}-{data_sha1(os.path.abspath(self.path).encode())[:8]}"
+        root = cifp_cache_dir()
+        target = os.path.join(root, f"{base}-{st.st_size}-{st.st_mtime_ns}")
+        if os.path.isdir(target):
+            return target
+        with _extract_lock:
+            if os.path.isdir(target):
+                return target
+            os.makedirs(root, exist_ok=True)
+            tmp = os.path.join(root, f".tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}")
+            os.makedirs(tmp)
+            try:
+                for member, data in self.iter_files():
+                    with open(os.path.join(tmp, member.icao + ".dat"), "wb") as f:
+                        f.write(data)
+                try:
+                    os.rename(tmp, target)
+                except OSError:
+                    # Another process finished first
+                    if not os.path.isdir(target):
+                        raise
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+            for old in os.listdir(root):
+                if old.startswith(base + "-") and old != os.path.basename(target):
+                    shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+        return target
+
+    def iter_files(self, icaos: Optional[set] = None) -> Iterator[Tuple[CifpMember, bytes]]:
+        """(member, decompressed content) for every (or the given) airport, in ICAO order for
+        directories and zips and in archive order for tar. One file is held in memory at a time."""
+        members = self.members()
+        if self.kind != "tar":
+            for icao in sorted(members):
+                if icaos is not None and icao not in icaos:
+                    continue
+                m = members[icao]
+                with m.open() as f:
+                    data = f.read()
+                yield m, data
+            return
+        with self._open_tar() as t:
+            for info in t:
+                icao = _member_icao(info.name) if info.isfile() else None
+                m = members.get(icao) if icao else None
+                if m is None or m.name != info.name or (icaos is not None and icao not in icaos):
+                    continue
+                raw = t.extractfile(info).read()  # type: ignore[union-attr]
+                with wrap_decompress(io.BytesIO(raw), info.name) as f:
+                    data = f.read()
+                yield m, data
+
+
+def cifp_cache_dir() -> str:
+    default = os.path.join(os.getenv("DB_DIR", os.path.join(os.getcwd(), "var", "lib", "routehelper")), "cifp")
+    return os.getenv("CIFP_CACHE_DIR", default)
+
+
+_extract_lock = threading.Lock()
+# Directory path -> (mtime_ns, {ICAO: file name}); names only change with the directory's mtime
+_listings: Dict[str, Tuple[int, Dict[str, str]]] = {}
+_listings_lock = threading.Lock()
+
+
+def _dir_listing(path: str) -> Dict[str, str]:
+    """ICAO -> file name of the `.dat` files in `path`, the plain file winning over a compressed one."""
+    try:
+        stamp = os.stat(path).st_mtime_ns
+    except OSError:
+        return {}
+    hit = _listings.get(path)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    names: Dict[str, str] = {}
+    try:
+        entries = [e.name for e in os.scandir(path) if e.is_file()]
+    except OSError:
+        return {}
+    for name in sorted(entries):
+        icao = _member_icao(name)
+        if icao is None:
+            continue
+        prev = names.get(icao)
+        if prev is None or (prev != strip_compressed_suffix(prev) and name == strip_compressed_suffix(name)):
+            names[icao] = name
+    with _listings_lock:
+        _listings[path] = (stamp, names)
+    return names
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    try:
+        return time.mktime(info.date_time + (0, 0, -1))
+    except Exception:
+        return 0.0
+
+
+_sources: Dict[tuple, CifpSource] = {}
+_sources_lock = threading.Lock()
+
+
+def cifp_source(data_path: Optional[str] = None) -> CifpSource:
+    """DATA_PATH/CIFP if it is a directory, else the first CIFP_BUNDLES archive, else DATA_PATH.
+
+    Archive listings are kept per process until the archive's size or mtime changes.
+    """
+    base = _data_path(data_path)
+    cifp_dir = os.path.join(base, "CIFP")
+    if os.path.isdir(cifp_dir):
+        return CifpSource(cifp_dir)
+    for name in CIFP_BUNDLES:
+        path = os.path.join(base, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        key = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+        with _sources_lock:
+            src = _sources.get(key)
+            if src is None:
+                for old in [k for k in _sources if k[0] == key[0]]:
+                    del _sources[old]
+                src = _sources[key] = CifpSource(path)
+        return src
+    return CifpSource(base)
@@ -0,0 +1,396 @@
+"""Compiled airway graph shared between worker processes through mmap.
+
+After an index run the process that indexed writes the airway graph (nodes,
+directed edges with airway/class/level data) and the airport table into one
+binary file of fixed-width numpy arrays, then atomically repoints
+`<dir>/CURRENT` at it. Every worker maps the current file read-only, so the
+arrays live once in the OS page cache no matter how many workers attach,
+and per-request corridor graphs are cut from them without touching the
+database. Workers notice a new file on their next lookup (one stat call).
+Each file records the navdata version (AIRAC cycle plus index generation) it
+was compiled from; readers only use it while that still matches the database.
+
+File layout: 8-byte magic, uint32 format version, uint32 header length, a
+JSON header ({"meta": ..., "arrays": {name: {dtype, shape, offset}}}) and
+the raw arrays at 64-byte aligned offsets.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import Airport, Airway, Fix
+from app.utils.geo import haversine_nm
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"RHNAVG\x00\x00"
+FORMAT_VERSION = 1
+_ALIGN = 64
+_PREFIX = struct.Struct("<8sII")
+
+KEY_DTYPE = "S16"  # IDENT@CC (ident <= 8, country <= 4)
+AWY_DTYPE = "S16"
+ICAO_DTYPE = "S8"
+
+BBox = Tuple[float, float, float, float]
+
+
+def write_arrays(path: str, meta: dict, arrays: Dict[str, np.ndarray]) -> None:
+    """Write `arrays` (C-contiguous) to `path` via a temp file and rename."""
+    layout = {}
+    offset = 0
+    for name, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        arrays[name] = arr
+        layout[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += -(-arr.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({"meta": meta, "arrays": layout}).encode("utf-8")
+    data_start = -(-(_PREFIX.size + len(header)) // _ALIGN) * _ALIGN
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        f.write(header)
+        f.write(b"\0" * (data_start - _PREFIX.size - len(header)))
+        for name, arr in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class MappedArrays:
+    """Read-only numpy views over a file written by write_arrays()."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, hlen = _PREFIX.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a compiled navdata file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: format version {version}, expected {FORMAT_VERSION}")
+        header = json.loads(self._mm[_PREFIX.size:_PREFIX.size + hlen].decode("utf-8"))
+        data_start = -(-(_PREFIX.size + hlen) // _ALIGN) * _ALIGN
+        self.meta: dict = header["meta"]
+        self.arrays: Dict[str, np.ndarray] = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            count = int(np.prod(shape)) if shape else 1
+            arr = np.frombuffer(self._mm, dtype=dtype, count=count, offset=data_start + spec["offset"])
+            self.arrays[name] = arr.reshape(shape)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.arrays[name]
+
+
+def _key(ident: Optional[str], cc: Optional[str]) -> Optional[str]:
+    # Same IDENT@CC scheme as db_graph / route_resolver
+    if not ident:
+        return None
+    cc_u = (cc or '').upper()
+    return f"{ident.upper()}@{cc_u}" if cc_u else ident.upper()
+
+
+def _graph_arrays(
+    segments,
+    airports,
+) -> Dict[str, np.ndarray]:
+    """Arrays for the file from (name, direction, class, lo, hi, ident1, cc1, lat1, lon1, ident2, cc2, lat2, lon2)
+    segment tuples and (icao, lat, lon) airport tuples."""
+    node_ix: Dict[str, int] = {}
+    keys: List[str] = []
+    lats: List[float] = []
+    lons: List[float] = []
+    awy_ix: Dict[str, int] = {}
+    e_from: List[int] = []
+    e_to: List[int] = []
+    e_nm: List[float] = []
+    e_awy: List[int] = []
+    e_cls: List[int] = []
+    e_lo: List[int] = []
+    e_hi: List[int] = []
+
+    def node(k: str, lat: float, lon: float) -> int:
+        i = node_ix.get(k)
+        if i is None:
+            i = node_ix[k] = len(keys)
+            keys.append(k)
+            lats.append(lat)
+            lons.append(lon)
+        return i
+
+    for name, direction, rclass, lo, hi, i1, c1, la1, lo1, i2, c2, la2, lo2 in segments:
+        k1, k2 = _key(i1, c1), _key(i2, c2)
+        if not k1 or not k2:
+            continue
+        a = node(k1, float(la1), float(lo1))
+        b = node(k2, float(la2), float(lo2))
+        w = awy_ix.setdefault(name, len(awy_ix))
+        d = haversine_nm(float(la1), float(lo1), float(la2), float(lo2))
+        pairs = []
+        if direction in ("N", "P"):
+            pairs.append((a, b))
+        if direction in ("N", "M"):
+            pairs.append((b, a))
+        for u, v in pairs:
+            e_from.append(u)
+            e_to.append(v)
+            e_nm.append(d)
+            e_awy.append(w)
+            e_cls.append(int(rclass))
+            e_lo.append(int(lo))
+            e_hi.append(int(hi))
+
+    key_arr = np.array(keys, dtype=KEY_DTYPE)
+    order = np.argsort(key_arr, kind="stable").astype(np.int32)
+    apts = sorted((str(i).upper(), float(la), float(lo)) for i, la, lo in airports if i)
+    return {
+        "node_key": key_arr,
+        "node_lat": np.array(lats, dtype=np.float64),
+        "node_lon": np.array(lons, dtype=np.float64),
+        "node_sorted": order,
+        "node_key_sorted": key_arr[order],
+        "edge_from": np.array(e_from, dtype=np.int32),
+        "edge_to": np.array(e_to, dtype=np.int32),
+        "edge_nm": np.array(e_nm, dtype=np.float64),
+        "edge_awy": np.array(e_awy, dtype=np.int32),
+        "edge_class": np.array(e_cls, dtype=np.int8),
+        "edge_lo": np.array(e_lo, dtype=np.int32),
+        "edge_hi": np.array(e_hi, dtype=np.int32),
+        "awy_name": np.array(list(awy_ix), dtype=AWY_DTYPE),
+        "apt_icao": np.array([a[0] for a in apts], dtype=ICAO_DTYPE),
+        "apt_lat": np.array([a[1] for a in apts], dtype=np.float64),
+        "apt_lon": np.array([a[2] for a in apts], dtype=np.float64),
+    }
+
+
+def compile_navgraph_db(db: Session, path: str, *, version: Optional[str]) -> dict:
+    """Write the airway graph and airport table from the database to `path`."""
+    F1 = aliased(Fix)
+    F2 = aliased(Fix)
+    segments = (
+        db.query(
+            Airway.name, Airway.direction, Airway.route_class, Airway.lower_fl, Airway.upper_fl,
+            F1.ident, F1.country, F1.lat, F1.lon,
+            F2.ident, F2.country, F2.lat, F2.lon,
+        )
+        .join(F1, F1.id == Airway.fix1_id)
+        .join(F2, F2.id == Airway.fix2_id)
+        .order_by(Airway.id)
+        .yield_per(10000)
+    )
+    airports = db.query(Airport.icao, Airport.lat, Airport.lon).all()
+    arrays = _graph_arrays(segments, airports)
+    meta = {"version": version, "source": "db", "built_at": time.time()}
+    write_arrays(path, meta, arrays)
+    return {"nodes": len(arrays["node_key"]), "edges": len(arrays["edge_from"]), "airports": len(arrays["apt_icao"])}
+
+
+class NavGraph:
+    """Airway graph over mmap'd arrays (see module docstring)."""
+
+    def __init__(self, path: str) -> None:
+        self.data = MappedArrays(path)
+        self.path = path
+        self.cycle: Optional[str] = self.data.meta.get("cycle")
+        # navdata_version_db at compile time; None for graphs not built from the database
+        self.version: Optional[str] = self.data.meta.get("version")
+        d = self.data
+        self.node_key = d["node_key"]
+        self.node_lat = d["node_lat"]
+        self.node_lon = d["node_lon"]
+        self.node_sorted = d["node_sorted"]
+        self.node_key_sorted = d["node_key_sorted"]
+        self.edge_from = d["edge_from"]
+        self.edge_to = d["edge_to"]
+        self.edge_nm = d["edge_nm"]
+        self.edge_awy = d["edge_awy"]
+        self.edge_class = d["edge_class"]
+        self.edge_lo = d["edge_lo"]
+        self.edge_hi = d["edge_hi"]
+        self.apt_icao = d["apt_icao"]
+        self.apt_lat = d["apt_lat"]
+        self.apt_lon = d["apt_lon"]
+        # Airway names are few; decode once
+        self.awy_names: List[str] = [n.decode("ascii") for n in d["awy_name"].tolist()]
+
+    def __len__(self) -> int:
+        return len(self.node_key)
+
+    def node_index(self, key: str) -> Optional[int]:
+        k = key.upper().encode("ascii", "ignore")
+        i = int(np.searchsorted(self.node_key_sorted, k))
+        if i < len(self.node_key_sorted) and self.node_key_sorted[i] == k:
+            return int(self.node_sorted[i])
+        return None
+
+    def airport(self, icao: str) -> Optional[Tuple[float, float]]:
+        k = (icao or '').strip().upper().encode("ascii", "ignore")
+        i = int(np.searchsorted(self.apt_icao, k))
+        if i < len(self.apt_icao) and self.apt_icao[i] == k:
+            return (float(self.apt_lat[i]), float(self.apt_lon[i]))
+        return None
+
+    def subgraph(
+        self,
+        *,
+        cruise_fl: int,
+        fl_range: Tuple[int, int],
+        include_only_matching_class: bool = True,
+        bbox: Optional[BBox] = None,
+    ) -> Tuple[Dict[str, List[Tuple[str, float, str]]], Dict[str, Tuple[float, float]]]:
+        """Same (adj, coords) as db_graph.build_graph_from_db, cut from the arrays."""
+        lo, hi = fl_range
+        mask = (self.edge_hi >= lo) & (self.edge_lo <= hi)
+        if include_only_matching_class:
+            mask &= self.edge_class == (2 if cruise_fl >= 245 else 1)
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            inside = (
+                (self.node_lat >= min_lat) & (self.node_lat <= max_lat)
+                & (self.node_lon >= min_lon) & (self.node_lon <= max_lon)
+            )
+            mask &= inside[self.edge_from] | inside[self.edge_to]
+        sel = np.flatnonzero(mask)
+        src = self.edge_from[sel]
+        dst = self.edge_to[sel]
+        nodes = np.unique(np.concatenate([src, dst]))
+        names = dict(zip(nodes.tolist(), np.char.decode(self.node_key[nodes], "ascii").tolist()))
+        coords = {
+            names[i]: (la, lo_)
+            for i, la, lo_ in zip(nodes.tolist(), self.node_lat[nodes].tolist(), self.node_lon[nodes].tolist())
+        }
+        awy = self.awy_names
+        adj: Dict[str, List[Tuple[str, float, str]]] = {}
+        for u, v, w, a in zip(src.tolist(), dst.tolist(), self.edge_nm[sel].tolist(), self.edge_awy[sel].tolist()):
+            adj.setdefault(names[u], []).append((names[v], w, awy[a]))
+        return adj, coords
+
+
+# --- publishing / attaching -------------------------------------------------
+
+_POINTER = "CURRENT"
+_current: Optional[NavGraph] = None
+_current_stamp: Optional[Tuple[int, str]] = None
+_lock = threading.Lock()
+
+
+def navgraph_enabled() -> bool:
+    return os.getenv("SHARED_NAVGRAPH", "1").strip().lower() not in ("0", "false", "no", "off")
+
+
+def navgraph_dir() -> str:
+    default = os.path.join(os.getenv("DB_DIR", os.path.join(os.getcwd(), "var", "lib", "routehelper")), "navgraph")
+    return os.getenv("NAVGRAPH_DIR", default)
+
+
+def _read_pointer(root: str) -> Optional[Tuple[int, str]]:
+    p = os.path.join(root, _POINTER)
+    try:
+        st = os.stat(p)
+        with open(p, "r", encoding="ascii") as f:
+            return st.st_mtime_ns, f.read().strip()
+    except OSError:
+        return None
+
+
+def publish_navgraph(db: Session, *, version: Optional[str]) -> Optional[dict]:
+    """Compile the graph from the database and make it current for all workers."""
+    if not navgraph_enabled():
+        return None
+    root = navgraph_dir()
+    os.makedirs(root, exist_ok=True)
+    name = f"navgraph-{version or 'none'}-{int(time.time())}-{uuid.uuid4().hex[:6]}.bin"
+    t0 = time.perf_counter()
+    counts = compile_navgraph_db(db, os.path.join(root, name), version=version)
+    tmp = os.path.join(root, f"{_POINTER}.{uuid.uuid4().hex[:8]}.tmp")
+    with open(tmp, "w", encoding="ascii") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(root, _POINTER))
+    log.info("Navgraph %s published in %.2fs: %s", name, time.perf_counter() - t0, counts)
+    _cleanup(root, keep={name})
+    get_navgraph()
+    return counts
+
+
+def _cleanup(root: str, keep: set) -> None:
+    # Keep the previous file for workers that have not switched yet
+    files = sorted(
+        (f for f in os.listdir(root) if f.startswith("navgraph-") and f.endswith(".bin") and f not in keep),
+        key=lambda f: os.path.getmtime(os.path.join(root, f)),
+    )
+    for f in files[:-1]:
+        try:
+            os.remove(os.path.join(root, f))
+        except OSError:
+            # Still mapped by a worker on platforms that forbid it; retried next publish
+            pass
+
+
+def get_navgraph() -> Optional[NavGraph]:
+    """The current shared graph, re-attached if another process published a new one."""
+    global _current, _current_stamp
+    if not navgraph_enabled():
+        return None
+    root = navgraph_dir()
+    stamp = _read_pointer(root)
+    if stamp is None:
+        return None
+    if stamp == _current_stamp:
+        return _current
+    with _lock:
+        if stamp != _current_stamp:
+            try:
+                graph = NavGraph(os.path.join(root, stamp[1]))
+            except (OSError, ValueError) as e:
+                log.warning("Navgraph %s not usable: %s", stamp[1], e)
+                return _current
+            _current, _current_stamp = graph, stamp
+            log.info("Navgraph attached: %s (version %s, %d nodes)", stamp[1], graph.version, len(graph))
+        return _current
+
+
+def ensure_navgraph(db: Session, *, version: Optional[str]) -> Optional[NavGraph]:
+    """Attach the current graph, compiling it first if none exists for navdata `version`.
+
+    Meant for startup: with several workers only the one that takes the
+    lock compiles; the others keep using the database until it is published.
+    """
+    if not navgraph_enabled() or version is None:
+        return None
+    graph = get_navgraph()
+    if graph is not None and graph.version == version:
+        return graph
+    root = navgraph_dir()
+    os.makedirs(root, exist_ok=True)
+    lock = os.path.join(root, "build.lock")
+    try:
+        if os.path.exists(lock) and time.time() - os.path.getmtime(lock) > 600:
+            os.remove(lock)  # left behind by a crashed builder
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError:
+        return graph
+    try:
+        os.close(fd)
+        publish_navgraph(db, version=version)
+    finally:
+        try:
+            os.remove(lock)
+        except OSError:
+            pass
+    return get_navgraph()
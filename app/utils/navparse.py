@@ -0,0 +1,230 @@
+"""Streaming parser for the X-Plane navdata text formats.
+
+Every loader (navdata, the indexer, the file-backed planner, the compiler,
+the CLI) goes through this module. Files (or their decompressed streams, see
+app.utils.navfiles) are read as bytes in large chunks
+that end on a line boundary. Each chunk is decoded once (and for earth_awy.dat
+upper-cased once) and split into token rows with `map(str.split, ...)`. The
+per-line Python work is then only the field checks and number conversions.
+This unifies the loaders; it is not faster than a line-by-line loop, since the
+per-field float()/int() calls dominate either way (scripts/bench_parse.py).
+
+Record shapes:
+- earth_fix.dat      -> FixRecord     (ident, usage, country, lat, lon, dbid, name)
+- earth_awy.dat      -> AirwayRecord  (fix1, fix1_cc, fix2, fix2_cc, direction, route_class,
+                                       lower_fl, upper_fl, airway); both the 11-token layout and
+                                       the 13-token layout with navaid frequencies
+- earth_aptmeta.dat  -> AirportRecord (icao, lat, lon)
+- apt.dat            -> (icao, name, alias) for airport header rows and `1302 icao_code` rows
+"""
+from __future__ import annotations
+
+from typing import BinaryIO, Iterator, List, NamedTuple, Optional, Tuple
+
+from app.utils.navfiles import open_binary
+
+CHUNK_SIZE = 1 << 20
+
+# (ident, usage, country, lat, lon, dbid, name)
+FixRecord = Tuple[str, Optional[str], Optional[str], float, float, Optional[str], Optional[str]]
+# (fix1, fix1_cc, fix2, fix2_cc, direction, route_class, lower_fl, upper_fl, airway_name)
+AirwayRecord = Tuple[str, str, str, str, str, int, int, int, str]
+
+
+class AirportRecord(NamedTuple):
+    icao: str
+    lat: float
+    lon: float
+
+
+_DIRECTIONS = frozenset(("N", "P", "M"))
+# apt.dat airport header rows: 1 land, 16 seaplane base, 17 heliport
+_APT_HEADERS = frozenset(("1", "16", "17"))
+
+
+# --- chunking ---------------------------------------------------------------
+
+def iter_stream_chunks(f: BinaryIO, chunk_size: Optional[int] = None) -> Iterator[str]:
+    """Decoded text of a binary stream, `chunk_size` (default CHUNK_SIZE) bytes at a time,
+    each chunk cut after its last newline so no line spans two chunks."""
+    chunk_size = chunk_size or CHUNK_SIZE
+    tail = b""
+    while True:
+        block = f.read(chunk_size)
+        if not block:
+            break
+        cut = block.rfind(b"\n")
+        if cut < 0:
+            tail += block
+            continue
+        data = tail + block[:cut] if tail else block[:cut]
+        tail = block[cut + 1:]
+        yield data.decode("utf-8", "ignore")
+    if tail:
+        yield tail.decode("utf-8", "ignore")
+
+
+def iter_chunks(path: str, chunk_size: Optional[int] = None) -> Iterator[str]:
+    """iter_stream_chunks over `path`, decompressing `.gz`/`.xz`/`.zst` files on the fly."""
+    with open_binary(path) as f:
+        yield from iter_stream_chunks(f, chunk_size)
+
+
+def iter_lines(path: str, chunk_size: Optional[int] = None) -> Iterator[str]:
+    """Lines of `path` without the newline, read through iter_chunks."""
+    for text in iter_chunks(path, chunk_size):
+        yield from text.split("\n")
+
+
+# --- earth_fix.dat ------------------------------------------------------------
+
+def parse_fix_line(line: str) -> Optional[FixRecord]:
+    parts = line.split()
+    n = len(parts)
+    if n < 3 or parts[0][0] == ";":
+        return None
+    try:
+        lat = float(parts[0])
+        lon = float(parts[1])
+    except ValueError:
+        return None
+    return (
+        parts[2].upper(),
+        parts[3].upper() if n > 3 else None,
+        parts[4].upper() if n > 4 else None,
+        lat,
+        lon,
+        parts[5] if n > 5 else None,
+        parts[6] if n > 6 else None,
+    )
+
+
+def parse_fix_chunk(text: str) -> List[FixRecord]:
+    """parse_fix_line over every line of `text`, without the per-call overhead."""
+    out: List[FixRecord] = []
+    append = out.append
+    for parts in map(str.split, text.split("\n")):
+        n = len(parts)
+        if n < 3 or parts[0][0] == ";":
+            continue
+        try:
+            lat = float(parts[0])
+            lon = float(parts[1])
+        except ValueError:
+            continue
+        if n >= 7:
+            append((parts[2].upper(), parts[3].upper(), parts[4].upper(), lat, lon, parts[5], parts[6]))
+        else:
+            append((
+                parts[2].upper(),
+                parts[3].upper() if n > 3 else None,
+                parts[4].upper() if n > 4 else None,
+                lat,
+                lon,
+                parts[5] if n > 5 else None,
+                None,
+            ))
+    return out
+
+
+# --- earth_awy.dat ------------------------------------------------------------
+
+def parse_awy_line(line: str) -> Optional[AirwayRecord]:
+    parts = line.upper().split()
+    n = len(parts)
+    if n < 11 or parts[0][0] == ";":
+        return None
+    # 13 tokens: fix1 cc type freq fix2 cc type freq dir class lo hi name
+    # 11 tokens: fix1 cc type fix2 cc type dir class lo hi name
+    k = 4 if n >= 13 else 3
+    try:
+        route_class = int(parts[2 * k + 1])
+        lower_fl = int(parts[2 * k + 2])
+        upper_fl = int(parts[2 * k + 3])
+    except ValueError:
+        return None
+    direction = parts[2 * k]
+    if direction not in _DIRECTIONS:
+        return None
+    return (parts[0], parts[1], parts[k], parts[k + 1], direction, route_class, lower_fl, upper_fl, parts[2 * k + 4])
+
+
+def parse_awy_chunk(text: str) -> List[AirwayRecord]:
+    """parse_awy_line over every line of `text`, without the per-call overhead."""
+    out: List[AirwayRecord] = []
+    append = out.append
+    directions = _DIRECTIONS
+    # Every kept string field is upper-cased, so do it once for the whole chunk
+    for parts in map(str.split, text.upper().split("\n")):
+        n = len(parts)
+        if n < 11 or parts[0][0] == ";":
+            continue
+        if n >= 13:
+            f1, c1, _t1, _q1, f2, c2, _t2, _q2, direction, rclass, lo, hi, name = parts[:13]
+        else:
+            f1, c1, _t1, f2, c2, _t2, direction, rclass, lo, hi, name = parts[:11]
+        try:
+            rec = (f1, c1, f2, c2, direction, int(rclass), int(lo), int(hi), name)
+        except ValueError:
+            continue
+        if direction in directions:
+            append(rec)
+    return out
+
+
+# --- earth_aptmeta.dat --------------------------------------------------------
+
+def parse_airport_meta_line(line: str) -> Optional[AirportRecord]:
+    # ICAO COUNTRY LAT LON ...
+    parts = line.split()
+    if len(parts) < 4 or parts[0][0] == ";":
+        return None
+    try:
+        return AirportRecord(parts[0].upper(), float(parts[2]), float(parts[3]))
+    except ValueError:
+        return None
+
+
+def parse_airport_meta_chunk(text: str) -> List[AirportRecord]:
+    return [rec for rec in map(parse_airport_meta_line, text.split("\n")) if rec is not None]
+
+
+# --- file iterators -------------------------------------------------------------
+
+def iter_fix_records(path: str) -> Iterator[FixRecord]:
+    for text in iter_chunks(path):
+        yield from parse_fix_chunk(text)
+
+
+def iter_airway_records(path: str) -> Iterator[AirwayRecord]:
+    for text in iter_chunks(path):
+        yield from parse_awy_chunk(text)
+
+
+def iter_airport_records(path: str) -> Iterator[AirportRecord]:
+    for text in iter_chunks(path):
+        yield from parse_airport_meta_chunk(text)
+
+
+def iter_airport_names(path: str) -> Iterator[Tuple[str, str, bool]]:
+    """(ident, name, False) per airport header row, plus (icao, name, True) where a
+    `1302 icao_code` row maps the airport's local ident to a different ICAO code."""
+    ident: Optional[str] = None
+    name = ""
+    for line in iter_lines(path):
+        code = line[:5].split(None, 1)
+        if not code:
+            continue
+        if code[0] in _APT_HEADERS:
+            parts = line.split(None, 5)
+            ident = None
+            if len(parts) >= 6:
+                ident = parts[4].upper()
+                name = parts[5].strip()
+                yield ident, name, False
+        elif code[0] == "1302" and ident:
+            parts = line.split()
+            if len(parts) >= 3 and parts[1] == "icao_code":
+                icao = parts[2].upper()
+                if icao != ident:
+                    yield icao, name, True
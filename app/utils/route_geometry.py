@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import json
+from typing import List, Optional, Sequence, Tuple
+
+from app.utils.geo import haversine_nm
+
+GEOMETRY_VERSION = 1
+
+
+def _encode_value(v: int, out: List[str]) -> None:
+    v = ~(v << 1) if v < 0 else (v << 1)
+    while v >= 0x20:
+        out.append(chr((0x20 | (v & 0x1f)) + 63))
+        v >>= 5
+    out.append(chr(v + 63))
+
+
+def encode_polyline(points: Sequence[Tuple[float, float]], precision: int = 5) -> str:
+    """Encoded Polyline Algorithm (as used by Google/OSRM): ~4-6 bytes per point."""
+    factor = 10 ** precision
+    out: List[str] = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        ilat = int(round(lat * factor))
+        ilon = int(round(lon * factor))
+        _encode_value(ilat - prev_lat, out)
+        _encode_value(ilon - prev_lon, out)
+        prev_lat, prev_lon = ilat, ilon
+    return ''.join(out)
+
+
+def decode_polyline(text: str, precision: int = 5) -> List[Tuple[float, float]]:
+    factor = float(10 ** precision)
+    points: List[Tuple[float, float]] = []
+    i = 0
+    lat = lon = 0
+    n = len(text)
+    while i < n:
+        vals = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                b = ord(text[i]) - 63
+                i += 1
+                result |= (b & 0x1f) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            vals.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += vals[0]
+        lon += vals[1]
+        points.append((lat / factor, lon / factor))
+    return points
+
+
+def normalize_route_tokens(route_text: str) -> str:
+    return ' '.join(t.upper() for t in (route_text or '').split())
+
+
+def route_length_nm(points: Sequence[Tuple[float, float, str]]) -> float:
+    return round(sum(haversine_nm(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:])), 1)
+
+
+def encode_route_geometry(
+    points: Sequence[Tuple[float, float, str]],
+    route_text: str,
+    origin: Optional[Tuple[float, float]],
+    dest: Optional[Tuple[float, float]],
+) -> str:
+    """Serialize resolved route geometry for FlightPlan.geometry.
+
+    Stored keys: v (version), t (normalized route tokens the geometry was
+    resolved from), p (encoded polyline of fixes), n (fix idents), l (leg
+    distances in NM between consecutive fixes), o/d (airport coordinates).
+    """
+    legs = [
+        round(haversine_nm(a[0], a[1], b[0], b[1]), 1)
+        for a, b in zip(points, points[1:])
+    ]
+    data = {
+        "v": GEOMETRY_VERSION,
+        "t": normalize_route_tokens(route_text),
+        "p": encode_polyline([(lat, lon) for lat, lon, _ in points]),
+        "n": ' '.join(name for _, _, name in points),
+        "l": legs,
+        "o": [round(origin[0], 5), round(origin[1], 5)] if origin else None,
+        "d": [round(dest[0], 5), round(dest[1], 5)] if dest else None,
+    }
+    return json.dumps(data, separators=(',', ':'))
+
+
+def decode_route_geometry(text: Optional[str]) -> Optional[dict]:
+    """Inverse of encode_route_geometry; returns None for missing/unknown data.
+
+    Result keys: route_tokens, points [(lat, lon, ident)], legs_nm, origin, dest.
+    """
+    if not text:
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("v") != GEOMETRY_VERSION:
+        return None
+    latlons = decode_polyline(data.get("p") or '')
+    names = (data.get("n") or '').split()
+    if len(names) != len(latlons):
+        return None
+    return {
+        "route_tokens": data.get("t") or '',
+        "points": [(lat, lon, name) for (lat, lon), name in zip(latlons, names)],
+        "legs_nm": list(data.get("l") or []),
+        "origin": tuple(data["o"]) if data.get("o") else None,
+        "dest": tuple(data["d"]) if data.get("d") else None,
+    }
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session, aliased
+
+from app.db.models import Airway, Fix
+from app.utils.dbnav import navdata_version_db
+from app.utils.geo import haversine_nm
+
+# Tokens that never name a fix: DCT and speed/level groups such as N0450F350
+_SKIP_RE = re.compile(r"^(DCT|[NKM]\d{3,4}[FAMS]\d{3,4})$")
+
+
+@dataclass
+class ResolvedRoute:
+    points: List[Tuple[float, float, str]] = field(default_factory=list)  # (lat, lon, ident)
+    nodes: List[str] = field(default_factory=list)  # IDENT@CC per point
+    unresolved: List[str] = field(default_factory=list)
+
+
+def _node_key(ident: str, cc: Optional[str]) -> str:
+    # Same IDENT@CC scheme as db_graph so resolved nodes match graph nodes
+    cc_u = (cc or '').upper()
+    return f"{ident.upper()}@{cc_u}" if cc_u else ident.upper()
+
+
+def _ident(key: str) -> str:
+    return key.split('@', 1)[0]
+
+
+class RouteResolver:
+    """Resolve route strings ("FIX AWY FIX DCT FIX ...") into coordinates.
+
+    Airways are stored as ordered fix sequences (chains) with a position
+    index, so `FIX AWY FIX` expands to every intermediate fix by slicing.
+    Ambiguous idents are resolved to the candidate closest to the previous
+    resolved point.
+    """
+
+    def __init__(self, coords: Dict[str, Tuple[float, float]], airway_edges: Dict[str, Iterable[Tuple[str, str]]], *, version: Optional[str] = None) -> None:
+        self.version = version
+        self.coords = coords
+        self.by_ident: Dict[str, List[str]] = {}
+        for key in coords:
+            self.by_ident.setdefault(_ident(key), []).append(key)
+        self.adj: Dict[str, Dict[str, List[str]]] = {}
+        self.chains: Dict[str, List[List[str]]] = {}
+        self.positions: Dict[str, Dict[str, List[Tuple[int, int]]]] = {}
+        for name, edges in airway_edges.items():
+            adj: Dict[str, List[str]] = {}
+            for a, b in edges:
+                if b not in adj.setdefault(a, []):
+                    adj[a].append(b)
+                if a not in adj.setdefault(b, []):
+                    adj[b].append(a)
+            self.adj[name] = adj
+            chains = self._chains(adj)
+            self.chains[name] = chains
+            pos: Dict[str, List[Tuple[int, int]]] = {}
+            for ci, chain in enumerate(chains):
+                for pi, key in enumerate(chain):
+                    pos.setdefault(key, []).append((ci, pi))
+            self.positions[name] = pos
+
+    @staticmethod
+    def _chains(adj: Dict[str, List[str]]) -> List[List[str]]:
+        """Split an airway into maximal simple paths, breaking at ends and branch points."""
+        chains: List[List[str]] = []
+        used: set[Tuple[str, str]] = set()
+        starts = [n for n, nbs in adj.items() if len(nbs) != 2] or list(adj)[:1]
+        for start in starts + list(adj):
+            for nb in adj[start]:
+                if (start, nb) in used:
+                    continue
+                chain = [start]
+                prev, cur = start, nb
+                used.add((prev, cur)); used.add((cur, prev))
+                while True:
+                    chain.append(cur)
+                    if len(adj[cur]) != 2 or cur == start:
+                        break
+                    nxt = adj[cur][0] if adj[cur][1] == prev else adj[cur][1]
+                    if (cur, nxt) in used:
+                        break
+                    used.add((cur, nxt)); used.add((nxt, cur))
+                    prev, cur = cur, nxt
+                chains.append(chain)
+        return chains
+
+    @classmethod
+    def from_db(cls, db: Session, *, version: Optional[str] = None) -> "RouteResolver":
+        coords: Dict[str, Tuple[float, float]] = {}
+        for ident, cc, lat, lon in db.query(Fix.ident, Fix.country, Fix.lat, Fix.lon).all():
+            coords.setdefault(_node_key(ident, cc), (float(lat), float(lon)))
+        F1 = aliased(Fix)
+        F2 = aliased(Fix)
+        rows = (
+            db.query(Airway.name, F1.ident, F1.country, F2.ident, F2.country)
+            .join(F1, F1.id == Airway.fix1_id)
+            .join(F2, F2.id == Airway.fix2_id)
+            .all()
+        )
+        edges: Dict[str, List[Tuple[str, str]]] = {}
+        for name, i1, c1, i2, c2 in rows:
+            edges.setdefault(name.upper(), []).append((_node_key(i1, c1), _node_key(i2, c2)))
+        return cls(coords, edges, version=version)
+
+    def _nearest(self, keys: Iterable[str], ref: Optional[Tuple[float, float]]) -> Optional[str]:
+        keys = list(keys)
+        if not keys:
+            return None
+        if ref is None or len(keys) == 1:
+            return keys[0]
+        return min(keys, key=lambda k: haversine_nm(ref[0], ref[1], *self.coords[k]))
+
+    def _expand(self, airway: str, entry: str, exit_ident: str) -> Optional[List[str]]:
+        """Nodes after `entry` up to and including the exit fix along `airway`."""
+        pos = self.positions.get(airway, {})
+        entry_pos = pos.get(entry)
+        if not entry_pos:
+            return None
+        best: Optional[List[str]] = None
+        for key in self.by_ident.get(exit_ident, []):
+            for ci, pi in pos.get(key, []):
+                for cj, pj in entry_pos:
+                    if ci != cj:
+                        continue
+                    chain = self.chains[airway][ci]
+                    path = chain[pj + 1:pi + 1] if pi > pj else chain[pi:pj][::-1]
+                    if path and (best is None or len(path) < len(best)):
+                        best = path
+        if best is not None:
+            return best
+        # Entry and exit on different branches of the airway: walk its adjacency
+        targets = {k for k in self.by_ident.get(exit_ident, []) if k in self.adj.get(airway, {})}
+        if not targets:
+            return None
+        prev: Dict[str, Optional[str]] = {entry: None}
+        queue = deque([entry])
+        while queue:
+            cur = queue.popleft()
+            if cur in targets:
+                path = []
+                while cur != entry:
+                    path.append(cur)
+                    cur = prev[cur]
+                return path[::-1]
+            for nb in self.adj[airway].get(cur, []):
+                if nb not in prev:
+                    prev[nb] = cur
+                    queue.append(nb)
+        return None
+
+    def resolve(self, items_text: str, *, origin: Optional[Tuple[float, float]] = None) -> ResolvedRoute:
+        out = ResolvedRoute()
+        tokens = [t.upper() for t in (items_text or '').split() if t.strip()]
+        ref = origin
+        i = 0
+        while i < len(tokens):
+            tok = tokens[i]
+            if _SKIP_RE.match(tok):
+                i += 1
+                continue
+            nxt = tokens[i + 1] if i + 1 < len(tokens) else None
+            if tok in self.chains and out.nodes and nxt:
+                # Re-anchor the entry on this airway (the previous ident may be ambiguous)
+                last = out.nodes[-1]
+                entry = last if last in self.positions[tok] else self._nearest(
+                    (k for k in self.by_ident.get(_ident(last), []) if k in self.positions[tok]), ref)
+                path = self._expand(tok, entry, nxt) if entry else None
+                if path:
+                    if entry != last:
+                        lat, lon = self.coords[entry]
+                        out.nodes[-1] = entry
+                        out.points[-1] = (lat, lon, _ident(entry))
+                    for key in path:
+                        lat, lon = self.coords[key]
+                        out.nodes.append(key)
+                        out.points.append((lat, lon, _ident(key)))
+                    ref = self.coords[path[-1]]
+                    i += 2
+                    continue
+            key = self._nearest(self.by_ident.get(tok, []), ref)
+            if key is None:
+                out.unresolved.append(tok)
+            else:
+                lat, lon = self.coords[key]
+                out.nodes.append(key)
+                out.points.append((lat, lon, tok))
+                ref = (lat, lon)
+            i += 1
+        return out
+
+
+_resolver: Optional[RouteResolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_route_resolver(db: Session) -> RouteResolver:
+    """Shared resolver, rebuilt when the navdata version (cycle + index generation) changes."""
+    global _resolver
+    version = navdata_version_db(db)
+    res = _resolver
+    if res is not None and res.version == version:
+        return res
+    with _resolver_lock:
+        if _resolver is None or _resolver.version != version:
+            _resolver = RouteResolver.from_db(db, version=version)
+        return _resolver
+
+
+def refresh_route_resolver(db: Session) -> RouteResolver:
+    global _resolver
+    with _resolver_lock:
+        _resolver = RouteResolver.from_db(db, version=navdata_version_db(db))
+        return _resolver
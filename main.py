@@ -1,4 +1,5 @@
 import sys
+import io
 import logging
 import requests
 import os
@@ -106,6 +107,30 @@ class RouteHelper:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
         return R_nm * c
     # Map data loading helpers (file I/O centralized here)
+    def compiled_navdata(self):
+        """Memory-mapped compiled navdata for DATA_PATH, or None if missing or stale."""
+        try:
+            from app.utils.compiled_navdata import get_compiled_navdata
+            return get_compiled_navdata(self.data_path)
+        except Exception as e:
+            self._log.debug("Compiled navdata unavailable: %s", e)
+            return None
+
+    def plan_offline(self, origin: str, dest: str, fl_start: int, fl_end: int) -> str:
+        """Plan a route with the internal planner straight from the navdata files (no database)."""
+        os.environ.setdefault('DATA_PATH', self.data_path)
+        from app.services.planner import PlannerOptions, plan_route_from_files
+        lo, hi = sorted((fl_start, fl_end))
+        planned = plan_route_from_files(PlannerOptions(origin=origin.upper(), dest=dest.upper(), fl_start=lo, fl_end=hi))
+        if planned.distance_nm is None:
+            return f'Route: {planned.route_text}'
+        return f'Route: {planned.route_text}\nDistance: {planned.distance_nm:.0f} NM'
+
+    def compile_navdata(self) -> dict:
+        """Parse the navdata text files once into the binary file used by the loaders."""
+        from app.utils.compiled_navdata import compile_navdata
+        return compile_navdata(self.data_path)
+
     def load_fix_index(self) -> dict:
         """Load and cache fix coordinates from earth_fix.dat under DATA_PATH.
 
@@ -113,29 +138,13 @@ class RouteHelper:
         """
         if self._fix_index is not None:
             return self._fix_index
-        index: dict = {}
-        fix_path = os.path.join(self.data_path, 'earth_fix.dat')
-        try:
-            with open(fix_path, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith(';'):
-                        continue
-                    parts = line.split()
-                    if len(parts) < 3:
-                        continue
-                    try:
-                        lat = float(parts[0])
-                        lon = float(parts[1])
-                        name = parts[-1].upper()
-                        if name and name not in index:
-                            index[name] = (lat, lon)
-                    except Exception:
-                        continue
-        except FileNotFoundError:
-            index = {}
-        self._fix_index = index
-        return index
+        nav = self.compiled_navdata()
+        if nav is not None:
+            self._fix_index = nav.fix_index()
+            return self._fix_index
+        from app.utils.navdata import parse_fix_index
+        self._fix_index = parse_fix_index(self.data_path)
+        return self._fix_index
 
     def load_airport_coords(self) -> dict:
         """Load and cache airport coordinates from X-Plane metadata files.
@@ -145,33 +154,13 @@ class RouteHelper:
         """
         if self._airport_coords is not None:
             return self._airport_coords
-        coords: dict = {}
-        meta_candidates = [
-            os.path.join(self.data_path, 'earth_aptmeta.dat'),
-            os.path.join(self.data_path, 'earth_metadata.dat'),
-        ]
-        meta_path = next((p for p in meta_candidates if os.path.isfile(p)), None)
-        if meta_path:
-            try:
-                with open(meta_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    for line in f:
-                        line = line.strip()
-                        if not line or line.startswith(';'):
-                            continue
-                        parts = line.split()
-                        # Expected: ICAO COUNTRY LAT LON ...
-                        if len(parts) >= 4:
-                            code = parts[0].upper()
-                            try:
-                                lat = float(parts[2])
-                                lon = float(parts[3])
-                                coords[code] = (lat, lon)
-                            except Exception:
-                                continue
-            except Exception:
-                coords = {}
-        self._airport_coords = coords
-        return coords
+        nav = self.compiled_navdata()
+        if nav is not None:
+            self._airport_coords = nav.airport_coords()
+            return self._airport_coords
+        from app.utils.navdata import parse_airport_coords
+        self._airport_coords = parse_airport_coords(self.data_path)
+        return self._airport_coords
 
     def get_route_fix_coords(self, items_text: str) -> list[tuple[float, float, str]]:
         """Return a list of (lat, lon, name) for items present in the fix index.
@@ -246,24 +235,19 @@ class RouteHelper:
     def list_cifp_icaos(self, prefix: str = "", limit: int = 20) -> list[str]:
         """List available ICAO codes from the CIFP directory based on a prefix.
 
-        Looks under DATA_PATH/CIFP first; if not present, falls back to DATA_PATH.
+        Looks under DATA_PATH/CIFP first, then a CIFP archive in DATA_PATH
+        (see app.utils.navfiles), then DATA_PATH itself.
         Returns up to `limit` codes, sorted, filtered by case-insensitive prefix.
         """
-        base_cifp = os.path.join(self.data_path, 'CIFP')
-        search_dir = base_cifp if os.path.isdir(base_cifp) else self.data_path
-        codes: list[str] = []
+        from app.utils.navfiles import cifp_source
         try:
-            for name in os.listdir(search_dir):
-                if name.lower().endswith('.dat'):
-                    code = os.path.splitext(name)[0]
-                    codes.append(code)
+            codes = cifp_source(self.data_path).icaos()
         except Exception:
             # In case DATA_PATH is invalid; return empty list gracefully
             return []
         p = (prefix or '').strip().upper()
         if p:
-            codes = [c for c in codes if c.upper().startswith(p)]
-        codes.sort()
+            codes = [c for c in codes if c.startswith(p)]
         return codes[: max(0, int(limit))]
 
     def search_in_dict_text(self, obj_dict: dict, value: str) -> str:
@@ -332,19 +316,23 @@ class RouteHelper:
         Simple rules:
         - If name_or_path is an existing file, use it.
         - Else treat it as an ICAO code and try:
-          1) DATA_PATH/CIFP/<ICAO>.dat
+          1) DATA_PATH/CIFP/<ICAO>.dat, or the member of a CIFP archive
           2) DATA_PATH/<ICAO>.dat
+        Files may be gzip/xz/zstd compressed.
         """
+        from app.utils.navfiles import cifp_source, data_file, open_binary
         self.reset_procedure_lists()
         # 1) Direct file path
         if os.path.isfile(name_or_path):
-            resolved = name_or_path
+            raw = open_binary(name_or_path)
         else:
             icao = os.path.basename(name_or_path).split('.')[0]
-            candidate_cifp = os.path.join(self.data_path, 'CIFP', f'{icao}.dat')
-            candidate_root = os.path.join(self.data_path, f'{icao}.dat')
-            resolved = candidate_cifp if os.path.isfile(candidate_cifp) else candidate_root
-        with open(resolved, 'r', encoding='utf-8') as f:
+            member = cifp_source(self.data_path).get(icao)
+            if member is not None:
+                raw = member.open()
+            else:
+                raw = open_binary(data_file(f'{icao}.dat', self.data_path) or os.path.join(self.data_path, f'{icao}.dat'))
+        with io.TextIOWrapper(raw, encoding='utf-8') as f:
             for line in f:
                 if 'SID:' in line:
                     self.sids.append(line)
@@ -452,6 +440,11 @@ class RouteHelper:
 
     def run(self, argv):
         try:
+            if len(argv) == 2 and argv[1].upper() == 'COMPILE':
+                counts = self.compile_navdata()
+                print(f"Compiled navdata: {counts['path']} ({counts['fixes']} fixes, {counts['airways']} airway segments, "
+                      f"{counts['airports']} airports, {counts['bytes'] / 1e6:.1f} MB in {counts['seconds']:.2f}s)")
+                return
             if len(argv) < 3:
                 raise ValueError('Not enough arguments')
             icao = argv[1].upper()
@@ -472,6 +465,13 @@ class RouteHelper:
                     self.search_in_dict(self.structure_data(self.stars), fix)
             elif option == 'METAR':
                 self.get_metar(icao)
+            elif option == 'PLAN':
+                icaos = icao.split('/')
+                if len(icaos) != 2:
+                    raise ValueError('PLAN needs ORIGIN/DEST')
+                fl_lo = int(argv[3]) if len(argv) > 3 else 250
+                fl_hi = int(argv[4]) if len(argv) > 4 else 370
+                print(self.plan_offline(icaos[0], icaos[1], fl_lo, fl_hi))
             elif option == 'ROUTE':
                 icaos = icao.split('/')
                 if len(argv) < 4:
@@ -501,6 +501,8 @@ class RouteHelper:
         - ICAO (SID/STAR) FIX: Search for a fix in all procedures (can also search by name of procedure)
         - ICAO METAR: Returns METAR of the airport
         - ICAO/ICAO ROUTE PLANE: List all info for a route (Route, Fuel, SIDS and STARS)
+        - ICAO/ICAO PLAN [FL_LOW FL_HIGH]: Plan a route offline from the navdata files (no database)
+        - COMPILE: Compile the navdata files under DATA_PATH for fast loading
         """
             )
             print(f"Error: {e}")
@@ -0,0 +1,117 @@
+"""Navdata parser throughput: app.utils.navparse against a line-by-line str baseline.
+
+Usage (from the repo root):
+
+    python scripts/bench_parse.py [--data DATA_PATH] [--runs 5] [--chunk 1048576]
+
+For each of earth_fix.dat, earth_awy.dat and earth_aptmeta.dat found under
+--data (default: $DATA_PATH), the whole file is parsed into records --runs
+times and the best run is reported in MB/s. The baseline is the decoded
+`strip().split()` loop that the loaders used before navparse. Run once before
+measuring so the files are in the OS page cache.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Iterable
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app.utils import navparse  # noqa: E402
+
+
+def _baseline_fix(path: str) -> Iterable[tuple]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(";"):
+                continue
+            parts = line.split()
+            if len(parts) < 3:
+                continue
+            try:
+                lat = float(parts[0]); lon = float(parts[1])
+            except ValueError:
+                continue
+            yield (parts[2].upper(), parts[3].upper() if len(parts) > 3 else None,
+                   parts[4].upper() if len(parts) > 4 else None, lat, lon,
+                   parts[5] if len(parts) > 5 else None, parts[6] if len(parts) > 6 else None)
+
+
+def _baseline_awy(path: str) -> Iterable[tuple]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(";"):
+                continue
+            parts = line.split()
+            if len(parts) < 11:
+                continue
+            k = 4 if len(parts) >= 13 else 3
+            try:
+                yield (parts[0].upper(), parts[1].upper(), parts[k].upper(), parts[k + 1].upper(),
+                       parts[2 * k].upper(), int(parts[2 * k + 1]), int(parts[2 * k + 2]),
+                       int(parts[2 * k + 3]), parts[2 * k + 4].upper())
+            except ValueError:
+                continue
+
+
+def _baseline_apt(path: str) -> Iterable[tuple]:
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(";"):
+                continue
+            parts = line.split()
+            if len(parts) >= 4:
+                try:
+                    yield (parts[0].upper(), float(parts[2]), float(parts[3]))
+                except ValueError:
+                    continue
+
+
+def _best(fn: Callable[[str], Iterable], path: str, runs: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        count = sum(1 for _ in fn(path))
+        best = min(best, time.perf_counter() - t0)
+    return best, count
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--data", default=os.getenv("DATA_PATH", "."))
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--chunk", type=int, default=navparse.CHUNK_SIZE)
+    args = ap.parse_args()
+    navparse.CHUNK_SIZE = args.chunk
+
+    cases = [
+        ("earth_fix.dat", lambda p: navparse.iter_fix_records(p), _baseline_fix),
+        ("earth_awy.dat", lambda p: navparse.iter_airway_records(p), _baseline_awy),
+        ("earth_aptmeta.dat", lambda p: navparse.iter_airport_records(p), _baseline_apt),
+    ]
+    print(f"python {sys.version.split()[0]}, best of {args.runs} runs, chunk {args.chunk} bytes")
+    for name, new, old in cases:
+        path = os.path.join(args.data, name)
+        if not os.path.isfile(path):
+            print(f"{name:<18} missing")
+            continue
+        mb = os.path.getsize(path) / 1e6
+        t_new, n_new = _best(new, path, args.runs)
+        t_old, n_old = _best(old, path, args.runs)
+        print(
+            f"{name:<18} {mb:8.1f} MB {n_new:>9} records  "
+            f"navparse {mb / t_new:7.1f} MB/s  baseline {mb / t_old:7.1f} MB/s  "
+            f"x{t_old / t_new:.2f}" + ("" if n_new == n_old else f"  (baseline {n_old} records)")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Worker startup benchmark: import time of app.main and time to first request.
+
+Usage (from the repo root):
+
+    python scripts/bench_startup.py [--runs 5] [--url /health]
+
+Each run starts a fresh interpreter, so module caches do not carry over.
+"Import" is `import app.main` alone; "first request" is a uvicorn process
+from launch until the first successful response for --url. Uses whatever
+DATABASE_URL / DB_DIR / DATA_PATH are set in the environment.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_SNIPPET = (
+    "import time, sys; t = time.perf_counter(); import app.main; "
+    "sys.stdout.write(repr(time.perf_counter() - t))"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def measure_import() -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _IMPORT_SNIPPET],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def measure_first_request(path: str, timeout: float = 60.0) -> float:
+    port = _free_port()
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - t0 < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as r:
+                    r.read()
+                return time.perf_counter() - t0
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+                time.sleep(0.01)
+        raise TimeoutError(f"no response from {path} within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def _summary(samples: list[float]) -> str:
+    ms = sorted(x * 1000 for x in samples)
+    return f"median {statistics.median(ms):7.1f} ms  min {ms[0]:7.1f} ms  max {ms[-1]:7.1f} ms"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--url", default="/health")
+    args = ap.parse_args()
+
+    measure_import()  # warm the OS file cache and .pyc files
+    imports = [measure_import() for _ in range(args.runs)]
+    firsts = [measure_first_request(args.url) for _ in range(args.runs)]
+    print(f"python {sys.version.split()[0]}, {args.runs} runs")
+    print(f"import app.main      {_summary(imports)}")
+    print(f"first request {args.url:<6} {_summary(firsts)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+// Client-side route map: renders the GeoJSON embedded by /route_map with Leaflet.
+// Falls back to the server-rendered Folium map when Leaflet is unavailable.
+(function(){
+  var TILES = {
+    light: 'https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png',
+    dark: 'https://{s}.basemaps.cartocdn.com/dark_all/{z}/{x}/{y}{r}.png'
+  };
+  var ATTRIBUTION = '&copy; OpenStreetMap contributors &copy; CARTO';
+
+  function label(latlng, text, cls){
+    return L.marker(latlng, {
+      interactive: false,
+      keyboard: false,
+      icon: L.divIcon({ className: '', iconSize: null, html: '<div class="route-map-label ' + cls + '">' + text + '</div>' })
+    });
+  }
+
+  function escapeHtml(s){
+    return String(s == null ? '' : s).replace(/[&<>"']/g, function(c){
+      return { '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c];
+    });
+  }
+
+  function midpoint(a, b){ return [(a[1] + b[1]) / 2, (a[0] + b[0]) / 2]; }
+
+  // Nearby airports from the spatial index, loaded for the visible area once zoomed in
+  var AIRPORTS_MIN_ZOOM = 6;
+  function airportsLayer(map){
+    var layer = L.layerGroup().addTo(map);
+    var pending = null;
+    function refresh(){
+      layer.clearLayers();
+      if (map.getZoom() < AIRPORTS_MIN_ZOOM || !window.fetch) return;
+      var bbox = map.getBounds().toBBoxString();
+      pending = bbox;
+      fetch('/airports_bbox?bbox=' + encodeURIComponent(bbox))
+        .then(function(r){ return r.ok ? r.json() : { features: [] }; })
+        .then(function(data){
+          if (pending !== bbox) return;
+          (data.features || []).forEach(function(f){
+            var c = f.geometry.coordinates;
+            L.circleMarker([c[1], c[0]], { radius: 3, color: '#ffcc80', weight: 1, fillOpacity: 0.6 })
+              .bindTooltip(escapeHtml(f.properties.name)).addTo(layer);
+          });
+        })
+        .catch(function(){});
+    }
+    map.on('moveend', refresh);
+    refresh();
+  }
+
+  function fallbackToFolium(){
+    if (!window.htmx) return;
+    window.htmx.ajax('POST', '/route_map', {
+      source: '#route-map-form',
+      target: '#route-map-container',
+      swap: 'innerHTML',
+      values: { renderer: 'folium' }
+    });
+  }
+
+  function render(el){
+    if (!el || el.dataset.rendered) return;
+    el.dataset.rendered = '1';
+    var dataEl = document.getElementById('route-map-geojson');
+    if (!dataEl) return;
+    if (typeof window.L === 'undefined') { fallbackToFolium(); return; }
+    var data;
+    try { data = JSON.parse(dataEl.textContent || '{}'); } catch(e) { fallbackToFolium(); return; }
+
+    // Match the Folium renderer: dark tiles unless the UI is explicitly light
+    var theme = document.documentElement.getAttribute('data-theme') || 'auto';
+    var map = L.map(el, { worldCopyJump: true }).setView([0, 0], 2);
+    L.tileLayer(theme === 'light' ? TILES.light : TILES.dark, { attribution: ATTRIBUTION, subdomains: 'abcd', maxZoom: 19 }).addTo(map);
+
+    var bounds = [];
+    (data.features || []).forEach(function(f){
+      var g = f.geometry || {};
+      var p = f.properties || {};
+      if (g.type === 'LineString') {
+        var latlngs = g.coordinates.map(function(c){ return [c[1], c[0]]; });
+        if (p.kind === 'route') {
+          L.polyline(latlngs, { color: '#00c2ff', weight: 3, opacity: 0.85 }).addTo(map);
+          (p.legs_nm || []).forEach(function(nm, i){
+            label(midpoint(g.coordinates[i], g.coordinates[i + 1]), nm.toFixed(1) + ' nm', 'is-leg').addTo(map);
+          });
+        } else {
+          L.polyline(latlngs, { color: '#90a4ae', weight: 2, opacity: 0.85, dashArray: '4,6' }).addTo(map);
+          label(midpoint(g.coordinates[0], g.coordinates[1]), Number(p.distance_nm).toFixed(1) + ' nm', 'is-leg is-connector').addTo(map);
+        }
+      } else if (g.type === 'Point') {
+        var ll = [g.coordinates[1], g.coordinates[0]];
+        var name = escapeHtml(p.name);
+        bounds.push(ll);
+        if (p.kind === 'fix') {
+          L.circleMarker(ll, { radius: 4, color: '#00c2ff', fill: true, fillColor: '#ffffff', fillOpacity: 0.9 })
+            .bindTooltip(name).addTo(map);
+          label(ll, name, 'is-fix').addTo(map);
+        } else {
+          var title = name + (p.kind === 'origin' ? ' (Origin)' : ' (Destination)');
+          L.marker(ll, { title: title }).bindTooltip(title).addTo(map);
+          label(ll, name, p.kind === 'origin' ? 'is-origin' : 'is-dest').addTo(map);
+        }
+      }
+    });
+    if (bounds.length) map.fitBounds(bounds, { padding: [20, 20] });
+    airportsLayer(map);
+  }
+
+  function renderAll(root){
+    var scope = root && root.querySelectorAll ? root : document;
+    var els = scope.querySelectorAll('[data-route-map]');
+    if (root && root.matches && root.matches('[data-route-map]')) render(root);
+    els.forEach(render);
+  }
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', function(){ renderAll(document); });
+  } else {
+    renderAll(document);
+  }
+  if (window.htmx) {
+    document.body.addEventListener('htmx:load', function(ev){ renderAll(ev.target); });
+  }
+})();
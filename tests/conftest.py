@@ -0,0 +1,24 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# app.db.session creates its engine (and DB_DIR) at import time; keep it out of the tree
+os.environ.setdefault("DB_DIR", tempfile.mkdtemp(prefix="routehelper-tests-"))
+
+from app.db.schema import ensure_schema  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on a fresh SQLite database with the app schema."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    ensure_schema(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
@@ -0,0 +1,85 @@
+from app.utils.cifp import (
+    _altitude,
+    _tenths,
+    leg_rows,
+    parse_cifp_leg,
+    parse_procedure_file,
+    resolve_leg_fix,
+)
+
+# Laid out field by field in the XP CIFP 1101 order: path-term at 11, then TDV, recommended
+# navaid, its ICAO/section/subsection, arc radius, theta, rho, course (20), distance (21),
+# altitude description (22), altitude 1/2 (23/24), transition altitude, speed description
+# and speed limit (27).
+CIFP = (
+    "SID:010,5,TEST1A,RW07L, , , , ,    ,R,   ,VA, , , , , ,      ,    ,    ,0700,0035,+,00500,     ,18000, ,   ,    , , , ,0,D,S;\n"
+    "SID:020,5,TEST1A,RW07L,SIDFX,LE,P,C,E   , ,   ,DF, , , , , ,      ,    ,    ,    ,    ,+,05000,     ,18000,-,250,    , , , ,0,D,S;\n"
+    "SID:030,5,TEST1A,RW07L,FBDX,LE,E,A,EE  , ,   ,TF, , , , , ,      ,    ,    ,    ,    ,B,FL100,07000,18000, ,   ,    , , , ,0,D,S;\n"
+    "STAR:010,5,ARR1B,ALL,FBDX,LE,E,A,E   , ,   ,IF, , , , , ,      ,    ,    ,    ,    ,+,10000,     ,18000, ,   ,    , , , ,0,D,S;\n"
+    "APPCH:010,A,I07L,A,ABC,LE,P,C,E  A, ,   ,IF, , , , , ,      ,    ,    ,    ,    , ,     ,     ,18000, ,   ,    , , , ,0,D,S;\n"
+    "RWY:RW07L,     ,     ,00000,     ,ILBL,1,   ;N41170000,E002030000,0000;\n"
+).encode()
+
+
+def test_tenths_and_altitude():
+    assert _tenths("0700") == 70.0
+    assert _tenths("") is None
+    assert _tenths("12A") is None
+    assert _altitude("05000") == 5000
+    assert _altitude("FL100") == 10000
+    assert _altitude("FLXX") is None
+    assert _altitude("") is None
+
+
+def test_parse_cifp_leg_field_mapping():
+    leg = parse_cifp_leg(CIFP.decode().splitlines()[0])
+    assert (leg.proc_type, leg.seq, leg.route_type, leg.name, leg.transition) == ("SID", 10, "5", "TEST1A", "RW07L")
+    assert leg.fix_ident == "" and leg.path_term == "VA" and leg.turn_dir == "R"
+    assert leg.course == 70.0 and leg.distance == 3.5
+    assert (leg.alt_desc, leg.alt1, leg.alt2) == ("+", 500, None)
+
+    leg = parse_cifp_leg(CIFP.decode().splitlines()[1])
+    assert (leg.fix_ident, leg.fix_region, leg.path_term) == ("SIDFX", "LE", "DF")
+    assert leg.course is None and leg.distance is None and leg.speed_limit == 250
+
+    leg = parse_cifp_leg(CIFP.decode().splitlines()[2])
+    assert (leg.alt_desc, leg.alt1, leg.alt2) == ("B", 10000, 7000)
+
+
+def test_parse_cifp_leg_ignores_other_records():
+    assert parse_cifp_leg("APPCH:010,A,I07L,A,ABC,LE;") is None
+    assert parse_cifp_leg("RWY:RW07L,     ;") is None
+    assert parse_cifp_leg("SID:0X0,5,TEST1A,RW07L,A;") is None
+    assert parse_cifp_leg("SID:010,5;") is None
+
+
+def test_parse_procedure_file_routes():
+    routes, legs = parse_procedure_file(CIFP)
+    assert routes == {
+        ("SID", "TEST1A", "RW07L"): "SIDFX FBDX",
+        ("STAR", "ARR1B", "ALL"): "FBDX",
+    }
+    assert [leg.seq for leg in legs] == [10, 20, 30, 10]
+
+
+def test_resolve_leg_fix():
+    cands = {
+        "FBDX": [("LE", "ENRT", 41.0, 2.0), ("LF", "ENRT", 45.0, 5.0)],
+        "RW07L": [("LE", "LEMD", 40.4, -3.5), ("LE", "LEBL", 41.3, 2.1)],
+        "DUP": [("LE", "ENRT", 40.0, 0.0), ("LE", "ENRT", 42.0, 2.0)],
+    }
+    # Terminal waypoints are matched on the airport ICAO first
+    assert resolve_leg_fix(cands, "RW07L", "LE", "LEBL", None) == (41.3, 2.1)
+    assert resolve_leg_fix(cands, "FBDX", "LF", "LEBL", None) == (45.0, 5.0)
+    # Several candidates in the region: the one nearest the airport
+    assert resolve_leg_fix(cands, "DUP", "LE", "LEBL", (41.3, 2.1)) == (42.0, 2.0)
+    assert resolve_leg_fix(cands, "NONE", "LE", "LEBL", None) is None
+
+
+def test_leg_rows_positions():
+    _, legs = parse_procedure_file(CIFP)
+    rows = leg_rows("LEBL", legs, {"FBDX": [("LE", "ENRT", 41.0, 2.0)]}, (41.3, 2.1))
+    by_fix = {row[6]: row for row in rows}
+    assert by_fix["FBDX"][-2:] == (41.0, 2.0)
+    assert by_fix["SIDFX"][-2:] == (None, None)
+    assert by_fix[None][-2:] == (None, None)
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.db.models import FlightPlan
+from app.services.history import decode_cursor, encode_cursor, list_plans
+
+
+def test_cursor_round_trip():
+    ts = datetime(2025, 10, 2, 13, 45, 1, 123456)
+    cursor = encode_cursor(ts, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (ts, 42)
+
+
+@pytest.mark.parametrize("bad", ["", "!!!", "bm90LWEtY3Vyc29y"])
+def test_malformed_cursor(bad):
+    with pytest.raises(ValueError):
+        decode_cursor(bad)
+
+
+def test_keyset_pages_cover_every_plan_once(db):
+    base = datetime(2025, 10, 1)
+    # Two plans share each timestamp, so the id breaks ties within a page boundary
+    for i in range(7):
+        db.add(FlightPlan(ref=f"p{i}", origin="LEBL" if i % 2 else "LEMD", dest="LFPG",
+                          created_at=base + timedelta(minutes=i // 2)))
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = list_plans(db, cursor=cursor, limit=3)
+        seen += [item["ref"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == ["p6", "p5", "p4", "p3", "p2", "p1", "p0"]
+
+    page = list_plans(db, origin="lebl", limit=2)
+    assert [item["ref"] for item in page["items"]] == ["p5", "p3"]
+    assert [item["ref"] for item in list_plans(db, origin="LEBL", cursor=page["next_cursor"])["items"]] == ["p1"]
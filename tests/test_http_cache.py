@@ -0,0 +1,59 @@
+import pytest
+
+from app.services import http_cache
+from starlette.requests import Request
+
+from app.services.http_cache import TTLCache, etag_matches, make_etag
+
+
+def _request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_make_etag_is_weak_and_keyed_on_every_part():
+    tag = make_etag("procedures", "SID", "2510.1", None, "LEBL")
+    assert tag.startswith('W/"') and tag.endswith('"')
+    assert tag == make_etag("procedures", "SID", "2510.1", "", "LEBL")
+    assert tag != make_etag("procedures", "SID", "2510.2", None, "LEBL")
+    assert tag != make_etag("procedures", "SID2510.1", None, "LEBL")
+
+
+def test_etag_matches_weak_comparison():
+    tag = make_etag("x")
+    opaque = tag[2:]
+    assert not etag_matches(_request(), tag)
+    assert etag_matches(_request(tag), tag)
+    assert etag_matches(_request(opaque), tag)
+    assert etag_matches(_request(f'"other", {opaque}'), tag)
+    assert etag_matches(_request("*"), tag)
+    assert not etag_matches(_request('W/"other"'), tag)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(http_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_expiry(clock):
+    cache = TTLCache(ttl=10)
+    cache.put("a", 1)
+    clock[0] += 10
+    assert cache.get("a") == 1
+    clock[0] += 0.5
+    assert cache.get("a") is None
+    assert cache.get("missing") is None
+
+
+def test_ttl_cache_evicts_expired_then_oldest(clock):
+    cache = TTLCache(ttl=10, max_entries=2)
+    cache.put("a", 1)
+    clock[0] += 5
+    cache.put("b", 2)
+    cache.put("c", 3)  # full and nothing expired: the oldest entry goes
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (None, 2, 3)
+    clock[0] += 20
+    cache.put("d", 4)  # b and c expired and are dropped together
+    assert (cache.get("b"), cache.get("c"), cache.get("d")) == (None, None, 4)
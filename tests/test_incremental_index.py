@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.core.indexer import _claim_source, _index_member, _record_source, run_full_index
+from app.db.models import AiracCycle, Procedure, ProcedureLeg
+from app.db.schema import ensure_schema
+from app.utils.navfiles import cifp_source
+
+FIXES = {
+    "FAAX": (40.0, -5.0, "ENRT"),
+    "FABX": (40.0, -4.0, "ENRT"),
+    "FACX": (40.5, -3.0, "ENRT"),
+    "FBDX": (41.0, 0.0, "ENRT"),
+    "FBEX": (41.2, 1.0, "ENRT"),
+    "SIDFX": (41.4, 2.2, "LEBL"),
+}
+AIRWAYS = [("FAAX", "FABX", "UN0"), ("FABX", "FACX", "UN0"), ("FACX", "FBDX", "UN0"), ("FBDX", "FBEX", "UM4")]
+CIFP_LEBL = (
+    "SID:010,5,TEST1A,RW07L,SIDFX,LE,P,C,E   , ,   ,IF, , , , , ,      ,    ,    ,    ,    ,+,05000,     ,18000, ,   ,    , , , ,0,D,S;\n"
+    "SID:020,5,TEST1A,RW07L,FBDX,LE,E,A,EE  , ,   ,TF, , , , , ,      ,    ,    ,    ,    , ,     ,     ,18000, ,   ,    , , , ,0,D,S;\n"
+)
+CIFP_LEMD = "STAR:010,5,ARR1B,ALL,FACX,LE,E,A,E   , ,   ,IF, , , , , ,      ,    ,    ,    ,    , ,     ,     ,18000, ,   ,    , , , ,0,D,S;\n"
+
+DUMP = {
+    "fixes": "SELECT ident, country, lat, lon, usage FROM fixes ORDER BY 1, 2, 3, 4",
+    "airways": (
+        "SELECT a.name, f1.ident, f1.lat, f2.ident, f2.lat, a.direction FROM airways a"
+        " JOIN fixes f1 ON f1.id = a.fix1_id JOIN fixes f2 ON f2.id = a.fix2_id ORDER BY 1, 2, 3, 4, 5"
+    ),
+    "airports": "SELECT icao, lat, lon FROM airports ORDER BY 1",
+    "procedures": "SELECT icao, proc_type, name, start, route FROM procedures ORDER BY 1, 2, 3, 4",
+    "legs": "SELECT icao, proc_type, name, transition, seq, fix_ident, lat, lon FROM procedure_legs ORDER BY 1, 2, 3, 4, 5",
+    "sources": "SELECT kind, name, sha1 FROM source_files ORDER BY 1, 2",
+}
+
+
+def _write(path, fixes=FIXES, airways=AIRWAYS, cifp=None):
+    (path / "CIFP").mkdir(parents=True, exist_ok=True)
+    (path / "cycle.json").write_text(json.dumps({"cycle": "2510", "name": "Test", "revision": "1"}))
+    (path / "earth_aptmeta.dat").write_text("I\n1100 Version\n\nLEBL LE 41.297 2.078 6000 FL070\nLEMD LE 40.472 -3.561 6000 FL070\n")
+    (path / "earth_fix.dat").write_text("I\n1200 Version\n\n" + "".join(
+        f" {lat:.6f} {lon:.6f} {ident} {usage} LE 2138112\n" for ident, (lat, lon, usage) in fixes.items()
+    ) + "99\n")
+    (path / "earth_awy.dat").write_text("I\n1100 Version\n\n" + "".join(
+        f"{a} LE 11 {b} LE 11 N 2 100 460 {name}\n" for a, b, name in airways
+    ) + "99\n")
+    for name in os.listdir(path / "CIFP"):
+        os.remove(path / "CIFP" / name)
+    for icao, body in (cifp if cifp is not None else {"LEBL": CIFP_LEBL, "LEMD": CIFP_LEMD}).items():
+        (path / "CIFP" / f"{icao}.dat").write_text(body)
+
+
+@pytest.fixture
+def navdata(tmp_path, monkeypatch):
+    data = tmp_path / "nav"
+    _write(data)
+    # Backdate the baseline so rewrites in the same test always change size/mtime stamps
+    for root, _, names in os.walk(data):
+        for name in names:
+            os.utime(os.path.join(root, name), (1_700_000_000, 1_700_000_000))
+    monkeypatch.setenv("DATA_PATH", str(data))
+    monkeypatch.setenv("COMPILED_NAVDATA", "0")
+    monkeypatch.setenv("CIFP_WORKERS", "1")
+    monkeypatch.delenv("LAZY_PROCEDURES", raising=False)
+    monkeypatch.delenv("INCREMENTAL_INDEX", raising=False)
+    return data
+
+
+def _index(db, *, force):
+    out = run_full_index(db, force=force)
+    db.commit()
+    return out
+
+
+def _dump(db):
+    return {key: db.execute(text(sql)).all() for key, sql in DUMP.items()}
+
+
+def _generation(db):
+    return db.query(AiracCycle.generation).scalar()
+
+
+def _full_rebuild(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'full.db'}")
+    ensure_schema(engine)
+    try:
+        with Session(engine) as fresh:
+            _index(fresh, force=True)
+            return _dump(fresh)
+    finally:
+        engine.dispose()
+
+
+def test_unchanged_sources_skip(db, navdata):
+    _index(db, force=True)
+    before, generation = _dump(db), _generation(db)
+    out = _index(db, force=False)
+    assert out["skipped"] and out["reason"] == "sources unchanged"
+    assert _dump(db) == before
+    assert _generation(db) == generation
+
+
+def test_incremental_matches_full_rebuild(db, navdata, tmp_path):
+    _index(db, force=True)
+    generation = _generation(db)
+
+    fixes = dict(FIXES)
+    fixes["FBDX"] = (41.5, 0.5, "ENRT")  # moved: LEBL's SID leg must follow it
+    del fixes["FBEX"]  # dropped: its airway segment goes with it
+    fixes["NEWFX"] = (42.0, 3.0, "ENRT")
+    airways = [seg for seg in AIRWAYS if "FBEX" not in seg] + [("FBDX", "NEWFX", "UM4")]
+    _write(navdata, fixes, airways, {"LEBL": CIFP_LEBL.replace("TEST1A", "TEST2A")})
+    out = _index(db, force=False)
+
+    assert not out["skipped"]
+    assert out["changed"] == ["earth_awy.dat", "earth_fix.dat"]
+    assert (out["procedures"]["files"], out["procedures"]["removed"]) == (1, 1)
+    assert _generation(db) == generation + 1
+    # LEMD.dat is gone, so are its procedures
+    assert db.query(ProcedureLeg).filter(ProcedureLeg.icao == "LEMD").count() == 0
+    leg = db.query(ProcedureLeg).filter(ProcedureLeg.fix_ident == "FBDX").one()
+    assert (leg.name, leg.lat, leg.lon) == ("TEST2A", 41.5, 0.5)
+    assert _dump(db) == _full_rebuild(tmp_path)
+
+
+def test_moved_fix_reresolves_unchanged_procedures(db, navdata, tmp_path):
+    _index(db, force=True)
+    fixes = dict(FIXES)
+    fixes["FACX"] = (40.7, -2.5, "ENRT")
+    _write(navdata, fixes)
+    out = _index(db, force=False)
+
+    assert out["changed"] == ["earth_fix.dat"]
+    assert (out["procedures"]["files"], out["procedures"]["removed"]) == (0, 0)
+    leg = db.query(ProcedureLeg).filter(ProcedureLeg.icao == "LEMD", ProcedureLeg.fix_ident == "FACX").one()
+    assert (leg.lat, leg.lon) == (40.7, -2.5)
+    assert _dump(db) == _full_rebuild(tmp_path)
+
+
+def test_lazy_index_waits_for_other_worker(navdata, tmp_path):
+    # Two engines on one file stand in for two worker processes: the per-ICAO
+    # thread lock does not span them, the database claim must
+    url = f"sqlite:///{tmp_path / 'lazy.db'}"
+    engines = [create_engine(url), create_engine(url)]
+    ensure_schema(engines[0])
+    member = cifp_source().get("LEBL")
+    result = []
+    try:
+        with Session(engines[0]) as first, Session(engines[1]) as second:
+            _claim_source(first, "cifp", "LEBL")
+            _record_source(first, "cifp", "LEBL", member.mtime, member.size, "0" * 40)
+            first.flush()
+            worker = threading.Thread(target=lambda: result.append(_index_member(second, member, None)))
+            worker.start()
+            time.sleep(0.3)
+            assert worker.is_alive()  # blocked on the claim
+            first.commit()
+            worker.join(5)
+            # The second worker re-checked after the claim and found it indexed
+            assert result == [False]
+            assert second.query(Procedure).count() == 0
+    finally:
+        for engine in engines:
+            engine.dispose()
@@ -0,0 +1,40 @@
+from app.services.map_cache import MapCache, map_cache_key
+
+
+def test_map_cache_lru_by_bytes():
+    cache = MapCache(250)
+    cache.put("a", "a" * 100, 1.0)
+    cache.put("b", "b" * 100, 2.0)
+    assert cache.get("a") == ("a" * 100, 1.0)  # a is now the most recently used
+    cache.put("c", "c" * 100, 3.0)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == 200
+
+
+def test_map_cache_compressed_round_trip():
+    cache = MapCache(10**6, compress=True)
+    html = "<div>route</div>" * 500
+    cache.put("k", html, 12.5)
+    assert cache.get("k") == (html, 12.5)
+    assert cache.stats()["bytes"] < len(html)
+
+
+def test_map_cache_skips_oversized_and_replaces():
+    cache = MapCache(100)
+    cache.put("big", "x" * 101, 1.0)
+    assert cache.get("big") is None
+    cache.put("k", "x" * 60, 1.0)
+    cache.put("k", "y" * 80, 2.0)
+    assert cache.get("k") == ("y" * 80, 2.0)
+    assert cache.stats()["bytes"] == 80
+    cache.clear()
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+
+def test_map_cache_key_normalization():
+    base = map_cache_key("folium", "sidfx  DCT fbdx", "lebl", "lfpg", "Dark", "2510.1")
+    assert base == map_cache_key("folium", " SIDFX DCT FBDX ", "LEBL ", "LFPG", "midnight", "2510.1")
+    assert base != map_cache_key("folium", "SIDFX DCT FBDX", "LEBL", "LFPG", "light", "2510.1")
+    assert base != map_cache_key("folium", "SIDFX DCT FBDX", "LEBL", "LFPG", "dark", "2510.2")
+    assert map_cache_key("geojson", "A", "B", "C", None, None) != map_cache_key("geojson", "A", "B", "C", "dark", None)
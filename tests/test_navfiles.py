@@ -0,0 +1,107 @@
+import gzip
+import io
+import lzma
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from app.utils import navfiles
+from app.utils.navfiles import CifpSource, cifp_source, data_file, data_sha1, open_binary, strip_compressed_suffix
+
+LEBL = b"SID:010,5,TEST1A,RW07L,FBDX,LE;\n"
+LEMD = b"STAR:010,5,ARR1B,ALL,FBDX,LE;\n"
+
+
+def test_strip_compressed_suffix():
+    assert strip_compressed_suffix("earth_fix.dat.gz") == "earth_fix.dat"
+    assert strip_compressed_suffix("LEBL.DAT.XZ") == "LEBL.DAT"
+    assert strip_compressed_suffix("CIFP.tar.zst") == "CIFP.tar"
+    assert strip_compressed_suffix("earth_fix.dat") == "earth_fix.dat"
+
+
+def test_data_file_prefers_plain(tmp_path):
+    assert data_file("earth_fix.dat", str(tmp_path)) is None
+    (tmp_path / "earth_fix.dat.xz").write_bytes(lzma.compress(b"x"))
+    assert data_file("earth_fix.dat", str(tmp_path)) == str(tmp_path / "earth_fix.dat.xz")
+    (tmp_path / "earth_fix.dat").write_bytes(b"x")
+    assert data_file("earth_fix.dat", str(tmp_path)) == str(tmp_path / "earth_fix.dat")
+
+
+@pytest.mark.parametrize("suffix,compress", [("", bytes), (".gz", gzip.compress), (".xz", lzma.compress)])
+def test_open_binary_decompresses(tmp_path, suffix, compress):
+    path = tmp_path / ("earth_awy.dat" + suffix)
+    path.write_bytes(compress(LEBL * 100))
+    with open_binary(str(path)) as f:
+        assert f.read() == LEBL * 100
+
+
+def _contents(src):
+    return {m.icao: data for m, data in src.iter_files()}
+
+
+def test_directory_source(tmp_path):
+    d = tmp_path / "CIFP"
+    d.mkdir()
+    (d / "LEBL.dat").write_bytes(LEBL)
+    (d / "LEBL.dat.gz").write_bytes(gzip.compress(b"stale"))
+    (d / "LEMD.dat.gz").write_bytes(gzip.compress(LEMD))
+    (d / "README.txt").write_text("not a procedure file")
+    src = cifp_source(str(tmp_path))
+    assert src.kind == "dir"
+    assert src.icaos() == ["LEBL", "LEMD"]
+    assert src.get("lebl").name == "LEBL.dat"
+    assert src.get("XXXX") is None
+    assert _contents(src) == {"LEBL": LEBL, "LEMD": LEMD}
+    assert src.get("LEMD").sha1() == data_sha1(LEMD)
+
+    # The cached listing follows the directory's mtime
+    (d / "LFPG.dat").write_bytes(LEBL)
+    os.utime(d, ns=(os.stat(d).st_atime_ns, os.stat(d).st_mtime_ns + 10**9))
+    assert cifp_source(str(tmp_path)).icaos() == ["LEBL", "LEMD", "LFPG"]
+
+
+def test_zip_source(tmp_path):
+    with zipfile.ZipFile(tmp_path / "CIFP.zip", "w") as z:
+        z.writestr("CIFP/LEBL.dat", LEBL)
+        z.writestr("CIFP/LEMD.dat.xz", lzma.compress(LEMD))
+    src = cifp_source(str(tmp_path))
+    assert src.kind == "zip"
+    assert src.icaos() == ["LEBL", "LEMD"]
+    with src.get("LEMD").open() as f:
+        assert f.read() == LEMD
+    assert _contents(src) == {"LEBL": LEBL, "LEMD": LEMD}
+
+
+def _add(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tar.addfile(info, io.BytesIO(data))
+
+
+def test_tar_source_and_extract(tmp_path, monkeypatch):
+    monkeypatch.setenv("CIFP_CACHE_DIR", str(tmp_path / "cache"))
+    with tarfile.open(tmp_path / "CIFP.tar.gz", "w:gz") as t:
+        _add(t, "CIFP/LEBL.dat", LEBL)
+        _add(t, "CIFP/LEMD.dat.gz", gzip.compress(LEMD))
+    src = cifp_source(str(tmp_path))
+    assert isinstance(src, CifpSource) and src.kind == "tar"
+    assert _contents(src) == {"LEBL": LEBL, "LEMD": LEMD}
+    assert list(m.icao for m, _ in src.iter_files({"LEMD"})) == ["LEMD"]
+
+    target = src.extract()
+    assert sorted(os.listdir(target)) == ["LEBL.dat", "LEMD.dat"]
+    with src.get("LEMD").open() as f:
+        assert f.read() == LEMD
+    assert src.extract() == target
+
+    # A new archive version is extracted next to the old one, which is removed
+    with tarfile.open(tmp_path / "CIFP.tar.gz", "w:gz") as t:
+        _add(t, "CIFP/LEBL.dat", LEMD)
+    st = os.stat(tmp_path / "CIFP.tar.gz")
+    os.utime(tmp_path / "CIFP.tar.gz", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    fresh = CifpSource(str(tmp_path / "CIFP.tar.gz"))
+    assert fresh.extract() != target
+    assert not os.path.exists(target)
+    assert os.listdir(navfiles.cifp_cache_dir()) == [os.path.basename(fresh.extract())]
@@ -0,0 +1,47 @@
+import pytest
+
+from app.db.models import AiracCycle, Airway, Fix
+from app.utils.db_graph import build_graph
+from app.utils.dbnav import navdata_version_db
+from app.utils.navgraph import ensure_navgraph, get_navgraph, publish_navgraph
+
+
+@pytest.fixture
+def graph_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("NAVGRAPH_DIR", str(tmp_path / "navgraph"))
+    monkeypatch.delenv("SHARED_NAVGRAPH", raising=False)
+
+
+def _seed(db):
+    db.add(AiracCycle(cycle="2510", name="Test", revision="1", current=True, generation=1))
+    fixes = {ident: Fix(ident=ident, country="LE", usage="ENRT", lat=40.0, lon=lon)
+             for ident, lon in (("FAAX", -5.0), ("FABX", -4.0), ("FACX", -3.0))}
+    db.add_all(fixes.values())
+    db.flush()
+    db.add(Airway(name="UN0", fix1_id=fixes["FAAX"].id, fix2_id=fixes["FABX"].id,
+                  direction="N", route_class=2, lower_fl=100, upper_fl=460))
+    db.commit()
+    return fixes
+
+
+def _edges(db):
+    adj, _ = build_graph(db, cruise_fl=350, fl_range=(300, 400))
+    return sorted((a, b) for a, nbrs in adj.items() for b, _, _ in nbrs)
+
+
+def test_graph_is_only_used_for_its_navdata_version(db, graph_dir):
+    fixes = _seed(db)
+    publish_navgraph(db, version=navdata_version_db(db))
+    assert get_navgraph().version == "2510.1"
+    assert _edges(db) == [("FAAX@LE", "FABX@LE"), ("FABX@LE", "FAAX@LE")]
+
+    # Same-cycle reindex without a publish: the stale graph must not be used
+    db.add(Airway(name="UN0", fix1_id=fixes["FABX"].id, fix2_id=fixes["FACX"].id,
+                  direction="P", route_class=2, lower_fl=100, upper_fl=460))
+    db.query(AiracCycle).update({AiracCycle.generation: 2})
+    db.commit()
+    assert ("FABX@LE", "FACX@LE") in _edges(db)
+
+    graph = ensure_navgraph(db, version=navdata_version_db(db))
+    assert graph is get_navgraph() and graph.version == "2510.2"
+    assert ("FABX@LE", "FACX@LE") in _edges(db)
@@ -0,0 +1,56 @@
+import gzip
+
+from app.utils.navparse import (
+    iter_chunks,
+    iter_fix_records,
+    parse_airport_meta_chunk,
+    parse_awy_chunk,
+    parse_awy_line,
+    parse_fix_chunk,
+    parse_fix_line,
+)
+
+FIX_TEXT = (
+    "I\n"
+    "1200 Version - data cycle 2510\n"
+    "\n"
+    " 40.000000000 -5.000000000 faax ENRT le 2138112\n"
+    " 41.500000000  2.250000000 SIDFX LEBL LE 4194373 SIDFX\n"
+    " 45.0 5.0 SHORT\n"
+    "; comment\n"
+    "99\n"
+)
+
+
+def test_fix_chunk_matches_line_parser():
+    lines = FIX_TEXT.split("\n")
+    assert parse_fix_chunk(FIX_TEXT) == [r for r in map(parse_fix_line, [l for l in lines if l.strip()]) if r]
+    assert parse_fix_chunk(FIX_TEXT) == [
+        ("FAAX", "ENRT", "LE", 40.0, -5.0, "2138112", None),
+        ("SIDFX", "LEBL", "LE", 41.5, 2.25, "4194373", "SIDFX"),
+        ("SHORT", None, None, 45.0, 5.0, None, None),
+    ]
+
+
+def test_awy_formats():
+    rec = ("FAAX", "LE", "FABX", "LE", "N", 2, 100, 460, "UN0")
+    assert parse_awy_line("FAAX LE 11 FABX LE 11 N 2 100 460 UN0") == rec
+    assert parse_awy_line("faax le 11 0 fabx le 11 0 n 2 100 460 un0") == rec
+    text = "FAAX LE 11 FABX LE 11 N 2 100 460 UN0\nFAAX LE 11 FABX LE 11 X 2 100 460 UN0\nFAAX LE 11 FABX LE 11 N A 100 460 UN0\n"
+    assert parse_awy_chunk(text) == [rec]
+
+
+def test_airport_meta():
+    text = "I\n1100 Version\n\nLEBL LE 41.297 2.078 6000 FL070\nlemd LE 40.472 -3.561\nBAD LE x y\n"
+    assert [tuple(r) for r in parse_airport_meta_chunk(text)] == [("LEBL", 41.297, 2.078), ("LEMD", 40.472, -3.561)]
+
+
+def test_chunks_split_on_line_boundaries(tmp_path):
+    body = "".join(f" 40.{i:06d} -5.0 FX{i:04d} ENRT LE 2138112\n" for i in range(500))
+    path = tmp_path / "earth_fix.dat.gz"
+    path.write_bytes(gzip.compress(body.encode()))
+    chunks = list(iter_chunks(str(path), chunk_size=1000))
+    assert len(chunks) > 1
+    # Each chunk is cut at its last newline, so no line spans two chunks
+    assert "\n".join(chunks) == body[:-1]
+    assert [r[0] for r in iter_fix_records(str(path))] == [f"FX{i:04d}" for i in range(500)]
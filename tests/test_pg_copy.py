@@ -0,0 +1,85 @@
+"""Postgres COPY index path; runs only when PG_URL points at a server the tests may
+create a scratch database on (e.g. postgresql+psycopg2://postgres@/postgres?host=/tmp/pg)."""
+import json
+import os
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+from app.core.indexer import pg_copy_enabled, run_full_index
+from app.db.models import Fix, Procedure, ProcedureLeg
+from app.db.schema import ensure_schema
+
+PG_URL = os.getenv("PG_URL")
+pytestmark = pytest.mark.skipif(not PG_URL, reason="PG_URL not set")
+
+CIFP_LEBL = (
+    "SID:010,5,TEST1A,RW07L,SIDFX,LE,P,C,E   , ,   ,IF, , , , , ,      ,    ,    ,    ,    ,+,05000,     ,18000, ,   ,    , , , ,0,D,S;\n"
+    "SID:020,5,TEST1A,RW07L,FBDX,LE,E,A,EE  , ,   ,TF, , , , , ,      ,    ,    ,    ,    , ,     ,     ,18000, ,   ,    , , , ,0,D,S;\n"
+)
+
+
+@pytest.fixture
+def pg(tmp_path, monkeypatch):
+    admin = create_engine(PG_URL, isolation_level="AUTOCOMMIT")
+    name = f"routehelper_test_{uuid.uuid4().hex[:8]}"
+    with admin.connect() as cx:
+        cx.execute(text(f"CREATE DATABASE {name}"))
+    engine = create_engine(make_url(PG_URL).set(database=name))
+    try:
+        ensure_schema(engine)
+        with Session(engine) as session:
+            yield session
+    finally:
+        engine.dispose()
+        with admin.connect() as cx:
+            cx.execute(text(f"DROP DATABASE {name}"))
+        admin.dispose()
+
+
+@pytest.fixture
+def navdata(tmp_path, monkeypatch):
+    data = tmp_path / "nav"
+    (data / "CIFP").mkdir(parents=True)
+    (data / "earth_aptmeta.dat").write_text("I\n1100 Version\n\nLEBL LE 41.297 2.078 6000 FL070\n")
+    (data / "earth_fix.dat").write_text(
+        "I\n1200 Version\n\n"
+        " 41.000000 0.000000 FBDX ENRT LE 2138112\n"
+        " 41.400000 2.200000 SIDFX LEBL LE 4194373\n"
+        " 40.000000 -5.000000 NOCC\n"  # no usage/country columns: country is NULL
+        "99\n"
+    )
+    (data / "earth_awy.dat").write_text("I\n1100 Version\n\nFBDX LE 11 SIDFX LE 11 N 2 100 460 UN0\n99\n")
+    (data / "CIFP" / "LEBL.dat").write_text(CIFP_LEBL)
+    monkeypatch.setenv("DATA_PATH", str(data))
+    monkeypatch.setenv("COMPILED_NAVDATA", "0")
+    monkeypatch.setenv("CIFP_WORKERS", "1")
+    monkeypatch.delenv("LAZY_PROCEDURES", raising=False)
+    monkeypatch.delenv("PG_COPY_INDEX", raising=False)
+    return data
+
+
+def _set_cycle(data, cycle):
+    (data / "cycle.json").write_text(json.dumps({"cycle": cycle, "name": "Test", "revision": "1"}))
+
+
+def test_copy_load_and_rerun_without_duplicates(pg, navdata):
+    assert pg_copy_enabled(pg)
+    _set_cycle(navdata, "2510")
+    out = run_full_index(pg, force=True)
+    pg.commit()
+    assert (out["fixes"], out["airways"], out["procedures"]) == (3, 1, {"sids": 1, "stars": 0})
+    leg = pg.query(ProcedureLeg).filter(ProcedureLeg.fix_ident == "FBDX").one()
+    assert (leg.lat, leg.lon) == (41.0, 0.0)
+
+    # A new cycle is merged into the existing rows rather than cleared first
+    _set_cycle(navdata, "2511")
+    out = run_full_index(pg, force=False)
+    pg.commit()
+    assert (out["fixes"], out["airways"]) == (0, 0)
+    assert pg.query(Fix).count() == 3
+    assert pg.query(Fix).filter(Fix.ident == "NOCC", Fix.country.is_(None)).count() == 1
+    assert pg.query(Procedure).count() == 1
@@ -0,0 +1,38 @@
+from app.utils.route_geometry import (
+    decode_polyline,
+    decode_route_geometry,
+    encode_polyline,
+    encode_route_geometry,
+)
+
+
+def test_polyline_reference_example():
+    # Example from the Encoded Polyline Algorithm Format documentation
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == points
+
+
+def test_polyline_round_trip_precision():
+    points = [(0.0, 0.0), (-33.94611, 151.17722), (51.4775, -0.46139), (-89.99999, 179.99999)]
+    assert decode_polyline(encode_polyline(points)) == points
+    assert decode_polyline(encode_polyline(points, precision=6), precision=6) == points
+    assert decode_polyline("") == []
+
+
+def test_route_geometry_round_trip():
+    points = [(41.29694, 2.07833, "SIDFX"), (42.0, 3.0, "FBDX"), (48.72528, 2.35944, "LFPG")]
+    text = encode_route_geometry(points, " sidfx  dct fbdx ", (41.297, 2.078), None)
+    geo = decode_route_geometry(text)
+    assert geo["route_tokens"] == "SIDFX DCT FBDX"
+    assert geo["points"] == points
+    assert len(geo["legs_nm"]) == 2
+    assert geo["origin"] == (41.297, 2.078)
+    assert geo["dest"] is None
+
+
+def test_decode_route_geometry_rejects_unknown():
+    assert decode_route_geometry(None) is None
+    assert decode_route_geometry("not json") is None
+    assert decode_route_geometry('{"v": 99, "p": "", "n": ""}') is None
+    assert decode_route_geometry('{"v": 1, "p": "??", "n": "A B"}') is None
@@ -0,0 +1,59 @@
+import math
+
+import pytest
+
+from app.db.spatial import corridor_bbox
+
+JFK = (40.64, -73.78)
+LHR = (51.47, -0.45)
+
+
+def test_short_route_box_is_padded_endpoints():
+    box = corridor_bbox((41.30, 2.08), (40.47, -3.56), 60)
+    # One degree of latitude; longitude padding widens with the box's highest latitude
+    dlon = 1.0 / math.cos(math.radians(42.30))
+    assert box == pytest.approx((39.47, -3.56 - dlon, 42.30, 2.08 + dlon))
+
+
+def test_box_includes_great_circle_vertex():
+    min_lat, min_lon, max_lat, max_lon = corridor_bbox(JFK, LHR, 0)
+    # The JFK-LHR great circle peaks near 53.7N, north of both endpoints
+    assert max_lat == pytest.approx(53.66, abs=0.05)
+    assert min_lat == pytest.approx(JFK[0])
+    assert (min_lon, max_lon) == pytest.approx((JFK[1], LHR[1]))
+    assert corridor_bbox(LHR, JFK, 0) == pytest.approx((min_lat, min_lon, max_lat, max_lon))
+
+
+def test_southern_vertex():
+    min_lat, _, max_lat, _ = corridor_bbox((-40.0, 0.0), (-40.0, 60.0), 0)
+    assert min_lat == pytest.approx(-44.1, abs=0.05)  # vertex halfway, atan(tan 40 / cos 30)
+    assert max_lat == pytest.approx(-40.0)
+
+
+def test_no_box_across_antimeridian_or_near_pole():
+    assert corridor_bbox((33.94, -118.41), (35.77, 140.39), 100) is None  # LAX-NRT
+    assert corridor_bbox((85.0, 0.0), (85.0, 120.0), 100) is None
+    assert corridor_bbox((0.0, 0.0), (0.0, 180.0), 0) is None  # antipodal
+
+
+def test_nearby_graph_fixes_match_full_scan(db):
+    import random
+
+    from app.db.models import Airway, Fix
+    from app.db.spatial import rebuild_spatial_index
+    from app.utils.db_graph import build_graph_from_db, nearby_graph_fixes_db, nearest_graph_fixes_db
+
+    rng = random.Random(7)
+    fixes = [Fix(ident=f"F{i:03d}", country="LE", usage="ENRT", lat=rng.uniform(38, 44), lon=rng.uniform(-6, 4))
+             for i in range(200)]
+    db.add_all(fixes)
+    db.flush()
+    for a, b in zip(fixes[::2], fixes[1::2]):
+        db.add(Airway(name="UN0", fix1_id=a.id, fix2_id=b.id, direction="N", route_class=2, lower_fl=100, upper_fl=460))
+    assert rebuild_spatial_index(db)["fix_rtree"] == 200
+    db.commit()
+
+    adj, coords = build_graph_from_db(db, cruise_fl=350, fl_range=(300, 400))
+    for lat, lon, radius in ((41.3, 2.1, 60), (40.5, -3.6, 120), (30.0, 0.0, 100)):
+        expected = nearest_graph_fixes_db(coords, adj, lat, lon, max_radius_nm=radius, limit=10)
+        assert nearby_graph_fixes_db(db, coords, adj, lat, lon, max_radius_nm=radius, limit=10) == expected